@@ -0,0 +1,61 @@
+"""
+分面计数基准
+
+用合成数据构造 N 篇论文（默认 100k）和 54 个两层标签，比较逐篇判断过滤条件的计数方式
+与 FacetIndex 位图计数的耗时。
+
+运行：python benchmarks/bench_facets.py [论文数]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import FacetIndex, Paper, PaperQuery, TagClosureIndex  # noqa: E402
+from bench_paper_memory import build, make_rows  # noqa: E402
+
+
+def scan_counts(papers, paper_query, tag_index):
+    """旧方式：逐篇判断过滤条件，再逐篇累加各分面"""
+    matched = [paper for paper in papers if paper_query.matches(paper, tag_index)]
+    categories = {}
+    tags = {}
+    for paper in matched:
+        for category in paper.categories:
+            categories[category] = categories.get(category, 0) + 1
+        for tag_id in tag_index.names:
+            if tag_index.matches(tag_id, paper.custom_tags_ids):
+                tags[tag_id] = tags.get(tag_id, 0) + 1
+    return len(matched), categories, tags
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    papers = build(Paper, make_rows(count))
+    # 6 个根标签，每个下挂 8 个子标签
+    rows = [(i, f"Tag{i}", 0 if i <= 6 else (i - 7) // 8 + 1) for i in range(1, 55)]
+    tag_index = TagClosureIndex()
+    tag_index.build(rows)
+    print(f"论文数: {count}")
+
+    start = time.perf_counter()
+    facets = FacetIndex(papers, tag_index, version=(0, 0))
+    print(f"构建位图索引: {time.perf_counter() - start:.3f}s")
+
+    for label, paper_query in (("无过滤", PaperQuery()),
+                               ("分类", PaperQuery(category="cs.AI")),
+                               ("分类+标签+已读", PaperQuery(category="cs.AI", tag_id=1, is_read=False))):
+        start = time.perf_counter()
+        total, _, _ = scan_counts(papers, paper_query, tag_index)
+        scan = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = facets.counts(facets.mask(paper_query), tag_index)
+        bitmap = time.perf_counter() - start
+        assert result["total"] == total
+        print(f"{label:>10}: 逐篇扫描 {scan * 1000:8.1f} ms  位图 {bitmap * 1000:6.1f} ms  命中 {total}")
+
+
+if __name__ == "__main__":
+    main()
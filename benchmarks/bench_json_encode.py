@@ -0,0 +1,70 @@
+"""
+API 响应 JSON 序列化基准
+
+比较一页 100 篇论文（中文摘要）在 Tornado 默认 json_encode（ensure_ascii 转义）
+与 server.json_dumps（orjson / msgspec / 标准库，UTF-8 直出）下的编码耗时和响应大小。
+
+运行：python benchmarks/bench_json_encode.py [重复次数]
+"""
+import datetime
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import tornado.escape  # noqa: E402
+
+import server  # noqa: E402
+
+
+def make_page(count=100, seed=7):
+    """构造一页论文数据，published 为 datetime（不预先转换为字符串）"""
+    rng = random.Random(seed)
+    phrases = ["大语言模型", "检索增强生成", "扩散模型", "强化学习", "多模态", "基准测试", "推理能力", "向量检索"]
+    papers = []
+    for i in range(count):
+        papers.append({
+            "paper_url": f"http://arxiv.org/abs/2511.{i:05d}v1",
+            "title": f"Paper {i}: " + " ".join(rng.choices(["Large", "Language", "Model", "Agent", "Retrieval"], k=6)),
+            "authors": [f"Author {rng.randint(1, 5000)}" for _ in range(rng.randint(2, 6))],
+            "summary": "，".join(rng.choices(phrases, k=120)) + "。",
+            "categories": rng.sample(["cs.AI", "cs.CL", "cs.CV", "cs.LG", "cs.IR"], 2),
+            "published": datetime.datetime(2025, 11, rng.randint(1, 28), 12, 0, 0),
+            "is_read": False,
+            "is_favorite": rng.random() < 0.1,
+            "custom_tags": [],
+            "custom_tags_ids": []
+        })
+    return {"success": True, "version": 1, "data": papers, "pagination": {"limit": count, "has_more": True}}
+
+
+def tornado_default(payload):
+    """旧路径：Tornado json_encode 不支持 datetime，需先把 published 转为字符串"""
+    data = [dict(paper, published=paper["published"].isoformat()) for paper in payload["data"]]
+    return tornado.escape.json_encode(dict(payload, data=data)).encode("utf-8")
+
+
+def bench(name, encode, payload, repeat):
+    body = encode(payload)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        encode(payload)
+    elapsed = (time.perf_counter() - start) / repeat * 1000
+    print(f"{name:>22}: {elapsed:7.3f} ms/次  {len(body) / 1024:7.1f} KiB")
+    return body
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    payload = make_page()
+    print(f"100 篇论文一页，重复 {repeat} 次")
+    bench("tornado json_encode", tornado_default, payload, repeat)
+    body = bench(f"json_dumps ({server.JSON_BACKEND})", server.json_dumps, payload, repeat)
+    assert json.loads(body)["data"][0]["published"].startswith("2025-11-")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Paper 内存占用基准
+
+用合成数据构造 N 篇论文（默认 100k），比较旧版普通对象与 __slots__ 紧凑模型的内存占用。
+标题和摘要文本在两种模型间共享，测得的差异即对象本身、列表和重复字符串的开销。
+
+运行：python benchmarks/bench_paper_memory.py [论文数]
+"""
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import Paper  # noqa: E402
+
+
+class DictPaper:
+    """旧版论文模型：普通 __dict__ 对象，每篇论文持有独立的列表和字符串"""
+
+    def __init__(self, title, authors, summary, categories, published=None, paper_url=None, is_read=None,
+                 is_favorite=None, custom_tags=None, custom_tags_ids=None):
+        self.paper_url = paper_url
+        self.title = title
+        self.authors = authors
+        self.summary = summary
+        self.categories = categories
+        self.published = published
+        self.is_read = is_read or False
+        self.is_favorite = is_favorite or False
+        self.custom_tags = custom_tags or []
+        self.custom_tags_ids = custom_tags_ids or []
+
+
+def make_rows(count, seed=42):
+    """生成合成论文行（作者/分类/标签以JSON字符串保存，与数据库读取时一致）"""
+    rng = random.Random(seed)
+    categories = [f"cs.{code}" for code in ("AI", "CL", "CV", "LG", "IR", "RO", "NE", "MA")] + ["stat.ML", "eess.AS"]
+    authors = [f"Author{i} Surname{i % 997}" for i in range(5000)]
+    tags = [(i, f"Tag{i}") for i in range(1, 55)]
+    words = ["model", "language", "learning", "graph", "neural", "retrieval", "diffusion", "agent", "benchmark"]
+
+    rows = []
+    for i in range(count):
+        paper_tags = rng.sample(tags, rng.randint(0, 3))
+        rows.append({
+            "id": f"http://arxiv.org/abs/2511.{i:05d}v1",
+            "title": " ".join(rng.choices(words, k=8)),
+            "summary": " ".join(rng.choices(words, k=150)),
+            "authors": json.dumps(rng.sample(authors, rng.randint(2, 6))),
+            "categories": json.dumps(rng.sample(categories, rng.randint(1, 3))),
+            "published": f"2025-11-{rng.randint(1, 28):02d}T12:00:00",
+            "tag_names": json.dumps([name for _, name in paper_tags]),
+            "tag_ids": json.dumps([tag_id for tag_id, _ in paper_tags])
+        })
+    return rows
+
+
+def build(model, rows):
+    return [
+        model(
+            title=row["title"],
+            authors=json.loads(row["authors"]),
+            summary=row["summary"],
+            categories=json.loads(row["categories"]),
+            published=row["published"],
+            paper_url=row["id"],
+            custom_tags=json.loads(row["tag_names"]),
+            custom_tags_ids=json.loads(row["tag_ids"])
+        )
+        for row in rows
+    ]
+
+
+def measure(model, rows):
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    papers = build(model, rows)
+    elapsed = time.perf_counter() - start
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return papers, current, elapsed
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rows = make_rows(count)
+    print(f"论文数: {count}")
+
+    results = {}
+    for name, model in (("dict", DictPaper), ("slots", Paper)):
+        papers, size, elapsed = measure(model, rows)
+        results[name] = size
+        print(f"{name:>6}: {size / 1024 / 1024:8.1f} MiB  ({size / count:6.0f} B/篇)  构造 {elapsed:.2f}s")
+        del papers
+
+    saved = results["dict"] - results["slots"]
+    print(f"节省: {saved / 1024 / 1024:.1f} MiB ({saved / results['dict'] * 100:.0f}%)")
+
+    # 序列化缓存：同一版本重复 to_dict 不再分配新字典
+    papers = build(Paper, rows[:100])
+    start = time.perf_counter()
+    for _ in range(1000):
+        for paper in papers:
+            paper.to_dict()
+    print(f"100 篇 x 1000 次 to_dict: {time.perf_counter() - start:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,139 +1,837 @@
 import arxiv
 import os
-from datetime import datetime, timedelta
-import pandas as pd
-from sqlalchemy import create_engine
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import create_engine, inspect, text, bindparam
 import json
+import time
+import hashlib
+import argparse
+import random
+import threading
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
 
 
-def advanced_paper_download(
-        query,
-        max_results=10,
-        download_dir="./papers",
-        categories=None,
-        start_date=None,
-        end_date=None
-):
+# 并发下载的线程数
+DOWNLOAD_WORKERS = 4
+# 同一主机两次请求之间的最小间隔（秒），arXiv 要求礼貌抓取
+HOST_MIN_INTERVAL = 1.0
+# 单个文件的最大尝试次数和请求超时（秒）
+DOWNLOAD_RETRIES = 3
+DOWNLOAD_TIMEOUT = 60
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# 下载目录中记录已完成下载的清单文件
+MANIFEST_NAME = "manifest.json"
+# 流水线各阶段之间队列的容量（满时上游阻塞，形成背压）
+PIPELINE_QUEUE_SIZE = 100
+# 数据库写入批次的最大条数和最长等待时间（秒）
+DB_BATCH_SIZE = 50
+DB_BATCH_INTERVAL = 2.0
+# 增量抓取：水位状态文件、首次运行回溯的天数、单次运行的结果上限和记住的最近ID数
+HARVEST_STATE_PATH = "./harvest_state.json"
+HARVEST_INITIAL_DAYS = 3
+HARVEST_MAX_RESULTS = 2000
+HARVEST_RECENT_IDS = 1000
+
+
+class HostRateLimiter:
+    """按主机限制请求速率：同一主机的请求开始时间至少间隔 min_interval 秒"""
+
+    def __init__(self, min_interval=HOST_MIN_INTERVAL):
+        self.min_interval = min_interval
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, host):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class DownloadManifest:
     """
-    高级论文下载功能
+    已完成下载的清单
+
+    以 JSON 保存 {文件名: {"paper_id", "url", "size", "sha256", "completed_at"}}，
+    重新运行时据此跳过已下载且大小一致的文件。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ 读取下载清单失败，将重新校验: {e}")
+
+    def is_complete(self, filename, filepath, verify_checksum=False):
+        """文件已在清单中且大小（以及可选的 sha256）一致"""
+        entry = self.entries.get(filename)
+        if entry is None or not os.path.exists(filepath):
+            return False
+        if os.path.getsize(filepath) != entry["size"]:
+            return False
+        return not verify_checksum or file_sha256(filepath) == entry["sha256"]
+
+    def record(self, filename, paper_id, url, size, sha256):
+        with self._lock:
+            self.entries[filename] = {
+                "paper_id": paper_id,
+                "url": url,
+                "size": size,
+                "sha256": sha256,
+                "completed_at": datetime.now().isoformat(timespec="seconds")
+            }
+            self._save()
+
+    def _save(self):
+        # 先写临时文件再替换，避免中断时清单损坏
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def file_sha256(filepath):
+    """计算文件的 sha256"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def make_download_session(workers=DOWNLOAD_WORKERS):
+    """创建共享连接池的 HTTP 会话"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = "paper-reader/1.0 (arxiv pdf downloader)"
+    return session
+
+
+def download_file(session, url, filepath, rate_limiter, expected_size=None, expected_sha256=None,
+                  retries=DOWNLOAD_RETRIES, timeout=DOWNLOAD_TIMEOUT):
+    """
+    下载单个文件，支持断点续传
+
+    数据先写入 filepath + ".part"，中断后再次调用时用 HTTP Range 从已下载的位置继续；
+    下载完成并校验大小、sha256 和 PDF 文件头后才重命名为最终文件。
+
+    Returns:
+        (文件大小, sha256)
+    """
+    part_path = filepath + ".part"
+    host = urlparse(url).netloc
+    last_error = None
+
+    for attempt in range(retries):
+        if attempt:
+            # 指数退避加随机抖动
+            time.sleep(min(30, 2 ** attempt) + random.random())
+        try:
+            offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            rate_limiter.wait(host)
+            with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+                if response.status_code == 416 and offset:
+                    # .part 已经完整，服务端无可返回的范围
+                    total = _content_range_total(response.headers.get("Content-Range"))
+                    if total is not None and total != offset:
+                        # 远端文件已变化，重新下载
+                        os.remove(part_path)
+                        raise IOError(f"续传范围无效: 本地 {offset} 字节，远端 {total} 字节")
+                else:
+                    response.raise_for_status()
+                    if response.status_code == 206:
+                        total = _content_range_total(response.headers.get("Content-Range"))
+                        mode = "ab"
+                    else:
+                        # 服务端忽略了 Range，从头下载
+                        length = response.headers.get("Content-Length")
+                        total = int(length) if length else None
+                        mode = "wb"
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                            f.write(chunk)
+
+            size = os.path.getsize(part_path)
+            if total is not None and size != total:
+                raise IOError(f"下载不完整: {size}/{total} 字节")
+            if expected_size is not None and size != expected_size:
+                os.remove(part_path)
+                raise IOError(f"文件大小不一致: {size} != {expected_size}")
+            with open(part_path, "rb") as f:
+                if f.read(5) != b"%PDF-":
+                    os.remove(part_path)
+                    raise IOError("返回内容不是PDF")
+            sha256 = file_sha256(part_path)
+            if expected_sha256 is not None and sha256 != expected_sha256:
+                os.remove(part_path)
+                raise IOError("sha256 校验失败")
+
+            os.replace(part_path, filepath)
+            return size, sha256
+
+        except (requests.RequestException, IOError) as e:
+            last_error = e
+            print(f"   第 {attempt + 1} 次下载失败 {url}: {e}")
+
+    raise IOError(f"下载失败 {url}: {last_error}")
+
+
+def _content_range_total(content_range):
+    """解析 Content-Range 头中的文件总大小（bytes 0-99/1234 或 bytes */1234）"""
+    if not content_range or "/" not in content_range:
+        return None
+    total = content_range.rsplit("/", 1)[1].strip()
+    return int(total) if total.isdigit() else None
+
+
+def download_pdfs(tasks, download_dir, workers=DOWNLOAD_WORKERS, min_interval=HOST_MIN_INTERVAL,
+                  verify_checksum=False):
+    """
+    并发下载一批PDF
+
+    Args:
+        tasks: [{"paper_id", "url", "filename"}]
+        download_dir: 下载目录（清单文件保存在其中）
+        workers: 下载线程数
+        min_interval: 同一主机的请求间隔（秒）
+        verify_checksum: 跳过已下载文件前是否重新计算 sha256
+
+    Returns:
+        {paper_id: {"filename", "status": "downloaded" | "skipped" | "failed", "error"}}
+    """
+    os.makedirs(download_dir, exist_ok=True)
+    manifest = DownloadManifest(os.path.join(download_dir, MANIFEST_NAME))
+    rate_limiter = HostRateLimiter(min_interval)
+    results = {}
+
+    with make_download_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(download_task, session, task, download_dir, manifest, rate_limiter, verify_checksum): task
+            for task in tasks
+        }
+        for future in as_completed(futures):
+            results[futures[future]["paper_id"]] = future.result()
+
+    return results
+
+
+def download_task(session, task, download_dir, manifest, rate_limiter, verify_checksum=False):
+    """下载单个任务并记录到清单，返回 {"filename", "status", "error"}"""
+    filepath = os.path.join(download_dir, task["filename"])
+    if manifest.is_complete(task["filename"], filepath, verify_checksum):
+        return {"filename": task["filename"], "status": "skipped"}
+    try:
+        size, sha256 = download_file(session, task["url"], filepath, rate_limiter)
+        manifest.record(task["filename"], task["paper_id"], task["url"], size, sha256)
+        return {"filename": task["filename"], "status": "downloaded"}
+    except Exception as e:
+        return {"filename": task["filename"], "status": "failed", "error": str(e)}
+
+
+def build_search(query, max_results=10, categories=None, start_date=None, end_date=None):
+    """
+    构建按提交时间降序的 arXiv 查询
 
     Args:
         query: 搜索词
         max_results: 最大结果数
-        download_dir: 下载目录
         categories: 论文分类过滤
-        [start_date, end_date]: 下载论文的时间范围
+        [start_date, end_date]: 论文的时间范围（YYYYMMDD）
     """
-
-    os.makedirs(download_dir, exist_ok=True)
-    client = arxiv.Client()
-
     # 构建分类查询
     category_query = ""
     if categories:
         if isinstance(categories, str):
             categories = [categories]
-        category_query = f" AND (cat:{" OR cat:".join(categories)})"
+        category_query = " AND (cat:" + " OR cat:".join(categories) + ")"
 
     # 构建时间查询
     date_query = ""
-
-    start_date = start_date + '000000'
-    end_date = end_date + '235959'
-    date_query = f" AND submittedDate:[{start_date} TO {end_date}]"
+    if start_date and end_date:
+        date_query = f" AND submittedDate:[{start_date}000000 TO {end_date}235959]"
 
     # 完整查询
     full_query = f"({query}){category_query}{date_query}"
 
     print(full_query)
 
-    search = arxiv.Search(
+    return arxiv.Search(
         query=full_query,
         max_results=max_results,
         sort_by=arxiv.SortCriterion.SubmittedDate,
         sort_order=arxiv.SortOrder.Descending
     )
 
-    downloaded_papers = []
+
+def result_to_paper(result):
+    """把 arxiv.Result 转换为 (论文信息, 下载任务)"""
+    # 生成文件名：标题 + 作者
+    authors_str = "_".join([author.name.split()[-1] for author in result.authors[:2]])
+    filename = f"{result.title[:50]}_{authors_str}.pdf"
+    filename = filename.replace("/", "-").replace("\\", "-").replace("'", "").replace(":", " ")
+
+    paper_info = {
+        'id': result.entry_id,
+        'title': result.title,
+        'title_ch': None,
+        'authors': [author.name for author in result.authors],
+        'published': result.published,
+        'summary': result.summary,
+        'summary_ch': None,
+        'categories': result.categories,
+        'filepath': filename
+    }
+    task = {"paper_id": result.entry_id, "url": result.pdf_url, "filename": filename}
+    return paper_info, task
+
+
+def advanced_paper_download(
+        query,
+        max_results=10,
+        download_dir="./papers",
+        categories=None,
+        start_date=None,
+        end_date=None,
+        workers=DOWNLOAD_WORKERS
+):
+    """
+    高级论文下载功能
+
+    Args:
+        query: 搜索词
+        max_results: 最大结果数
+        download_dir: 下载目录
+        categories: 论文分类过滤
+        [start_date, end_date]: 下载论文的时间范围
+        workers: 并发下载的线程数
+    """
+
+    os.makedirs(download_dir, exist_ok=True)
+    client = arxiv.Client()
+    search = build_search(query, max_results, categories, start_date, end_date)
+
+    candidates = []
+    tasks = []
 
     for i, result in enumerate(client.results(search)):
         try:
-            # 生成文件名：标题 + 作者
-            authors_str = "_".join([author.name.split()[-1] for author in result.authors[:2]])
-            filename = f"{result.title[:50]}_{authors_str}.pdf"
-            filename = filename.replace("/", "-").replace("\\", "-").replace("'", "").replace(":", " ")
-            filepath = os.path.join(download_dir, filename)
-
-            # 下载论文
-            print(result.title, result.entry_id, filename)
-            res = result.download_pdf(filename=filepath)
-
-            paper_info = {
-                'id': result.entry_id,
-                'title': result.title,
-                'title_ch': None,
-                'authors': [author.name for author in result.authors],
-                'published': result.published,
-                'summary': result.summary,
-                'summary_ch': None,
-                'categories': result.categories,
-                'filepath': filename
-            }
+            paper_info, task = result_to_paper(result)
+            print(result.title, result.entry_id, task["filename"])
+            candidates.append(paper_info)
+            tasks.append(task)
 
-            downloaded_papers.append(paper_info)
+        except Exception as e:
+            print(f"❌ 解析失败 {result.title}: {e}")
 
-            print(f"✅ 下载: {result.title}")
-            print(f"   作者: {', '.join(paper_info['authors'][:3])}")
-            print(f"   分类: {', '.join(paper_info['categories'])}")
-            print(f"   文件: {filename}")
-            print()
+    # 并发下载（断点续传，已下载的文件直接跳过）
+    results = download_pdfs(tasks, download_dir, workers=workers)
 
-        except Exception as e:
-            print(f"❌ 下载失败 {result.title}: {e}")
+    downloaded_papers = []
+    for paper_info in candidates:
+        result = results.get(paper_info['id'])
+        if result is None or result["status"] == "failed":
+            print(f"❌ 下载失败 {paper_info['title']}: {result['error'] if result else '未知错误'}")
+            continue
+
+        downloaded_papers.append(paper_info)
+
+        print(f"✅ {'已存在' if result['status'] == 'skipped' else '下载'}: {paper_info['title']}")
+        print(f"   作者: {', '.join(paper_info['authors'][:3])}")
+        print(f"   分类: {', '.join(paper_info['categories'])}")
+        print(f"   文件: {paper_info['filepath']}")
+        print()
 
     return downloaded_papers
 
 
-def save_papers_to_mysql_with_pandas(papers, db_config):
+def create_db_engine(db_config):
+    """根据配置创建数据库引擎"""
+    connection_string = f"mysql+pymysql://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
+    return create_engine(connection_string)
+
+
+# 抓取数据覆盖的列；title_ch/summary_ch/read/favorite 及标签由用户或翻译流程维护，重复入库时保留
+UPSERT_COLUMNS = ["id", "title", "authors", "published", "summary", "categories", "filepath"]
+UPSERT_CHUNK_SIZE = 500
+
+
+def _normalize_paper(paper):
+    """转换为入库参数：JSON 字段序列化，发布时间转为 UTC 的无时区时间"""
+    published = paper.get('published')
+    if isinstance(published, str):
+        published = datetime.fromisoformat(published)
+    if published is not None and published.tzinfo is not None:
+        published = published.astimezone(timezone.utc).replace(tzinfo=None)
+    return {
+        "id": paper['id'],
+        "title": paper.get('title'),
+        "authors": json.dumps(paper.get('authors') or []),
+        "published": published,
+        "summary": paper.get('summary'),
+        "categories": json.dumps(paper.get('categories') or []),
+        "filepath": paper.get('filepath')
+    }
+
+
+def _same_row(row, existing):
+    """抓取到的数据与库中已有行是否一致（filepath 为空表示不覆盖）"""
+    for column in ("title", "summary"):
+        if row[column] != existing[column]:
+            return False
+    for column in ("authors", "categories"):
+        try:
+            if json.loads(existing[column] or "[]") != json.loads(row[column]):
+                return False
+        except json.JSONDecodeError:
+            return False
+    if row["filepath"] is not None and row["filepath"] != existing["filepath"]:
+        return False
+    existing_published = existing["published"]
+    if isinstance(existing_published, str):
+        existing_published = datetime.fromisoformat(existing_published)
+    return row["published"] == existing_published
+
+
+def _upsert_statement(dialect):
+    """按方言生成幂等的插入/更新语句"""
+    columns = ", ".join(UPSERT_COLUMNS)
+    values = ", ".join(f":{column}" for column in UPSERT_COLUMNS)
+    updated = [column for column in UPSERT_COLUMNS if column != "id"]
+    if dialect == "mysql":
+        # pymysql 会把 executemany 改写为一条多行 INSERT
+        assignments = ", ".join(
+            "filepath = COALESCE(VALUES(filepath), filepath)" if column == "filepath" else f"{column} = VALUES({column})"
+            for column in updated
+        )
+        return text(f"INSERT INTO papers ({columns}) VALUES ({values}) ON DUPLICATE KEY UPDATE {assignments}")
+    # SQLite（3.24+）作为本地替身
+    assignments = ", ".join(
+        "filepath = COALESCE(excluded.filepath, papers.filepath)" if column == "filepath" else f"{column} = excluded.{column}"
+        for column in updated
+    )
+    return text(f"INSERT INTO papers ({columns}) VALUES ({values}) ON CONFLICT (id) DO UPDATE SET {assignments}")
+
+
+def write_papers(engine, papers, chunk_size=UPSERT_CHUNK_SIZE):
+    """
+    幂等地批量写入论文，并同步维护 paper_categories 表
+
+    已存在的论文只更新抓取得到的列，保留中文翻译、阅读/收藏状态和标签；
+    内容未变化的论文不写库。重复运行或时间窗口重叠时不会产生重复行。
+
+    Returns:
+        {"inserted", "updated", "unchanged"}
+    """
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    # 同一批次中重复的ID以最后一次为准
+    rows = list({paper['id']: _normalize_paper(paper) for paper in papers}.values())
+    statement = _upsert_statement(engine.dialect.name)
+    has_categories = inspect(engine).has_table('paper_categories')
+    insert_ignore = "INSERT OR IGNORE" if engine.dialect.name == "sqlite" else "INSERT IGNORE"
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        with engine.begin() as connection:
+            existing = {
+                row["id"]: row for row in connection.execute(
+                    text("SELECT id, title, authors, published, summary, categories, filepath "
+                         "FROM papers WHERE id IN :ids").bindparams(bindparam("ids", expanding=True)),
+                    {"ids": [row["id"] for row in chunk]}
+                ).mappings()
+            }
+
+            changed = []
+            for row in chunk:
+                current = existing.get(row["id"])
+                if current is None:
+                    counts["inserted"] += 1
+                elif _same_row(row, current):
+                    counts["unchanged"] += 1
+                    continue
+                else:
+                    counts["updated"] += 1
+                changed.append(row)
+            if not changed:
+                continue
+
+            connection.execute(statement, changed)
+
+            # 重建变化论文的分类行（表由 server.py 启动时创建）
+            if has_categories:
+                connection.execute(
+                    text("DELETE FROM paper_categories WHERE paper_id IN :ids")
+                    .bindparams(bindparam("ids", expanding=True)),
+                    {"ids": [row["id"] for row in changed]}
+                )
+                category_rows = [{"paper_id": row["id"], "category": category}
+                                 for row in changed for category in json.loads(row["categories"])]
+                if category_rows:
+                    connection.execute(
+                        text(f"{insert_ignore} INTO paper_categories (paper_id, category) "
+                             "VALUES (:paper_id, :category)"),
+                        category_rows
+                    )
+
+    return counts
+
+
+def update_filepaths(engine, filepaths):
+    """批量回填下载完成的PDF文件名 {paper_id: filename}"""
+    with engine.begin() as connection:
+        connection.execute(
+            text("UPDATE papers SET filepath = :filepath WHERE id = :paper_id"),
+            [{"paper_id": paper_id, "filepath": filepath} for paper_id, filepath in filepaths.items()]
+        )
+
+
+def save_papers_to_mysql(papers, db_config):
     """
-    使用pandas将论文信息保存到MySQL数据库
+    将论文信息幂等地写入MySQL数据库（见 write_papers）
 
     Args:
         papers: 论文信息列表
         db_config: 数据库配置字典
     """
     try:
-        # 创建数据库连接字符串
-        connection_string = f"mysql+pymysql://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
-        engine = create_engine(connection_string)
-        # 转换数据为DataFrame
+        if papers:
+            counts = write_papers(create_db_engine(db_config), papers)
+            print(f"✅ 成功将 {len(papers)} 篇论文保存到数据库: 新增 {counts['inserted']}，"
+                  f"更新 {counts['updated']}，未变化 {counts['unchanged']}")
+
+    except Exception as e:
+        print(f"❌ 数据库操作出错: {e}")
+
+
+# 旧名称，保留给已有的调用方
+save_papers_to_mysql_with_pandas = save_papers_to_mysql
+
+
+class IngestPipeline:
+    """
+    元数据抓取、PDF下载和数据库写入的流水线
+
+    生产者（调用 run 的线程）逐条产出论文元数据：元数据先进入写库队列，
+    下载任务进入下载队列；下载线程完成后把文件名送回写库队列，由写库线程
+    分批插入论文（filepath 为空）并回填 filepath。队列都有容量上限，
+    下载跟不上时生产者阻塞，max_results 很大时也不会把全部结果堆在内存里。
+    """
+
+    def __init__(self, engine, download_dir, workers=DOWNLOAD_WORKERS, min_interval=HOST_MIN_INTERVAL,
+                 queue_size=PIPELINE_QUEUE_SIZE, batch_size=DB_BATCH_SIZE, batch_interval=DB_BATCH_INTERVAL):
+        self.engine = engine
+        self.download_dir = download_dir
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_interval = batch_interval
+        self.rate_limiter = HostRateLimiter(min_interval)
+        self.manifest = None
+        self.download_queue = queue.Queue(maxsize=queue_size)
+        self.db_queue = queue.Queue(maxsize=queue_size)
+        self.stats = {"produced": 0, "inserted": 0, "updated": 0, "unchanged": 0, "insert_failed": 0, "downloaded": 0,
+                      "skipped": 0, "download_failed": 0, "filepaths": 0}
+        # 下载失败的任务，供调用方稍后重试
+        self.failed_downloads = []
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name, value=1):
+        with self._stats_lock:
+            self.stats[name] += value
+
+    def run(self, papers):
+        """
+        执行流水线
+
+        Args:
+            papers: 可迭代的 (论文信息, 下载任务)，例如 result_to_paper 的结果
+
+        Returns:
+            各阶段的计数
+        """
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.manifest = DownloadManifest(os.path.join(self.download_dir, MANIFEST_NAME))
+
+        writer = threading.Thread(target=self._write_loop, name="ingest-db", daemon=True)
+        writer.start()
+        with make_download_session(self.workers) as session:
+            downloaders = [threading.Thread(target=self._download_loop, args=(session,),
+                                            name=f"ingest-download-{i}", daemon=True)
+                           for i in range(self.workers)]
+            for thread in downloaders:
+                thread.start()
+
+            try:
+                for paper_info, task in papers:
+                    # 元数据先入库，filepath 在下载完成后回填
+                    self.db_queue.put(("insert", dict(paper_info, filepath=None)))
+                    self.download_queue.put(task)
+                    self._count("produced")
+            finally:
+                for _ in downloaders:
+                    self.download_queue.put(None)
+                for thread in downloaders:
+                    thread.join()
+                self.db_queue.put(None)
+                writer.join()
+
+        return dict(self.stats)
+
+    def _download_loop(self, session):
+        while True:
+            task = self.download_queue.get()
+            if task is None:
+                return
+            result = download_task(session, task, self.download_dir, self.manifest, self.rate_limiter)
+            if result["status"] == "failed":
+                self._count("download_failed")
+                with self._stats_lock:
+                    self.failed_downloads.append(task)
+                print(f"❌ 下载失败 {task['paper_id']}: {result['error']}")
+                continue
+            self._count(result["status"])
+            self.db_queue.put(("filepath", task["paper_id"], task["filename"]))
+
+    def _write_loop(self):
+        papers, filepaths = [], {}
+        deadline = None
+        done = False
+        while not done:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = self.db_queue.get(timeout=timeout)
+            except queue.Empty:
+                item = ()
+            if item is None:
+                done = True
+            elif item:
+                if item[0] == "insert":
+                    papers.append(item[1])
+                else:
+                    filepaths[item[1]] = item[2]
+                if deadline is None:
+                    deadline = time.monotonic() + self.batch_interval
 
+            pending = len(papers) + len(filepaths)
+            if pending and (done or pending >= self.batch_size or time.monotonic() >= deadline):
+                self._flush(papers, filepaths)
+                papers, filepaths = [], {}
+                deadline = None
+
+    def _flush(self, papers, filepaths):
+        # 先插入元数据再回填文件名：同一批次中的回填依赖刚插入的行
         if papers:
-            df = pd.DataFrame(papers)
-            # 处理JSON字段
-            df['authors'] = df['authors'].apply(lambda x: json.dumps(x) if isinstance(x, list) else x)
-            df['categories'] = df['categories'].apply(lambda x: json.dumps(x) if isinstance(x, list) else x)
+            try:
+                counts = write_papers(self.engine, papers)
+                for name, value in counts.items():
+                    self._count(name, value)
+                print(f"✅ 写入 {len(papers)} 篇论文元数据: 新增 {counts['inserted']}，"
+                      f"更新 {counts['updated']}，未变化 {counts['unchanged']}")
+            except Exception as e:
+                self._count("insert_failed", len(papers))
+                print(f"❌ 写入论文元数据失败: {e}")
+        if filepaths:
+            try:
+                update_filepaths(self.engine, filepaths)
+                self._count("filepaths", len(filepaths))
+            except Exception as e:
+                print(f"❌ 回填PDF文件名失败: {e}")
 
-            # 保存到数据库
-            df.to_sql('papers', con=engine, if_exists='append', index=False)
 
-            print(f"✅ 成功将 {len(papers)} 篇论文保存到数据库")
+def ingest_papers(query, db_config, max_results=10, download_dir="./papers", categories=None,
+                  start_date=None, end_date=None, workers=DOWNLOAD_WORKERS):
+    """
+    以流水线方式抓取、下载并入库论文
 
-    except Exception as e:
-        print(f"❌ 数据库操作出错: {e}")
+    Args:
+        query, max_results, categories, start_date, end_date: 同 advanced_paper_download
+        db_config: 数据库配置字典
+        download_dir: 下载目录
+        workers: 并发下载的线程数
+    """
+    client = arxiv.Client()
+    search = build_search(query, max_results, categories, start_date, end_date)
 
+    def produce():
+        for result in client.results(search):
+            try:
+                yield result_to_paper(result)
+            except Exception as e:
+                print(f"❌ 解析失败 {result.title}: {e}")
 
-if __name__ == "__main__":
-    papers = advanced_paper_download(
-        query="large language model",
-        max_results=3,
-        categories="cs.AI",
-        start_date='20251101',
-        end_date='20251104',
-        download_dir="./llm_papers"
-    )
+    pipeline = IngestPipeline(create_db_engine(db_config), download_dir, workers=workers)
+    return pipeline.run(produce())
+
+
+class HarvestState:
+    """
+    增量抓取的水位状态
+
+    按 (查询, 分类集合) 保存最近一次见到的提交时间、最近抓取过的论文ID
+    和尚未下载成功的PDF任务，以 JSON 文件持久化。
+    """
+
+    def __init__(self, path=HARVEST_STATE_PATH):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(query, categories):
+        categories = [categories] if isinstance(categories, str) else sorted(categories or [])
+        return json.dumps([" ".join(query.split()), categories], ensure_ascii=False)
+
+    def get(self, query, categories):
+        """返回 (水位时间, 最近的论文ID列表（由旧到新）)，首次运行时水位为 None"""
+        entry = self.entries.get(self.key(query, categories), {})
+        last_submitted = entry.get("last_submitted")
+        return (datetime.fromisoformat(last_submitted) if last_submitted else None), entry.get("recent_ids", [])
+
+    def pending_downloads(self, query, categories):
+        """之前运行中下载失败、尚待重试的任务 [{"paper_id", "url", "filename"}]"""
+        return list(self.entries.get(self.key(query, categories), {}).get("pending_downloads", []))
+
+    def update(self, query, categories, last_submitted=None, recent_ids=None, pending_downloads=None):
+        """更新水位（last_submitted 为 None 时保持不变）和待重试的下载任务"""
+        entry = self.entries.setdefault(self.key(query, categories), {})
+        if last_submitted is not None:
+            entry["last_submitted"] = last_submitted.isoformat()
+            entry["recent_ids"] = list(recent_ids)[-HARVEST_RECENT_IDS:]
+        if pending_downloads is not None:
+            entry["pending_downloads"] = list(pending_downloads)
+        entry["last_run"] = datetime.now().isoformat(timespec="seconds")
+        # 先写临时文件再替换，避免中断时状态损坏
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def retry_pending_downloads(engine, tasks, download_dir, workers=DOWNLOAD_WORKERS):
+    """
+    重试之前下载失败的PDF，成功的回填 papers.filepath
 
-    print(f"下载完成! 共下载 {len(papers)} 篇论文")
+    Returns:
+        (回填的论文数, 仍然失败的任务)
+    """
+    results = download_pdfs(tasks, download_dir, workers=workers)
+    filepaths = {task["paper_id"]: task["filename"] for task in tasks
+                 if results[task["paper_id"]]["status"] != "failed"}
+    if filepaths:
+        try:
+            update_filepaths(engine, filepaths)
+        except Exception as e:
+            print(f"❌ 回填PDF文件名失败: {e}")
+            return 0, tasks
+    return len(filepaths), [task for task in tasks if task["paper_id"] not in filepaths]
+
+
+def harvest_papers(query, db_config=None, categories=None, download_dir="./papers", state_path=HARVEST_STATE_PATH,
+                   max_results=HARVEST_MAX_RESULTS, initial_days=HARVEST_INITIAL_DAYS, workers=DOWNLOAD_WORKERS,
+                   engine=None):
+    """
+    增量抓取：只获取水位之后提交的论文
+
+    查询按提交时间降序分页，遇到水位之前的论文或已抓取过的ID即停止翻页；
+    流水线完成且元数据全部写入后才推进水位，失败的运行下次会重新抓取。
+    下载失败的PDF记录在状态文件中，每次运行开始时先重试并回填 filepath。
+
+    Args:
+        query, categories: 查询条件，水位按二者分别保存
+        db_config: 数据库配置字典（或直接传入 engine）
+        download_dir: 下载目录
+        state_path: 水位状态文件
+        max_results: 单次运行最多抓取的论文数
+        initial_days: 首次运行回溯的天数
+        workers: 并发下载的线程数
+
+    Returns:
+        流水线计数，外加 new（新论文数）、last_submitted（新水位）、
+        redownloaded（重试成功的PDF数）和 pending_downloads（仍待重试的PDF数）
+    """
+    state = HarvestState(state_path)
+    last_submitted, recent_ids = state.get(query, categories)
+    if engine is None:
+        engine = create_db_engine(db_config)
+
+    redownloaded, pending = 0, state.pending_downloads(query, categories)
+    if pending:
+        print(f"重试 {len(pending)} 个之前下载失败的PDF")
+        redownloaded, pending = retry_pending_downloads(engine, pending, download_dir, workers)
+
+    known_ids = set(recent_ids)
+    now = datetime.now(timezone.utc)
+    since = last_submitted or now - timedelta(days=initial_days)
+
+    # 日期条件只是缩小查询范围，精确的截止由水位和已知ID判断
+    client = arxiv.Client()
+    search = build_search(query, max_results, categories, since.strftime("%Y%m%d"), now.strftime("%Y%m%d"))
+    seen = []
+
+    def produce():
+        for result in client.results(search):
+            if result.entry_id in known_ids or (last_submitted is not None and result.published < last_submitted):
+                print(f"已到达上次抓取的位置: {result.entry_id}")
+                return
+            seen.append((result.published, result.entry_id))
+            try:
+                yield result_to_paper(result)
+            except Exception as e:
+                print(f"❌ 解析失败 {result.title}: {e}")
+
+    pipeline = IngestPipeline(engine, download_dir, workers=workers)
+    stats = pipeline.run(produce())
+
+    # 水位越过的论文不会再被抓取，下载失败的PDF只能靠状态文件重试
+    pending = list({task["paper_id"]: task for task in pending + pipeline.failed_downloads}.values())
+    advanced = None
+    if stats["insert_failed"]:
+        # 元数据没有全部写入，保持原水位，下次运行重新抓取这些论文
+        print(f"⚠️ {stats['insert_failed']} 篇论文写入失败，水位保持不变")
+    elif seen:
+        newest = max(published for published, _ in seen)
+        if last_submitted is None or newest > last_submitted:
+            last_submitted = newest
+        advanced = last_submitted
+        # 结果按提交时间降序，最近的ID放在列表末尾
+        seen_ids = [paper_id for _, paper_id in sorted(seen)]
+        recent_ids = [paper_id for paper_id in recent_ids if paper_id not in known_ids.intersection(seen_ids)] + seen_ids
+    state.update(query, categories, advanced, recent_ids, pending)
+
+    stats["redownloaded"] = redownloaded
+    stats["pending_downloads"] = len(pending)
+    stats["new"] = len(seen)
+    stats["last_submitted"] = last_submitted.isoformat() if last_submitted else None
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="下载 arXiv 论文并入库")
+    parser.add_argument("--query", default="large language model", help="搜索词")
+    parser.add_argument("--categories", nargs="*", default=["cs.AI"], help="论文分类")
+    parser.add_argument("--max-results", type=int, default=None, help="最大结果数")
+    parser.add_argument("--start-date", default="20251101", help="开始日期 YYYYMMDD（非增量模式）")
+    parser.add_argument("--end-date", default="20251104", help="结束日期 YYYYMMDD（非增量模式）")
+    parser.add_argument("--download-dir", default="./llm_papers", help="下载目录")
+    parser.add_argument("--workers", type=int, default=DOWNLOAD_WORKERS, help="并发下载的线程数")
+    parser.add_argument("--harvest", action="store_true", help="增量抓取：只获取上次运行之后提交的论文")
+    parser.add_argument("--state", default=HARVEST_STATE_PATH, help="增量抓取的水位状态文件")
+    parser.add_argument("--interval", type=float, default=0, help="增量抓取的间隔（分钟），0 表示只运行一次")
+    args = parser.parse_args()
 
     db_config = {
         'host': 'localhost',
@@ -142,5 +840,35 @@ if __name__ == "__main__":
         'password': 'root123'
     }
 
-    # 使用pandas保存到数据库
-    save_papers_to_mysql_with_pandas(papers, db_config)
\ No newline at end of file
+    if args.harvest:
+        while True:
+            try:
+                stats = harvest_papers(
+                    query=args.query,
+                    db_config=db_config,
+                    categories=args.categories,
+                    download_dir=args.download_dir,
+                    state_path=args.state,
+                    max_results=args.max_results or HARVEST_MAX_RESULTS,
+                    workers=args.workers
+                )
+                print(f"增量抓取完成! {stats}")
+            except Exception as e:
+                print(f"❌ 增量抓取失败: {e}")
+            if args.interval <= 0:
+                break
+            time.sleep(args.interval * 60)
+    else:
+        # 元数据抓取、PDF下载和入库并行进行
+        stats = ingest_papers(
+            query=args.query,
+            db_config=db_config,
+            max_results=args.max_results or 3,
+            categories=args.categories,
+            start_date=args.start_date,
+            end_date=args.end_date,
+            download_dir=args.download_dir,
+            workers=args.workers
+        )
+
+        print(f"完成! {stats}")
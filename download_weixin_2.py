@@ -4,6 +4,270 @@ from urllib.parse import urlparse
 import hashlib
 from bs4 import BeautifulSoup
 import re
+import json
+import time
+import random
+import argparse
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from sqlalchemy import create_engine, text
+
+
+# 并发抓取的线程数，以及同一主机同时进行的请求数
+CRAWL_WORKERS = 8
+HOST_MAX_CONCURRENCY = 2
+# 同一主机两次请求开始之间的最小间隔（秒）
+HOST_MIN_INTERVAL = 1.0
+# 单个URL的最大尝试次数、请求超时（秒）和退避时间（秒）
+CRAWL_RETRIES = 3
+CRAWL_TIMEOUT = 10
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+# 保存目录中记录 ETag / Last-Modified 的清单文件
+CRAWL_MANIFEST_NAME = "crawl_manifest.json"
+
+# 完整的请求头信息
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate, br',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0'
+}
+
+
+def url_filename(url: str) -> str:
+    """由URL生成保存的文件名（域名 + URL 的 md5 前8位），同一URL只抓取一次"""
+    parsed_url = urlparse(url)
+    domain = parsed_url.netloc
+    path_hash = hashlib.md5(url.encode()).hexdigest()[:8]
+    return f"{domain}_{path_hash}.html"
+
+
+class HostScheduler:
+    """
+    按主机调度请求
+
+    同一主机最多 max_concurrency 个请求同时进行，且相邻请求的开始时间至少间隔 min_interval 秒。
+    """
+
+    def __init__(self, max_concurrency=HOST_MAX_CONCURRENCY, min_interval=HOST_MIN_INTERVAL):
+        self.max_concurrency = max_concurrency
+        self.min_interval = min_interval
+        self._semaphores = {}
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, host):
+        with self._lock:
+            semaphore = self._semaphores.get(host)
+            if semaphore is None:
+                semaphore = self._semaphores[host] = threading.BoundedSemaphore(self.max_concurrency)
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_slot.get(host, now))
+                self._next_slot[host] = start + self.min_interval
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+class CrawlManifest:
+    """
+    已抓取页面的清单
+
+    以 JSON 保存 {文件名: {"url", "etag", "last_modified", "content_length", "fetched_at"}}，
+    重新抓取时带上 If-None-Match / If-Modified-Since，未变化的页面服务器返回 304。
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"⚠️ 读取抓取清单失败，将重新抓取: {e}")
+
+    def conditional_headers(self, filename, filepath):
+        """已保存的页面对应的条件请求头（文件不存在时不带）"""
+        entry = self.entries.get(filename)
+        if entry is None or not os.path.exists(filepath):
+            return {}
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, filename, url, etag, last_modified, content_length):
+        with self._lock:
+            self.entries[filename] = {
+                "url": url,
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_length": content_length,
+                "fetched_at": datetime.now().isoformat(timespec="seconds")
+            }
+            self._save()
+
+    def _save(self):
+        # 先写临时文件再替换，避免中断时清单损坏
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+
+def make_crawl_session(workers=CRAWL_WORKERS):
+    """创建共享连接池（keep-alive）的 HTTP 会话"""
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def _retry_delay(response, attempt):
+    """优先使用 Retry-After（秒），否则指数退避加全抖动"""
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.strip().isdigit():
+        return min(RETRY_MAX_DELAY, int(retry_after))
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+
+
+def fetch_page(session, url, save_dir, manifest, scheduler, retries=CRAWL_RETRIES, timeout=CRAWL_TIMEOUT):
+    """
+    抓取单个页面并保存
+
+    限流（429）、5xx 和网络错误会退避重试，其它 4xx 直接失败；
+    页面未变化（304）时保留已保存的文件。
+
+    Returns:
+        包含结果的字典，status 为 "fetched" | "not_modified" | "failed"
+    """
+    filename = url_filename(url)
+    filepath = os.path.join(save_dir, filename)
+    host = urlparse(url).netloc
+    headers = manifest.conditional_headers(filename, filepath)
+    last_error = None
+
+    for attempt in range(retries):
+        response = None
+        try:
+            with scheduler.slot(host):
+                response = session.get(url, headers=headers, timeout=timeout)
+
+            if response.status_code == 304:
+                return {
+                    'success': True,
+                    'status': 'not_modified',
+                    'url': url,
+                    'filename': filename,
+                    'filepath': filepath,
+                    'status_code': 304
+                }
+            if response.status_code != 429 and response.status_code < 500:
+                response.raise_for_status()
+
+                # 设置编码
+                response.encoding = response.apparent_encoding
+                html_content = response.text
+                article = WeChatArticleParser().parse(html_content)
+
+                # 保存文件
+                with open(filepath, 'w', encoding='utf-8') as f:
+                    f.write(html_content)
+                manifest.record(filename, url, response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"), len(html_content))
+
+                return {
+                    'success': True,
+                    'status': 'fetched',
+                    'url': url,
+                    'filename': filename,
+                    'filepath': filepath,
+                    'title': article['title'],
+                    'content_length': len(html_content),
+                    'status_code': response.status_code
+                }
+            last_error = f"HTTP {response.status_code}"
+
+        except requests.HTTPError as e:
+            # 其它 4xx 重试也不会成功
+            return {'success': False, 'status': 'failed', 'url': url, 'error': str(e)}
+        except (requests.RequestException, IOError) as e:
+            last_error = str(e)
+
+        if attempt + 1 < retries:
+            delay = _retry_delay(response, attempt)
+            print(f"   第 {attempt + 1} 次抓取失败 {url}: {last_error}，{delay:.1f} 秒后重试")
+            time.sleep(delay)
+
+    return {'success': False, 'status': 'failed', 'url': url, 'error': last_error}
+
+
+def crawl_urls(urls, save_dir: str = "html_files", workers=CRAWL_WORKERS, host_concurrency=HOST_MAX_CONCURRENCY,
+               min_interval=HOST_MIN_INTERVAL) -> list:
+    """
+    批量抓取页面
+
+    按 URL 的 md5 去重后并发抓取，所有请求共享一个 keep-alive 会话，按主机限制并发和请求间隔。
+
+    Args:
+        urls: 要爬取的URL列表
+        save_dir: 保存目录（清单文件保存在其中）
+        workers: 抓取线程数
+        host_concurrency: 同一主机的最大并发请求数
+        min_interval: 同一主机的请求间隔（秒）
+
+    Returns:
+        每个（去重后的）URL 的结果字典，顺序与输入一致
+    """
+    os.makedirs(save_dir, exist_ok=True)
+    # 重复的URL以第一次出现的位置为准
+    first_seen = {}
+    for url in urls:
+        first_seen.setdefault(url_filename(url), url)
+    unique_urls = list(first_seen.values())
+    manifest = CrawlManifest(os.path.join(save_dir, CRAWL_MANIFEST_NAME))
+    scheduler = HostScheduler(host_concurrency, min_interval)
+    results = {}
+
+    with make_crawl_session(workers) as session, ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(fetch_page, session, url, save_dir, manifest, scheduler): url
+            for url in unique_urls
+        }
+        for future in as_completed(futures):
+            results[futures[future]] = future.result()
+
+    return [results[url] for url in unique_urls]
+
+
+def weixin_urls_from_db(db_config, engine=None):
+    """数据库中所有微信公众号文章的URL（论文ID即文章URL）"""
+    if engine is None:
+        connection_string = f"mysql+pymysql://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
+        engine = create_engine(connection_string)
+    with engine.connect() as connection:
+        rows = connection.execute(text("SELECT id FROM papers WHERE id LIKE :pattern ORDER BY id"),
+                                  {"pattern": "%://mp.weixin.qq.com/%"})
+        return [row.id for row in rows]
 
 
 def simple_crawl(url: str, save_dir: str = "html_files") -> dict:
@@ -17,61 +281,7 @@ def simple_crawl(url: str, save_dir: str = "html_files") -> dict:
     Returns:
         包含结果的字典
     """
-    # 创建保存目录
-    os.makedirs(save_dir, exist_ok=True)
-    wechat_parser = WeChatArticleParser()
-
-    # 添加完整的请求头信息
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-        'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate, br',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-        'Sec-Fetch-Dest': 'document',
-        'Sec-Fetch-Mode': 'navigate',
-        'Sec-Fetch-Site': 'none',
-        'Cache-Control': 'max-age=0'
-    }
-
-    try:
-        # 发送请求，添加headers和timeout
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-
-        # 设置编码
-        response.encoding = response.apparent_encoding
-        html_content = response.text
-
-        parsed_html = wechat_parser.parse(html_content)
-
-        # 生成文件名
-        parsed_url = urlparse(url)
-        domain = parsed_url.netloc
-        path_hash = hashlib.md5(url.encode()).hexdigest()[:8]
-        filename = f"{domain}_{path_hash}.html"
-        filepath = os.path.join(save_dir, filename)
-
-        # 保存文件
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html_content)
-
-        return {
-            'success': True,
-            'url': url,
-            'filename': filename,
-            'filepath': filepath,
-            'content_length': len(html_content),
-            'status_code': response.status_code
-        }
-
-    except Exception as e:
-        return {
-            'success': False,
-            'url': url,
-            'error': str(e)
-        }
+    return crawl_urls([url], save_dir, workers=1)[0]
 
 
 # 完整的微信公众号文章解析器类
@@ -191,11 +401,45 @@ def quick_crawl():
     result = simple_crawl(url)
     if result['success']:
         print(f"成功爬取: {result['filename']}")
-        print(f"文件大小: {result['content_length']} 字符")
+        print(f"文件大小: {result.get('content_length', 0)} 字符")
         print(f"保存路径: {result['filepath']}")
     else:
         print(f"爬取失败: {result['error']}")
 
 
+def batch_crawl(urls, save_dir="html_files", workers=CRAWL_WORKERS):
+    """批量爬取并打印汇总"""
+    start = time.monotonic()
+    results = crawl_urls(urls, save_dir, workers=workers)
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+        if not result['success']:
+            print(f"爬取失败: {result['url']}: {result['error']}")
+    print(f"✅ 共 {len(results)} 个URL，{counts}，用时 {time.monotonic() - start:.1f} 秒")
+    return results
+
+
 if __name__ == "__main__":
-    quick_crawl()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="抓取微信公众号文章")
+    parser.add_argument("urls", nargs="*", help="要抓取的URL")
+    parser.add_argument("--from-db", action="store_true", help="抓取数据库中所有微信公众号文章")
+    parser.add_argument("--save-dir", default="html_files", help="保存目录")
+    parser.add_argument("--workers", type=int, default=CRAWL_WORKERS, help="抓取线程数")
+    args = parser.parse_args()
+
+    urls = list(args.urls)
+    if args.from_db:
+        # 数据库配置
+        db_config = {
+            'host': 'localhost',
+            'database': 'test',
+            'user': 'root',
+            'password': 'root123'
+        }
+        urls += weixin_urls_from_db(db_config)
+
+    if urls:
+        batch_crawl(urls, args.save_dir, args.workers)
+    else:
+        quick_crawl()
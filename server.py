@@ -1,174 +1,1748 @@
 import tornado.ioloop
 import tornado.web
 import tornado.escape
+import tornado.iostream
 import json
 import datetime
 import uuid
+import io
+import csv
+import gzip
+import hashlib
+import asyncio
+import functools
+import base64
+import time
+import threading
+import os
+import signal
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import List, Dict, Any, Optional
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, text, event, inspect, bindparam
 import pandas as pd
 import numpy as np
 import math
+import sys
+from array import array
+import re
+import heapq
+import bisect
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# 默认数据库配置
+DEFAULT_DB_CONFIG = {
+    'host': 'localhost',
+    'database': 'test',
+    'user': 'root',
+    'password': 'root123'
+}
+
+# 默认连接池配置：有界连接池，连接前探活，定期回收避免 MySQL wait_timeout 断连
+DEFAULT_POOL_OPTIONS = {
+    'pool_size': 10,
+    'max_overflow': 20,
+    'pool_timeout': 30,
+    'pool_pre_ping': True,
+    'pool_recycle': 3600
+}
+
+
+# 论文目录增量刷新间隔（毫秒）
+CATALOG_REFRESH_INTERVAL_MS = 5000
+# 与数据库核对论文ID集合的间隔（秒）：增量刷新只能发现新增和修改，删除的论文靠定期核对移除
+CATALOG_RECONCILE_INTERVAL = 60
+
+# 数据库线程池大小（应不超过连接池 pool_size + max_overflow）
+DB_EXECUTOR_WORKERS = 8
+
+# 单次数据库请求超时时间（秒）
+DB_REQUEST_TIMEOUT = 10
+
+# 响应缓存最大条目数
+RESPONSE_CACHE_MAX_ENTRIES = 512
+
+# 响应体超过该大小才压缩（字节）
+RESPONSE_COMPRESS_MIN_BYTES = 1024
+
+# 导出接口每批读取/写出的行数
+EXPORT_CHUNK_SIZE = 500
+
+# 论文列表每页最大数量
+MAX_PAGE_SIZE = 500
+
+# 批量写接口支持的操作及单次请求的最大变更数
+BATCH_MUTATION_OPS = ("read", "favorite", "add_tag", "remove_tag")
+BATCH_MAX_MUTATIONS = 1000
+
+# 阅读/收藏状态的写入模式：
+#   sync    每次切换立即写库
+#   async   合并后批量写库，进程崩溃时可能丢失未刷新的变更
+#   journal 同 async，但先追加到本地日志，启动时重放
+STATUS_WRITE_MODES = ("sync", "async", "journal")
+STATUS_WRITE_MODE = "journal"
+# 状态变更最多缓冲的时间（毫秒）和条数，任一条件满足即刷新
+STATUS_FLUSH_INTERVAL_MS = 200
+STATUS_FLUSH_MAX_ITEMS = 500
+STATUS_JOURNAL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "status_journal.jsonl")
+
+# 导出接口的字段（与 data/papers.csv 一致，不含全文）
+PAPER_EXPORT_FIELDS = ["id", "title", "title_ch", "authors", "published", "summary", "summary_ch",
+                       "categories", "filepath", "read", "favorite"]
+PAPER_EXPORT_COLUMNS = ", ".join(f"p.`{field}`" if field == "read" else f"p.{field}" for field in PAPER_EXPORT_FIELDS)
+
+# 中文全文按章节分段压缩存储：单个分段的最大字符数，以及按偏移分页时每页的默认/最大字符数
+FULLTEXT_SECTION_MAX_CHARS = 20000
+FULLTEXT_PAGE_CHARS = 20000
+FULLTEXT_PAGE_MAX_CHARS = 200000
+FULLTEXT_ENCODING = "zstd" if zstandard is not None else "gzip"
+# 章节标题：较短且以编号（1 / 1.2 / A.1）加标题文字或常见章节名开头的段落
+FULLTEXT_HEADING_MAX_CHARS = 80
+_FULLTEXT_HEADING = re.compile(r"^((\d+(\.\d+)*|[A-Z](\.\d+)+)\.?\s+[A-Za-z\u4e00-\u9fff]|(摘要|引言|参考文献|致谢|附录|Abstract|References|Acknowledg))")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+# 论文列表查询的字段
+PAPER_LIST_COLUMNS = """p.id, p.title, p.authors, p.summary_ch, p.categories, p.published,
+                   p.`read` as is_read, p.favorite as is_favorite"""
+
+
+def _json_default(value):
+    """序列化标准 JSON 不支持的类型（pandas Timestamp、numpy 数值、array 等）"""
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    if isinstance(value, (np.integer, np.floating, np.bool_)):
+        return value.item()
+    if isinstance(value, (array, set, frozenset, tuple)):
+        return list(value)
+    if value is pd.NaT:
+        return None
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    JSON_BACKEND = "orjson"
+
+    def json_dumps(value) -> bytes:
+        """序列化为UTF-8 JSON字节（原样输出中文，原生支持 datetime）"""
+        return orjson.dumps(value, default=_json_default, option=orjson.OPT_SERIALIZE_NUMPY)
+elif msgspec is not None:
+    JSON_BACKEND = "msgspec"
+    _msgspec_encoder = msgspec.json.Encoder(enc_hook=_json_default)
+
+    def json_dumps(value) -> bytes:
+        """序列化为UTF-8 JSON字节（原样输出中文，原生支持 datetime）"""
+        return _msgspec_encoder.encode(value)
+else:
+    JSON_BACKEND = "json"
+
+    def json_dumps(value) -> bytes:
+        """序列化为UTF-8 JSON字节（原样输出中文，不做 \\uXXXX 转义）"""
+        return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def build_connection_string(db_config: Dict[str, str]) -> str:
+    """根据数据库配置生成连接字符串"""
+    return f"mysql+pymysql://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
+
+
+def create_db_engine(db_config: Optional[Dict[str, str]] = None, **pool_options):
+    """
+    创建进程内共享的数据库引擎（带连接池）
+
+    Args:
+        db_config: 数据库配置字典，默认使用 DEFAULT_DB_CONFIG
+        pool_options: 连接池参数，覆盖 DEFAULT_POOL_OPTIONS
+            (pool_size, max_overflow, pool_timeout, pool_pre_ping, pool_recycle)
+    """
+    options = dict(DEFAULT_POOL_OPTIONS)
+    options.update(pool_options)
+    return create_engine(build_connection_string(db_config or DEFAULT_DB_CONFIG), **options)
+
+
+def compress_fulltext_section(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    return gzip.compress(data, compresslevel=6)
+
+
+def decompress_fulltext_section(data: bytes, encoding: str) -> bytes:
+    if encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("全文以 zstd 压缩存储，但未安装 zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return gzip.decompress(data)
+
+
+def split_fulltext_sections(fulltext: str, max_chars: int = FULLTEXT_SECTION_MAX_CHARS) -> List[tuple]:
+    """
+    在段落边界处把全文切分为章节，返回 [(标题, 起始字符, 结束字符)]
+
+    遇到章节标题段落时另起一节（标题紧接标题时合并），超过 max_chars 时在段落边界处续分；
+    各节首尾相接，拼接起来就是原文。
+    """
+    paragraphs = []
+    position = 0
+    for match in _PARAGRAPH_BREAK.finditer(fulltext):
+        paragraphs.append((position, match.end()))
+        position = match.end()
+    if position < len(fulltext):
+        paragraphs.append((position, len(fulltext)))
+
+    sections = []
+    section_start = 0
+    title = ""
+    has_body = False
+    for start, end in paragraphs:
+        paragraph = fulltext[start:end].strip()
+        is_heading = len(paragraph) <= FULLTEXT_HEADING_MAX_CHARS and bool(_FULLTEXT_HEADING.match(paragraph))
+        if start > section_start and ((is_heading and has_body) or end - section_start > max_chars):
+            sections.append((title, section_start, start))
+            section_start = start
+            has_body = False
+        if is_heading and not has_body:
+            title = paragraph
+        else:
+            has_body = True
+    if section_start < len(fulltext) or not sections:
+        sections.append((title, section_start, len(fulltext)))
+    return sections
+
+
+def encode_fulltext(fulltext: str, encoding: str = FULLTEXT_ENCODING) -> tuple:
+    """
+    把全文编码为 (章节索引, 压缩数据)
+
+    每节单独压缩后首尾相接，索引记录每节的字符范围和压缩数据中的字节范围，
+    读取某一节时只需取出并解压对应的字节。
+    """
+    frames = []
+    sections = []
+    byte_offset = 0
+    for title, start, end in split_fulltext_sections(fulltext):
+        frame = compress_fulltext_section(fulltext[start:end].encode("utf-8"), encoding)
+        frames.append(frame)
+        sections.append({"title": title, "offset": start, "length": end - start,
+                         "start": byte_offset, "size": len(frame)})
+        byte_offset += len(frame)
+    index = {"encoding": encoding, "length": len(fulltext), "sections": sections}
+    return index, b"".join(frames)
+
+
+class PoolStats:
+    """连接池统计信息（已借出连接数、溢出连接数、获取连接等待时间）"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.connects = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        event.listen(engine, "connect", self._on_connect)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def record_wait(self, seconds: float):
+        """记录一次从连接池获取连接的等待时间"""
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """返回连接池当前状态"""
+        pool = self.engine.pool
+
+        def pool_value(name):
+            method = getattr(pool, name, None)
+            return method() if callable(method) else None
+
+        with self._lock:
+            return {
+                "pool_class": type(pool).__name__,
+                "size": pool_value("size"),
+                "checked_out": pool_value("checkedout"),
+                "checked_in": pool_value("checkedin"),
+                "overflow": pool_value("overflow"),
+                "connects": self.connects,
+                "checkouts": self.checkouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 3)
+            }
+
+
+class TagClosureIndex:
+    """
+    标签闭包索引
+
+    预先计算每个标签的全部祖先/后代（含自身，附带层级深度），
+    并以位图（Python 整数，每个标签占一位）保存，
+    "标签X下的论文" 只需一次位运算或集合求交。
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.rows: List[tuple] = []  # (id, name, parent_id)
+        self.names: Dict[int, str] = {}
+        self.closure: List[tuple] = []  # (ancestor_id, descendant_id, depth)
+        self._position: Dict[int, int] = {}
+        self._tag_ids: List[int] = []
+        self._descendant_bits: Dict[int, int] = {}
+        self._ancestor_bits: Dict[int, int] = {}
+        self.fingerprint = None
+        self.generation = 0
+        self.loaded = False
+
+    def build(self, rows) -> bool:
+        """根据 (id, name, parent_id) 重建索引，返回标签体系是否发生变化"""
+        rows = sorted((int(tag_id), name, int(parent_id or 0)) for tag_id, name, parent_id in rows)
+        fingerprint = hash(tuple(rows))
+        if self.loaded and fingerprint == self.fingerprint:
+            return False
+
+        parents = {tag_id: parent_id for tag_id, _, parent_id in rows}
+        position = {tag_id: i for i, (tag_id, _, _) in enumerate(rows)}
+        descendant_bits = dict.fromkeys(parents, 0)
+        ancestor_bits = dict.fromkeys(parents, 0)
+        closure = []
+
+        # 从每个标签沿父链向上走（迭代，不受递归深度限制；遇到环即停止）
+        for tag_id in parents:
+            node, depth, seen = tag_id, 0, set()
+            while node in parents and node not in seen:
+                seen.add(node)
+                closure.append((node, tag_id, depth))
+                descendant_bits[node] |= 1 << position[tag_id]
+                ancestor_bits[tag_id] |= 1 << position[node]
+                node, depth = parents[node], depth + 1
+
+        with self._lock:
+            self.rows = rows
+            self.names = {tag_id: name for tag_id, name, _ in rows}
+            self.closure = closure
+            self._position = position
+            self._tag_ids = [tag_id for tag_id, _, _ in rows]
+            self._descendant_bits = descendant_bits
+            self._ancestor_bits = ancestor_bits
+            self.fingerprint = fingerprint
+            self.loaded = True
+            self.generation += 1
+        return True
+
+    def _bits_to_ids(self, bits: int) -> List[int]:
+        tag_ids = []
+        while bits:
+            low = bits & -bits
+            tag_ids.append(self._tag_ids[low.bit_length() - 1])
+            bits ^= low
+        return tag_ids
+
+    def bitmap(self, tag_ids) -> int:
+        """把标签ID列表转换为位图（忽略未知标签）"""
+        bits = 0
+        for tag_id in tag_ids:
+            position = self._position.get(int(tag_id))
+            if position is not None:
+                bits |= 1 << position
+        return bits
+
+    def descendant_bitmap(self, tag_id: int) -> int:
+        """标签及其所有后代的位图"""
+        return self._descendant_bits.get(int(tag_id), 0)
+
+    def descendants(self, tag_id: int, include_self: bool = True) -> List[int]:
+        """标签的所有后代ID"""
+        tag_ids = self._bits_to_ids(self.descendant_bitmap(tag_id))
+        return tag_ids if include_self else [i for i in tag_ids if i != int(tag_id)]
+
+    def ancestors(self, tag_id: int, include_self: bool = True) -> List[int]:
+        """标签的所有祖先ID"""
+        tag_ids = self._bits_to_ids(self._ancestor_bits.get(int(tag_id), 0))
+        return tag_ids if include_self else [i for i in tag_ids if i != int(tag_id)]
+
+    def matches(self, tag_id: int, paper_tag_ids) -> bool:
+        """论文的标签是否落在标签 tag_id 的子树中"""
+        return bool(self.descendant_bitmap(tag_id) & self.bitmap(paper_tag_ids))
+
 
 def find_all_children(df):
     """计算每个节点的所有孩子节点（直接和间接）"""
-    # 构建父子关系映射
-    parent_to_children = {}
-    id_to_name = dict(zip(df['id'], df['name']))
-
-    # 初始化每个节点的直接孩子
-    for _, row in df.iterrows():
-        parent_id = row['parent_id']
-        child_id = row['id']
-
-        if parent_id not in parent_to_children:
-            parent_to_children[parent_id] = []
-        parent_to_children[parent_id].append(child_id)
-
-    # 递归查找所有孩子节点
-    def find_descendants(node_id):
-        """递归查找节点的所有后代节点"""
-        if node_id not in parent_to_children:
-            return []
+    index = TagClosureIndex()
+    index.build(zip(df['id'], df['name'], df['parent_id']))
+    all_children = {tag_id: index.descendants(tag_id, include_self=False) for tag_id in index.names}
+    return all_children, dict(index.names)
 
-        descendants = []
-        for child_id in parent_to_children[node_id]:
-            descendants.append(child_id)
-            descendants.extend(find_descendants(child_id))
 
-        return descendants
+def _intern_all(values) -> tuple:
+    """驻留字符串：相同的分类/标签/作者名在所有论文间共享同一个对象"""
+    return tuple(sys.intern(str(value)) for value in values or ())
 
-    # 计算每个节点的所有孩子节点
-    all_children = {}
-    for node_id in df['id']:
-        all_children[node_id] = find_descendants(node_id)
 
-    return all_children, id_to_name
+class Paper:
+    """
+    论文数据模型
 
+    使用 __slots__ 去掉每个实例的 __dict__；分类、作者、标签名驻留为共享字符串元组，
+    标签ID保存为紧凑的整数数组。to_dict() 的结果按版本缓存，字段通过 update() 修改时失效。
+    """
 
-class Paper:
-    """论文数据模型"""
+    __slots__ = ("paper_url", "title", "authors", "summary", "categories", "published",
+                 "is_read", "is_favorite", "custom_tags", "custom_tags_ids", "version", "_dict_cache")
 
     def __init__(self, title: str, authors: List[str], summary: str, categories: List[str],
                  published: Optional[str] = None, paper_url: Optional[str] = None, is_read: Optional[int] = None,
                  is_favorite: Optional[int] = None, custom_tags: Optional[list] = None, custom_tags_ids: Optional[list] = None):
         self.paper_url = paper_url
         self.title = title
-        self.authors = authors
+        self.authors = _intern_all(authors)
         self.summary = summary
-        self.categories = categories
+        self.categories = _intern_all(categories)
         self.published = published or datetime.datetime.now().isoformat()
-        self.is_read = is_read or False
-        self.is_favorite = is_favorite or False
-        self.custom_tags = custom_tags or []
-        self.custom_tags_ids = custom_tags_ids or []
+        self.is_read = bool(is_read)
+        self.is_favorite = bool(is_favorite)
+        self.custom_tags = _intern_all(custom_tags)
+        self.custom_tags_ids = array('i', (int(tag_id) for tag_id in custom_tags_ids or ()))
+        self.version = 0
+        self._dict_cache = None
+
+    def update(self, **fields):
+        """修改字段并使序列化缓存失效"""
+        for name, value in fields.items():
+            if name in ("authors", "categories", "custom_tags"):
+                value = _intern_all(value)
+            elif name == "custom_tags_ids":
+                value = array('i', (int(tag_id) for tag_id in value or ()))
+            setattr(self, name, value)
+        self.version += 1
+        self._dict_cache = None
 
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典格式"""
+        """转换为字典格式（按版本缓存，调用方不应修改返回值）"""
+        if self._dict_cache is None:
+            self._dict_cache = {
+                "paper_url": self.paper_url,
+                "title": self.title,
+                "authors": list(self.authors),
+                "summary": self.summary,
+                "categories": list(self.categories),
+                "published": self.published,
+                "is_read": self.is_read,
+                "is_favorite": self.is_favorite,
+                "custom_tags": list(self.custom_tags),
+                "custom_tags_ids": list(self.custom_tags_ids)
+            }
+        return self._dict_cache
+
+
+def _load_json_list(value) -> list:
+    """解析数据库中以JSON字符串保存的列表字段"""
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    return json.loads(value)
+
+
+def _format_published(value) -> Optional[str]:
+    """统一发布时间格式，保证目录中的论文可以按时间排序"""
+    if value is None:
+        return None
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    return str(value)
+
+
+# 拉丁字母/数字按词切分，中日韩文字按字二元组切分
+_WORD_PATTERN = re.compile(r"[0-9a-z]+|[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_CJK_PATTERN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]")
+
+
+def tokenize(value: str) -> List[str]:
+    """分词：英文转小写按词切分，中文按相邻两字切分（单字词保留单字）"""
+    tokens = []
+    for word in _WORD_PATTERN.findall(value.lower()):
+        if _CJK_PATTERN.match(word):
+            if len(word) == 1:
+                tokens.append(word)
+            else:
+                tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+        else:
+            tokens.append(word)
+    return tokens
+
+
+class SearchIndex:
+    """
+    论文倒排索引（BM25 排序）
+
+    索引标题、中文标题、摘要、中文摘要和作者，不同字段按权重累加词频。
+    查询只遍历查询词的倒排表，不扫描全部论文；支持按文档增量更新。
+    """
+
+    FIELD_WEIGHTS = {"title": 3.0, "title_ch": 3.0, "authors": 2.0, "summary": 1.0, "summary_ch": 1.0}
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = {}
+        self._doc_terms: Dict[str, Dict[str, float]] = {}
+        self._doc_length: Dict[str, float] = {}
+        self._total_length = 0.0
+
+    def __len__(self):
+        return len(self._postings)
+
+    def add(self, doc_id: str, fields: Dict[str, str]):
+        """添加或替换一篇文档"""
+        self.remove(doc_id)
+        terms: Dict[str, float] = {}
+        length = 0.0
+        for field, value in fields.items():
+            weight = self.FIELD_WEIGHTS.get(field, 1.0)
+            for token in tokenize(value or ""):
+                terms[token] = terms.get(token, 0.0) + weight
+                length += weight
+        for term, frequency in terms.items():
+            self._postings.setdefault(term, {})[doc_id] = frequency
+        self._doc_terms[doc_id] = terms
+        self._doc_length[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: str):
+        """从索引中删除一篇文档"""
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._doc_length.pop(doc_id, 0.0)
+
+    def search(self, query: str, limit: Optional[int] = None, offset: int = 0, accept=None):
+        """
+        检索文档
+
+        Args:
+            query: 查询文本
+            limit, offset: 返回得分排名 [offset, offset + limit) 的文档
+            accept: 可选过滤函数 (doc_id) -> bool
+
+        Returns:
+            ([(doc_id, score), ...], 命中总数)
+        """
+        doc_count = len(self._doc_terms)
+        if not doc_count:
+            return [], 0
+        average_length = self._total_length / doc_count or 1.0
+
+        scores: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.K1 * (1 - self.B + self.B * self._doc_length[doc_id] / average_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.K1 + 1) / (frequency + norm)
+
+        if accept is not None:
+            scores = {doc_id: score for doc_id, score in scores.items() if accept(doc_id)}
+        total = len(scores)
+        if limit is None:
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        else:
+            ranked = heapq.nsmallest(offset + limit, scores.items(), key=lambda item: (-item[1], item[0]))
+        return ranked[offset:] if limit is None else ranked[offset:offset + limit], total
+
+
+class PaperQuery:
+    """
+    论文列表查询构造器
+
+    把分类、标签子树、搜索词、时间窗口、已读/收藏过滤组合成一条SQL，
+    按 published DESC, id 排序，并用不透明游标做键集分页。
+    """
+
+    def __init__(self, category: Optional[str] = None, tag_id: Optional[int] = None,
+                 tag_ids: Optional[List[int]] = None, search: Optional[str] = None, days: Optional[int] = None,
+                 is_read: Optional[bool] = None, is_favorite: Optional[bool] = None,
+                 category_table: bool = False, search_ids: Optional[List[str]] = None):
+        """
+        Args:
+            tag_id: 按标签子树过滤，通过 tag_closure 表一次连接完成
+            tag_ids: 显式给出的标签ID集合（没有 tag_closure 表时使用）
+            category_table: 按 paper_categories 表过滤分类（否则对 categories JSON 做 LIKE 匹配）
+            search_ids: 搜索词命中的论文ID；搜索统一由目录的倒排索引解析，SQL 只按ID过滤
+        """
+        self.category = category
+        self.category_table = category_table
+        self.tag_id = tag_id
+        self.tag_ids = tag_ids
+        self.search = search
+        self.search_ids = search_ids
+        self.days = days
+        self.is_read = is_read
+        self.is_favorite = is_favorite
+
+    @staticmethod
+    def _escape_like(value: str) -> str:
+        """转义 LIKE 通配符（转义字符为 !，兼容各数据库的字符串转义规则）"""
+        return value.replace("!", "!!").replace("%", "!%").replace("_", "!_")
+
+    def where_clause(self):
+        """生成 WHERE 子句及其参数"""
+        conditions = []
+        params: Dict[str, Any] = {}
+        expanding = []
+
+        if self.category and self.category_table:
+            conditions.append("EXISTS (SELECT 1 FROM paper_categories pc"
+                              " WHERE pc.paper_id = p.id AND pc.category = :category)")
+            params["category"] = self.category
+        elif self.category:
+            # categories 以JSON数组字符串保存，按带引号的元素匹配
+            conditions.append("p.categories LIKE :category_pattern ESCAPE '!'")
+            params["category_pattern"] = f'%{self._escape_like(json.dumps(self.category))}%'
+        if self.tag_ids is not None:
+            conditions.append("EXISTS (SELECT 1 FROM paper_tags pt WHERE pt.paper_id = p.id AND pt.tag_id IN :tag_ids)")
+            params["tag_ids"] = list(self.tag_ids) or [-1]
+            expanding.append("tag_ids")
+        elif self.tag_id is not None:
+            conditions.append("EXISTS (SELECT 1 FROM paper_tags pt"
+                              " INNER JOIN tag_closure tc ON tc.descendant_id = pt.tag_id"
+                              " WHERE pt.paper_id = p.id AND tc.ancestor_id = :tag_id)")
+            params["tag_id"] = self.tag_id
+        if self.search_ids is not None:
+            conditions.append("p.id IN :search_ids")
+            params["search_ids"] = list(self.search_ids) or [""]
+            expanding.append("search_ids")
+        if self.days:
+            conditions.append("p.published >= :published_since")
+            params["published_since"] = datetime.datetime.now() - datetime.timedelta(days=self.days)
+        if self.is_read is not None:
+            conditions.append("p.`read` = :is_read")
+            params["is_read"] = 1 if self.is_read else 0
+        if self.is_favorite is not None:
+            conditions.append("p.favorite = :is_favorite")
+            params["is_favorite"] = 1 if self.is_favorite else 0
+
+        return conditions, params, expanding
+
+    def page_statement(self, limit: int, cursor: Optional[str] = None):
+        """生成一页数据的查询语句"""
+        conditions, params, expanding = self.where_clause()
+        if cursor:
+            published, paper_id = self.decode_cursor(cursor)
+            conditions.append("(p.published < :cursor_published OR (p.published = :cursor_published AND p.id > :cursor_id))")
+            params["cursor_published"] = published
+            params["cursor_id"] = paper_id
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        params["limit"] = limit
+
+        statement = text(f"""
+            SELECT {PAPER_LIST_COLUMNS}
+            FROM papers p
+            {where}
+            ORDER BY p.published DESC, p.id
+            LIMIT :limit
+        """)
+        if expanding:
+            statement = statement.bindparams(*[bindparam(name, expanding=True) for name in expanding])
+        return statement, params
+
+    def export_statement(self):
+        """生成导出全部匹配论文的查询语句（不分页，配合服务端游标流式读取）"""
+        conditions, params, expanding = self.where_clause()
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        statement = text(f"""
+            SELECT {PAPER_EXPORT_COLUMNS}
+            FROM papers p
+            {where}
+            ORDER BY p.published DESC, p.id
+        """)
+        if expanding:
+            statement = statement.bindparams(*[bindparam(name, expanding=True) for name in expanding])
+        return statement, params
+
+    def has_filters(self) -> bool:
+        """除搜索词外是否还有其它过滤条件"""
+        return any(value is not None and value != "" for value in
+                   (self.category, self.tag_id, self.tag_ids, self.days, self.is_read, self.is_favorite))
+
+    def matches(self, paper: "Paper", tag_index: TagClosureIndex) -> bool:
+        """在内存中判断论文是否满足过滤条件（不含搜索词）"""
+        if self.category and self.category not in paper.categories:
+            return False
+        if self.tag_id is not None or self.tag_ids is not None:
+            if self.tag_id is not None:
+                subtree = tag_index.descendant_bitmap(self.tag_id)
+            else:
+                subtree = tag_index.bitmap(self.tag_ids)
+            if not subtree & tag_index.bitmap(paper.custom_tags_ids):
+                return False
+        if self.days:
+            since = datetime.datetime.now() - datetime.timedelta(days=self.days)
+            try:
+                if datetime.datetime.fromisoformat(str(paper.published)) < since:
+                    return False
+            except ValueError:
+                return False
+        if self.is_read is not None and paper.is_read != self.is_read:
+            return False
+        if self.is_favorite is not None and paper.is_favorite != self.is_favorite:
+            return False
+        return True
+
+    @staticmethod
+    def encode_rank_cursor(offset: int) -> str:
+        """搜索结果按相关度排序，游标记录排名偏移"""
+        return base64.urlsafe_b64encode(json.dumps({"rank": offset}).encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_rank_cursor(cursor: str) -> int:
+        try:
+            return int(json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))["rank"])
+        except Exception:
+            raise ValueError("无效的分页游标")
+
+    @staticmethod
+    def encode_cursor(published, paper_id: str) -> str:
+        """把最后一条记录的 (published, id) 编码为不透明游标"""
+        payload = json.dumps([_format_published(published), paper_id])
+        return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii")
+
+    @staticmethod
+    def decode_cursor(cursor: str):
+        """解析游标，格式错误时抛出 ValueError"""
+        try:
+            published, paper_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            return datetime.datetime.fromisoformat(published), paper_id
+        except Exception:
+            raise ValueError("无效的分页游标")
+
+
+class FacetIndex:
+    """
+    分面计数用的位图索引
+
+    论文按发布时间降序编号，每个分类、标签（已沿标签树向上汇总）、阅读/收藏状态
+    对应一个以 Python 整数表示的位图。过滤条件是位图的与运算，计数是 bit_count，
+    时间窗口是编号的前缀。
+    """
+
+    DATE_BUCKETS = (7, 30, 90)
+
+    def __init__(self, papers: List[Paper], tag_index: TagClosureIndex, version):
+        self.version = version
+        entries = []
+        for paper in papers:
+            try:
+                timestamp = datetime.datetime.fromisoformat(str(paper.published)).timestamp()
+            except ValueError:
+                timestamp = float("-inf")
+            entries.append((-timestamp, paper.paper_url, paper))
+        # (时间降序, ID) 唯一，不会比较到 Paper 对象
+        entries.sort()
+
+        self.slots = {paper_url: slot for slot, (_, paper_url, _) in enumerate(entries)}
+        self._negative_timestamps = [entry[0] for entry in entries]
+        self.size = len(entries)
+        self.all = (1 << self.size) - 1
+
+        # 先按字节数组置位，最后一次性转换为整数
+        category_bytes: Dict[str, bytearray] = {}
+        tag_bytes: Dict[int, bytearray] = {}
+        read_bytes = self._empty()
+        favorite_bytes = self._empty()
+        for slot, (_, _, paper) in enumerate(entries):
+            byte, bit = slot >> 3, 1 << (slot & 7)
+            for category in paper.categories:
+                bits = category_bytes.get(category)
+                if bits is None:
+                    bits = category_bytes[category] = self._empty()
+                bits[byte] |= bit
+            for tag_id in paper.custom_tags_ids:
+                bits = tag_bytes.get(tag_id)
+                if bits is None:
+                    bits = tag_bytes[tag_id] = self._empty()
+                bits[byte] |= bit
+            if paper.is_read:
+                read_bytes[byte] |= bit
+            if paper.is_favorite:
+                favorite_bytes[byte] |= bit
+
+        self.categories = {category: self._to_int(bits) for category, bits in category_bytes.items()}
+        direct = {tag_id: self._to_int(bits) for tag_id, bits in tag_bytes.items()}
+        # 标签计数包含所有后代标签下的论文
+        self.tags: Dict[int, int] = {}
+        for tag_id in tag_index.names:
+            bits = 0
+            for descendant_id in tag_index.descendants(tag_id):
+                bits |= direct.get(descendant_id, 0)
+            self.tags[tag_id] = bits
+        self.read = self._to_int(read_bytes)
+        self.favorite = self._to_int(favorite_bytes)
+
+    def _empty(self) -> bytearray:
+        return bytearray((self.size + 7) >> 3)
+
+    @staticmethod
+    def _to_int(bits: bytearray) -> int:
+        return int.from_bytes(bits, "little")
+
+    def bits_for(self, paper_ids) -> int:
+        """论文ID集合对应的位图"""
+        bits = self._empty()
+        for paper_id in paper_ids:
+            slot = self.slots.get(paper_id)
+            if slot is not None:
+                bits[slot >> 3] |= 1 << (slot & 7)
+        return self._to_int(bits)
+
+    def published_mask(self, days: int) -> int:
+        """最近 days 天内发布的论文（编号前缀）"""
+        since = datetime.datetime.now() - datetime.timedelta(days=days)
+        return (1 << bisect.bisect_right(self._negative_timestamps, -since.timestamp())) - 1
+
+    def set_flag(self, paper_id: str, field: str, value: bool):
+        """阅读/收藏状态变化时原地修改位图"""
+        slot = self.slots.get(paper_id)
+        if slot is None:
+            return
+        bits = getattr(self, field)
+        setattr(self, field, bits | (1 << slot) if value else bits & ~(1 << slot))
+
+    def mask(self, paper_query: "PaperQuery") -> int:
+        """过滤条件（不含搜索词）对应的位图"""
+        bits = self.all
+        if paper_query.category:
+            bits &= self.categories.get(paper_query.category, 0)
+        if paper_query.tag_id is not None:
+            bits &= self.tags.get(paper_query.tag_id, 0)
+        elif paper_query.tag_ids is not None:
+            subtree = 0
+            for tag_id in paper_query.tag_ids:
+                subtree |= self.tags.get(int(tag_id), 0)
+            bits &= subtree
+        if paper_query.days:
+            bits &= self.published_mask(paper_query.days)
+        if paper_query.is_read is not None:
+            bits &= self.read if paper_query.is_read else self.all & ~self.read
+        if paper_query.is_favorite is not None:
+            bits &= self.favorite if paper_query.is_favorite else self.all & ~self.favorite
+        return bits
+
+    def counts(self, mask: int, tag_index: TagClosureIndex) -> Dict[str, Any]:
+        """在过滤结果 mask 下统计各分面的论文数"""
+        total = mask.bit_count()
+        read = (mask & self.read).bit_count()
+        favorite = (mask & self.favorite).bit_count()
         return {
-            "paper_url": self.paper_url,
-            "title": self.title,
-            "authors": self.authors,
-            "summary": self.summary,
-            "categories": self.categories,
-            "published": self.published,
-            "is_read": self.is_read,
-            "is_favorite": self.is_favorite,
-            "custom_tags": self.custom_tags,
-            "custom_tags_ids": self.custom_tags_ids
+            "total": total,
+            "categories": [{"id": category, "name": category, "count": (mask & bits).bit_count()}
+                           for category, bits in sorted(self.categories.items())],
+            "tags": [{"id": tag_id, "name": tag_index.names[tag_id], "parent_id": parent_id,
+                      "count": (mask & self.tags.get(tag_id, 0)).bit_count()}
+                     for tag_id, _, parent_id in sorted(tag_index.rows, key=lambda row: (row[2], row[0]))],
+            "read": {"read": read, "unread": total - read},
+            "favorite": {"favorite": favorite, "not_favorite": total - favorite},
+            "published": [{"days": days, "count": (mask & self.published_mask(days)).bit_count()}
+                          for days in self.DATE_BUCKETS]
         }
 
-class PaperStorage:
-    """论文数据存储（模拟数据库）"""
 
-    def __init__(self):
-        self.papers: List[Paper] = []
-        self.db_config = {
-            'host': 'localhost',
-            'database': 'test',
-            'user': 'root',
-            'password': 'root123'
+class PaperCatalog:
+    """
+    常驻内存的论文目录
+
+    启动时全量加载一次，之后按 papers.updated_at 水位增量刷新；
+    阅读/收藏/标签修改由 PaperStorage 直接写穿到目录。
+    目录内容每变化一次 generation 加一，客户端可据此判断数据是否更新。
+    """
+
+    def __init__(self, storage: "PaperStorage"):
+        self.storage = storage
+        self._lock = threading.RLock()
+        self._papers: Dict[str, Paper] = {}
+        self._sorted_papers: Optional[List[Paper]] = None
+        self._documents: Dict[str, Dict[str, str]] = {}
+        self.search_index = SearchIndex()
+        # 分类 -> 论文ID 倒排表，以及待同步到 paper_categories 表的变化
+        self.category_postings: Dict[str, set] = {}
+        self._category_changes: Dict[str, tuple] = {}
+        self._category_full_sync = False
+        self._facets: Optional[FacetIndex] = None
+        self.generation = 0
+        self.watermark = None
+        self.loaded = False
+        self.last_refresh = None
+        self.last_reconcile = None
+
+    def _touch(self):
+        """目录内容发生变化"""
+        self.generation += 1
+        self._sorted_papers = None
+
+    def _index_categories(self, paper_id: str, old_categories, new_categories):
+        """维护分类倒排表（调用方持有 _lock）"""
+        old_categories, new_categories = set(old_categories or ()), set(new_categories or ())
+        if old_categories == new_categories:
+            return
+        for category in old_categories - new_categories:
+            postings = self.category_postings.get(category)
+            if postings is not None:
+                postings.discard(paper_id)
+                if not postings:
+                    del self.category_postings[category]
+        for category in new_categories - old_categories:
+            self.category_postings.setdefault(category, set()).add(paper_id)
+        self._category_changes[paper_id] = tuple(sorted(new_categories))
+
+    def _sync_categories(self):
+        """把分类变化同步到 paper_categories 表（在锁外执行数据库写入）"""
+        with self._lock:
+            if not self._category_changes:
+                return
+            changes, full = self._category_changes, self._category_full_sync
+            self._category_changes, self._category_full_sync = {}, False
+        if not self.storage.sync_paper_categories(changes, full=full):
+            # 同步失败时保留变化，下次刷新重试
+            with self._lock:
+                for paper_id, categories in changes.items():
+                    self._category_changes.setdefault(paper_id, categories)
+                self._category_full_sync = self._category_full_sync or full
+
+    def load(self) -> bool:
+        """全量加载目录，返回内容是否发生变化"""
+        papers, watermark, documents = self.storage.fetch_papers()
+        with self._lock:
+            for paper in papers:
+                # 与增量合并相同：数据库中的阅读/收藏状态可能落后于写后缓冲
+                self.storage.status_buffer.overlay(paper)
+            new_papers = {paper.paper_url: paper for paper in papers}
+            changed = (not self.loaded or new_papers.keys() != self._papers.keys() or
+                       any(paper.to_dict() != self._papers[paper_id].to_dict()
+                           for paper_id, paper in new_papers.items()))
+            if changed or documents != self._documents:
+                self.search_index = SearchIndex()
+                for paper_id, fields in documents.items():
+                    self.search_index.add(paper_id, fields)
+                self._documents = documents
+            self._papers = new_papers
+            self.category_postings = {}
+            self._category_changes = {}
+            for paper_id, paper in new_papers.items():
+                self._index_categories(paper_id, (), paper.categories)
+            self._category_full_sync = True
+            self.watermark = watermark
+            self.loaded = True
+            self.last_refresh = self.last_reconcile = time.time()
+            if changed:
+                self._touch()
+        self._sync_categories()
+        return changed
+
+    def ensure_loaded(self):
+        """首次访问时加载目录"""
+        if not self.loaded:
+            self.load()
+
+    def refresh(self) -> bool:
+        """按 updated_at 水位增量刷新，返回目录是否发生变化"""
+        if not self.loaded or not self.storage.has_updated_at:
+            # 没有水位列时只能全量重载
+            return self.load()
+
+        papers, watermark, documents = self.storage.fetch_papers(since=self.watermark)
+        with self._lock:
+            changed = self._merge(papers, documents)
+            if watermark is not None and (self.watermark is None or watermark > self.watermark):
+                self.watermark = watermark
+            self.last_refresh = time.time()
+        if self.last_reconcile is None or time.time() - self.last_reconcile >= CATALOG_RECONCILE_INTERVAL:
+            changed = self.reconcile() or changed
+        self._sync_categories()
+        return changed
+
+    def reconcile(self) -> bool:
+        """与数据库的论文ID集合核对：移除已删除的论文，补读目录中缺失的论文"""
+        paper_ids = self.storage.fetch_paper_ids()
+        with self._lock:
+            removed = [paper_id for paper_id in self._papers if paper_id not in paper_ids]
+            missing = [paper_id for paper_id in paper_ids if paper_id not in self._papers]
+            for paper_id in removed:
+                paper = self._papers.pop(paper_id)
+                self._index_categories(paper_id, paper.categories, ())
+                self.search_index.remove(paper_id)
+                self._documents.pop(paper_id, None)
+            if removed:
+                self._touch()
+            self.last_reconcile = time.time()
+        changed = bool(removed)
+        if missing:
+            changed = self.reload_papers(missing) or changed
+        return changed
+
+    def reload_papers(self, paper_ids: List[str]) -> bool:
+        """按主键重新读取指定论文（用于标签等关联数据的写穿）"""
+        papers, _, documents = self.storage.fetch_papers(paper_ids=paper_ids)
+        with self._lock:
+            changed = self._merge(papers, documents)
+        self._sync_categories()
+        return changed
+
+    def _merge(self, papers: List[Paper], documents: Dict[str, Dict[str, str]]) -> bool:
+        changed = False
+        for paper in papers:
+            # 数据库中的阅读/收藏状态可能落后于写后缓冲
+            self.storage.status_buffer.overlay(paper)
+            current = self._papers.get(paper.paper_url)
+            if current is None or current.to_dict() != paper.to_dict():
+                self._index_categories(paper.paper_url, current.categories if current else (), paper.categories)
+                self._papers[paper.paper_url] = paper
+                changed = True
+            fields = documents.get(paper.paper_url)
+            if fields is not None and fields != self._documents.get(paper.paper_url):
+                # 增量更新倒排索引
+                self.search_index.add(paper.paper_url, fields)
+                self._documents[paper.paper_url] = fields
+                changed = True
+        if changed:
+            self._touch()
+        return changed
+
+    def add(self, paper: Paper):
+        """写入一篇论文"""
+        with self._lock:
+            current = self._papers.get(paper.paper_url)
+            self._index_categories(paper.paper_url, current.categories if current else (), paper.categories)
+            self._papers[paper.paper_url] = paper
+            fields = {"title": paper.title, "summary": paper.summary, "authors": " ".join(paper.authors)}
+            self.search_index.add(paper.paper_url, fields)
+            self._documents[paper.paper_url] = fields
+            self._touch()
+
+    def update_paper(self, paper_id: str, **fields) -> bool:
+        """写穿更新论文字段"""
+        with self._lock:
+            paper = self._papers.get(paper_id)
+            if paper is None:
+                return False
+            facets = self._facets
+            facets_current = facets is not None and facets.version[0] == self.generation
+            paper.update(**fields)
+            self._touch()
+            if facets_current and set(fields) <= {"is_read", "is_favorite"}:
+                # 状态切换只改两个位，不必重建分面索引
+                for name, value in fields.items():
+                    facets.set_flag(paper_id, "read" if name == "is_read" else "favorite", value)
+                facets.version = (self.generation, facets.version[1])
+            return True
+
+    def bump_generation(self):
+        """目录内容未变但基于数据库的响应需要失效（例如状态变更落库后）"""
+        with self._lock:
+            facets = self._facets
+            facets_current = facets is not None and facets.version[0] == self.generation
+            self.generation += 1
+            if facets_current:
+                facets.version = (self.generation, facets.version[1])
+
+    def get(self, paper_id: str) -> Optional[Paper]:
+        """按ID获取论文（O(1) 字典查找；目录尚未加载时返回 None）"""
+        return self._papers.get(paper_id)
+
+    def search(self, query: str, predicate=None, limit: Optional[int] = None, offset: int = 0):
+        """
+        全文检索，按 BM25 得分降序返回
+
+        Args:
+            query: 搜索词
+            predicate: 额外的过滤条件 (Paper) -> bool
+            limit, offset: 分页参数
+
+        Returns:
+            (论文列表, 命中总数)
+        """
+        self.ensure_loaded()
+        with self._lock:
+            accept = None
+            if predicate is not None:
+                accept = lambda paper_id: paper_id in self._papers and predicate(self._papers[paper_id])
+            hits, total = self.search_index.search(query, limit=limit, offset=offset, accept=accept)
+            return [self._papers[paper_id] for paper_id, _ in hits if paper_id in self._papers], total
+
+    def all_papers(self, sort_by_date: bool = True) -> List[Paper]:
+        """获取所有论文（返回列表副本）"""
+        self.ensure_loaded()
+        with self._lock:
+            if not sort_by_date:
+                return list(self._papers.values())
+            if self._sorted_papers is None:
+                self._sorted_papers = sorted(self._papers.values(), key=lambda x: x.published or "", reverse=True)
+            return list(self._sorted_papers)
+
+    def papers_in_category(self, category: str) -> List[Paper]:
+        """按分类倒排表取论文（按发布时间降序）"""
+        self.ensure_loaded()
+        with self._lock:
+            papers = [self._papers[paper_id] for paper_id in self.category_postings.get(category, ())]
+        papers.sort(key=lambda x: x.published or "", reverse=True)
+        return papers
+
+    def facet_counts(self, paper_query: "PaperQuery") -> Dict[str, Any]:
+        """在过滤条件下统计各分面的论文数（位图索引按目录和标签版本懒重建）"""
+        self.ensure_loaded()
+        tag_index = self.storage.tag_index
+        search_ids = None
+        if paper_query.search:
+            hits, _ = self.search(paper_query.search)
+            search_ids = [paper.paper_url for paper in hits]
+        with self._lock:
+            version = (self.generation, tag_index.generation)
+            if self._facets is None or self._facets.version != version:
+                self._facets = FacetIndex(list(self._papers.values()), tag_index, version)
+            mask = self._facets.mask(paper_query)
+            if search_ids is not None:
+                mask &= self._facets.bits_for(search_ids)
+            return self._facets.counts(mask, tag_index)
+
+    def category_counts(self) -> Dict[str, int]:
+        """每个分类的论文数"""
+        self.ensure_loaded()
+        with self._lock:
+            return {category: len(postings) for category, postings in self.category_postings.items()}
+
+    def stats(self) -> Dict[str, Any]:
+        """目录状态"""
+        return {
+            "loaded": self.loaded,
+            "generation": self.generation,
+            "size": len(self._papers),
+            "categories": len(self.category_postings),
+            "search_terms": len(self.search_index),
+            "watermark": _format_published(self.watermark),
+            "last_refresh": self.last_refresh,
+            "last_reconcile": self.last_reconcile
         }
 
-    def _initialize_sample_data(self):
-        connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-        engine = create_engine(connection_string)
 
-        # 从数据库读取数据
-        query = """
-        WITH paper_tags_agg AS (
-            SELECT pt.paper_id, JSON_ARRAYAGG(t.name) as tag_names, JSON_ARRAYAGG(t.id) as tag_ids
-            FROM paper_tags pt 
-            INNER JOIN tags t ON pt.tag_id = t.id
-            GROUP BY pt.paper_id
-        )
-        SELECT 
-            p.id, 
-            p.title, 
-            p.authors, 
-            p.summary_ch, 
-            p.categories, 
-            p.published, 
-            p.`read` as is_read, 
-            p.favorite as is_favorite,
-            pt.tag_names as custom_tags,
-            pt.tag_ids as custom_tags_ids
-        FROM papers p
-        LEFT JOIN paper_tags_agg pt ON p.id = pt.paper_id;
+class StatusWriteBuffer:
+    """
+    阅读/收藏状态的写后缓冲
+
+    切换立即写穿到内存目录并返回，数据库写入按 (paper_id, 字段) 合并，
+    每隔 flush_interval_ms 或累计 max_items 条时批量刷新。
+    """
+
+    FIELDS = {"read": "is_read", "favorite": "is_favorite"}
+
+    def __init__(self, storage: "PaperStorage", mode: str = STATUS_WRITE_MODE,
+                 flush_interval_ms: int = STATUS_FLUSH_INTERVAL_MS, max_items: int = STATUS_FLUSH_MAX_ITEMS,
+                 journal_path: Optional[str] = STATUS_JOURNAL_PATH):
+        if mode not in STATUS_WRITE_MODES:
+            raise ValueError(f"不支持的写入模式: {mode}")
+        self.storage = storage
+        self.mode = mode
+        self.flush_interval_ms = flush_interval_ms
+        self.max_items = max_items
+        self.journal_path = journal_path if mode == "journal" else None
+        self._pending: "OrderedDict[tuple, int]" = OrderedDict()
+        self._inflight: Dict[tuple, int] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._journal = None
+        self.submitted = 0
+        self.coalesced = 0
+        self.flushed = 0
+        self.flushes = 0
+        self.errors = 0
+        self.max_depth = 0
+        self.flush_seconds = 0.0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    def submit(self, paper_id: str, field: str, value) -> bool:
+        """提交一次状态切换（立即写穿到内存目录）"""
+        value = 1 if value else 0
+        if self.mode == "sync":
+            self.storage.write_statuses({(paper_id, field): value})
+            self.storage.catalog.update_paper(paper_id, **{self.FIELDS[field]: bool(value)})
+            self.submitted += 1
+            return True
+
+        key = (paper_id, field)
+        with self._lock:
+            if self._journal is not None:
+                self._append_journal(key, value)
+            if key in self._pending:
+                self.coalesced += 1
+                self._pending.move_to_end(key)
+            self._pending[key] = value
+            self.submitted += 1
+            depth = len(self._pending)
+            self.max_depth = max(self.max_depth, depth)
+        self.storage.catalog.update_paper(paper_id, **{self.FIELDS[field]: bool(value)})
+
+        if depth >= self.max_items:
+            self.flush()
+        return True
+
+    def discard(self, keys):
+        """丢弃被更新的写入覆盖的待刷新变更（例如批量接口已直接写库）"""
+        with self._lock:
+            for key in keys:
+                self._pending.pop(key, None)
+            self._rewrite_journal()
+
+    def overlay(self, paper: Paper):
+        """把尚未落库的状态覆盖到从数据库读出的论文上，避免刷新目录时回退"""
+        with self._lock:
+            for field, attribute in self.FIELDS.items():
+                key = (paper.paper_url, field)
+                value = self._pending.get(key, self._inflight.get(key))
+                if value is not None and getattr(paper, attribute) != bool(value):
+                    paper.update(**{attribute: bool(value)})
+
+    def flush(self) -> int:
+        """把缓冲的变更批量写入数据库，返回写入条数"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch = dict(self._pending)
+                self._inflight = batch
+                self._pending = OrderedDict()
+
+            start = time.perf_counter()
+            try:
+                self.storage.write_statuses(batch)
+            except Exception as e:
+                print(f"刷新状态变更失败: {e}")
+                with self._lock:
+                    self.errors += 1
+                    # 放回队列，保留期间产生的更新值
+                    for key, value in batch.items():
+                        self._pending.setdefault(key, value)
+                    self._inflight = {}
+                return 0
+
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._inflight = {}
+                self.flushes += 1
+                self.flushed += len(batch)
+                self.flush_seconds += elapsed
+                self.last_flush_ms = elapsed * 1000
+                self.max_flush_ms = max(self.max_flush_ms, self.last_flush_ms)
+                # 已落库的条目从日志中移除
+                self._rewrite_journal()
+            # 落库前从数据库读出并缓存的论文列表可能带着旧状态，使其失效
+            self.storage.catalog.bump_generation()
+            return len(batch)
+
+    def open(self):
+        """打开本地日志并重放上次未刷新的变更"""
+        if self.journal_path is None:
+            return
+        replayed = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        key = (entry["paper_id"], entry["field"])
+                        if entry["field"] not in self.FIELDS:
+                            continue
+                    except (json.JSONDecodeError, KeyError, TypeError):
+                        # 崩溃时最后一行可能只写了一半
+                        continue
+                    self._pending[key] = 1 if entry["value"] else 0
+                    self._pending.move_to_end(key)
+                    replayed += 1
+        os.makedirs(os.path.dirname(self.journal_path), exist_ok=True)
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+        if replayed:
+            print(f"重放状态日志: {replayed} 条")
+            self.flush()
+
+    def close(self):
+        """刷新所有缓冲的变更并关闭日志（优雅退出时调用）"""
+        self.flush()
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def _append_journal(self, key: tuple, value: int):
+        self._journal.write(json.dumps({"paper_id": key[0], "field": key[1], "value": value}) + "\n")
+        self._journal.flush()
+        os.fsync(self._journal.fileno())
+
+    def _rewrite_journal(self):
+        """用当前待刷新的变更重写日志（调用方持有 _lock）"""
+        if self._journal is None:
+            return
+        self._journal.close()
+        with open(self.journal_path, "w", encoding="utf-8") as f:
+            for key, value in self._pending.items():
+                f.write(json.dumps({"paper_id": key[0], "field": key[1], "value": value}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal = open(self.journal_path, "a", encoding="utf-8")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "depth": len(self._pending),
+                "inflight": len(self._inflight),
+                "max_depth": self.max_depth,
+                "submitted": self.submitted,
+                "coalesced": self.coalesced,
+                "flushed": self.flushed,
+                "flushes": self.flushes,
+                "errors": self.errors,
+                "last_flush_ms": round(self.last_flush_ms, 3),
+                "max_flush_ms": round(self.max_flush_ms, 3),
+                "avg_flush_ms": round(self.flush_seconds * 1000 / self.flushes, 3) if self.flushes else 0.0
+            }
+
+
+class PaperStorage:
+    """论文数据存储"""
+
+    def __init__(self, engine=None, db_config: Optional[Dict[str, str]] = None):
+        self.db_config = db_config or DEFAULT_DB_CONFIG
+        # 所有方法共享同一个引擎（连接池），避免每次请求重新建立连接
+        self.engine = engine if engine is not None else create_db_engine(self.db_config)
+        self.pool_stats = PoolStats(self.engine)
+        self.has_updated_at = False
+        self.has_tag_closure = False
+        self.has_paper_categories = False
+        self.has_paper_fulltexts = False
+        self.tag_index = TagClosureIndex()
+        self.catalog = PaperCatalog(self)
+        self.status_buffer = StatusWriteBuffer(self, mode="sync")
+
+    @contextmanager
+    def _connect(self):
+        """从连接池借出连接，并记录等待时间"""
+        start = time.perf_counter()
+        connection = self.engine.connect()
+        self.pool_stats.record_wait(time.perf_counter() - start)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def _read_sql(self, query, params=None) -> pd.DataFrame:
+        """通过连接池执行查询并返回DataFrame"""
+        with self._connect() as connection:
+            return pd.read_sql(query, connection, params=params)
+
+    def _now_sql(self) -> str:
+        return "CURRENT_TIMESTAMP(3)" if self.engine.dialect.name == "mysql" else "CURRENT_TIMESTAMP"
+
+    def ensure_schema(self):
+        """确保增量刷新、标签闭包和分类索引所需的表结构存在"""
+        self._ensure_updated_at()
+        self._ensure_tag_closure()
+        self._ensure_paper_categories()
+        self._ensure_paper_fulltexts()
+
+    def _ensure_updated_at(self):
+        """确保增量刷新所需的 papers.updated_at 列存在"""
+        try:
+            columns = {column['name'] for column in inspect(self.engine).get_columns('papers')}
+            if 'updated_at' not in columns and self.engine.dialect.name == "mysql":
+                with self._connect() as connection:
+                    connection.execute(text("""
+                        ALTER TABLE papers
+                        ADD COLUMN updated_at TIMESTAMP(3) NOT NULL
+                            DEFAULT CURRENT_TIMESTAMP(3) ON UPDATE CURRENT_TIMESTAMP(3),
+                        ADD INDEX idx_papers_updated_at (updated_at)
+                    """))
+                    connection.commit()
+                columns.add('updated_at')
+            self.has_updated_at = 'updated_at' in columns
+
+        except Exception as e:
+            print(f"检查数据库结构失败: {e}")
+            self.has_updated_at = False
+
+    def _ensure_tag_closure(self):
+        """确保标签闭包表 tag_closure(ancestor_id, descendant_id, depth) 存在"""
+        try:
+            if not inspect(self.engine).has_table('tag_closure'):
+                with self._connect() as connection:
+                    connection.execute(text("""
+                        CREATE TABLE tag_closure (
+                            ancestor_id INT NOT NULL,
+                            descendant_id INT NOT NULL,
+                            depth INT NOT NULL,
+                            PRIMARY KEY (ancestor_id, descendant_id)
+                        )
+                    """))
+                    connection.execute(text(
+                        "CREATE INDEX idx_tag_closure_descendant ON tag_closure (descendant_id, ancestor_id)"
+                    ))
+                    connection.commit()
+            self.has_tag_closure = True
+
+        except Exception as e:
+            print(f"创建标签闭包表失败: {e}")
+            self.has_tag_closure = False
+
+    def _ensure_paper_categories(self):
+        """确保规范化的分类表 paper_categories(paper_id, category) 存在"""
+        try:
+            if not inspect(self.engine).has_table('paper_categories'):
+                with self._connect() as connection:
+                    connection.execute(text("""
+                        CREATE TABLE paper_categories (
+                            paper_id VARCHAR(255) NOT NULL,
+                            category VARCHAR(64) NOT NULL,
+                            PRIMARY KEY (paper_id, category)
+                        )
+                    """))
+                    connection.execute(text(
+                        "CREATE INDEX idx_paper_categories_category ON paper_categories (category, paper_id)"
+                    ))
+                    connection.commit()
+            self.has_paper_categories = True
+
+        except Exception as e:
+            print(f"创建分类表失败: {e}")
+            self.has_paper_categories = False
+
+    def _ensure_paper_fulltexts(self):
+        """
+        确保压缩全文表 paper_fulltexts(paper_id, section_index, content) 存在
+
+        由 papers.fulltext_ch 按需生成；更新 fulltext_ch 的程序需同时删除对应的行。
+        """
+        try:
+            if not inspect(self.engine).has_table('paper_fulltexts'):
+                with self._connect() as connection:
+                    connection.execute(text("""
+                        CREATE TABLE paper_fulltexts (
+                            paper_id VARCHAR(255) NOT NULL PRIMARY KEY,
+                            section_index LONGTEXT NOT NULL,
+                            content LONGBLOB NOT NULL
+                        )
+                    """))
+                    connection.commit()
+            self.has_paper_fulltexts = True
+
+        except Exception as e:
+            print(f"创建全文表失败: {e}")
+            self.has_paper_fulltexts = False
+
+    def sync_paper_categories(self, changes: Dict[str, tuple], full: bool = False) -> bool:
+        """
+        把目录中的分类同步到 paper_categories 表
+
+        Args:
+            changes: {paper_id: 分类元组}，只写入与表中不一致的行
+            full: changes 为全部论文，表中多出的论文一并删除（全量加载时使用）
+        """
+        if not self.has_paper_categories:
+            return True
+        try:
+            with self._connect() as connection:
+                if full:
+                    rows = connection.execute(text("SELECT paper_id, category FROM paper_categories")).all()
+                else:
+                    rows = []
+                    paper_ids = list(changes)
+                    for start in range(0, len(paper_ids), 1000):
+                        rows.extend(connection.execute(
+                            text("SELECT paper_id, category FROM paper_categories WHERE paper_id IN :paper_ids")
+                            .bindparams(bindparam("paper_ids", expanding=True)),
+                            {"paper_ids": paper_ids[start:start + 1000]}
+                        ).all())
+                existing = {(row[0], row[1]) for row in rows}
+                wanted = {(paper_id, category) for paper_id, categories in changes.items() for category in categories}
+
+                added = sorted(wanted - existing)
+                removed = sorted(existing - wanted)
+                if removed:
+                    connection.execute(
+                        text("DELETE FROM paper_categories WHERE paper_id = :paper_id AND category = :category"),
+                        [{"paper_id": paper_id, "category": category} for paper_id, category in removed]
+                    )
+                if added:
+                    connection.execute(
+                        text("INSERT INTO paper_categories (paper_id, category) VALUES (:paper_id, :category)"),
+                        [{"paper_id": paper_id, "category": category} for paper_id, category in added]
+                    )
+                connection.commit()
+            return True
+
+        except Exception as e:
+            print(f"同步分类表失败: {e}")
+            return False
+
+    def refresh_tags(self) -> bool:
+        """重新读取标签体系，发生变化时重建闭包索引并同步 tag_closure 表"""
+        with self._connect() as connection:
+            rows = connection.execute(text("SELECT id, name, parent_id FROM tags")).all()
+        if not self.tag_index.build(rows):
+            return False
+
+        if self.has_tag_closure:
+            try:
+                with self._connect() as connection:
+                    connection.execute(text("DELETE FROM tag_closure"))
+                    if self.tag_index.closure:
+                        connection.execute(
+                            text("INSERT INTO tag_closure (ancestor_id, descendant_id, depth) "
+                                 "VALUES (:ancestor_id, :descendant_id, :depth)"),
+                            [{"ancestor_id": ancestor_id, "descendant_id": descendant_id, "depth": depth}
+                             for ancestor_id, descendant_id, depth in self.tag_index.closure]
+                        )
+                    connection.commit()
+            except Exception as e:
+                print(f"同步标签闭包表失败: {e}")
+                self.has_tag_closure = False
+        return True
+
+    def refresh(self):
+        """定期刷新标签闭包索引和论文目录"""
+        self.refresh_tags()
+        self.catalog.refresh()
+
+    def _touch_papers(self, connection, paper_ids: List[str]):
+        """推进论文的 updated_at，使其它进程的目录能增量感知关联数据的变化"""
+        if self.has_updated_at and paper_ids:
+            connection.execute(
+                text(f"UPDATE papers SET updated_at = {self._now_sql()} WHERE id = :paper_id"),
+                [{"paper_id": paper_id} for paper_id in paper_ids]
+            )
+
+    def fetch_paper_ids(self) -> set:
+        """数据库中全部论文的ID"""
+        with self._connect() as connection:
+            return {row[0] for row in connection.execute(text("SELECT id FROM papers"))}
+
+    def fetch_papers(self, since=None, paper_ids: Optional[List[str]] = None):
         """
-        df = pd.read_sql(query, engine)
+        从数据库读取论文
 
-        self.papers = []
-        for row in df.to_dict(orient="records"):
-            sample_paper = Paper(
+        Args:
+            since: 只读取 updated_at 不早于该水位的论文
+            paper_ids: 只读取指定ID的论文
+
+        Returns:
+            (论文列表, 本批数据的最大 updated_at, {论文ID: 待建索引的文本字段})
+        """
+        conditions = []
+        params: Dict[str, Any] = {}
+        if since is not None:
+            conditions.append("p.updated_at >= :since")
+            params["since"] = since
+        if paper_ids:
+            conditions.append("p.id IN :paper_ids")
+            params["paper_ids"] = list(paper_ids)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        updated_at = ", p.updated_at" if self.has_updated_at else ""
+
+        papers_query = text(f"""
+            SELECT {PAPER_LIST_COLUMNS}, p.title_ch, p.summary{updated_at}
+            FROM papers p
+            {where}
+        """)
+        # 标签单独查询后在内存中聚合，避免 JSON_ARRAYAGG 及其结果的二次解析
+        tags_query = text(f"""
+            SELECT pt.paper_id, t.id, t.name
+            FROM paper_tags pt
+            INNER JOIN tags t ON pt.tag_id = t.id
+            INNER JOIN papers p ON p.id = pt.paper_id
+            {where}
+            ORDER BY pt.id
+        """)
+        if paper_ids:
+            papers_query = papers_query.bindparams(bindparam("paper_ids", expanding=True))
+            tags_query = tags_query.bindparams(bindparam("paper_ids", expanding=True))
+
+        with self._connect() as connection:
+            paper_rows = connection.execute(papers_query, params).mappings().all()
+            tag_rows = connection.execute(tags_query, params).all() if paper_rows else []
+
+        watermark = None
+        if self.has_updated_at:
+            watermark = max((row['updated_at'] for row in paper_rows if row['updated_at'] is not None), default=None)
+        documents = {
+            row['id']: {
+                "title": row['title'] or "",
+                "title_ch": row['title_ch'] or "",
+                "summary": row['summary'] or "",
+                "summary_ch": row['summary_ch'] or "",
+                "authors": " ".join(_load_json_list(row['authors']))
+            }
+            for row in paper_rows
+        }
+        return self._rows_to_papers(paper_rows, tag_rows), watermark, documents
+
+    @staticmethod
+    def _rows_to_papers(paper_rows, tag_rows) -> List[Paper]:
+        """把论文行与 (paper_id, tag_id, tag_name) 标签行组装成 Paper 列表"""
+        tags_by_paper: Dict[str, tuple] = {}
+        for paper_id, tag_id, tag_name in tag_rows:
+            names, ids = tags_by_paper.setdefault(paper_id, ([], []))
+            names.append(tag_name)
+            ids.append(tag_id)
+
+        papers = []
+        for row in paper_rows:
+            tag_names, tag_ids = tags_by_paper.get(row['id'], ([], []))
+            papers.append(Paper(
                 title=row["title"],
-                authors=json.loads(row['authors']),
+                authors=_load_json_list(row['authors']),
                 summary=row['summary_ch'],
-                categories=json.loads(row['categories']),
-                published=row['published'],
+                categories=_load_json_list(row['categories']),
+                published=_format_published(row['published']),
                 paper_url=row['id'],
                 is_read=row['is_read'],
                 is_favorite=row['is_favorite'],
-                custom_tags=json.loads(row['custom_tags']) if row['custom_tags'] else [],
-                custom_tags_ids=json.loads(row['custom_tags_ids']) if row['custom_tags_ids'] else []
-            )
-            self.papers.append(sample_paper)
-        return self.papers
+                custom_tags=tag_names,
+                custom_tags_ids=tag_ids
+            ))
+        return papers
+
+    def query_papers(self, paper_query: "PaperQuery", limit: int, cursor: Optional[str] = None):
+        """
+        按过滤条件在数据库中做键集分页查询，代价只与页大小相关
+
+        Args:
+            paper_query: 过滤条件
+            limit: 每页数量
+            cursor: 上一页返回的 next_cursor
+
+        Returns:
+            (论文列表, 下一页游标；没有更多数据时为 None)
+        """
+        if paper_query.is_read is not None or paper_query.is_favorite is not None:
+            # 按状态过滤时先把缓冲的状态变更落库，保证过滤条件看到最新值
+            self.status_buffer.flush()
+        statement, params = paper_query.page_statement(limit + 1, cursor)
+        tags_query = text("""
+            SELECT pt.paper_id, t.id, t.name
+            FROM paper_tags pt
+            INNER JOIN tags t ON pt.tag_id = t.id
+            WHERE pt.paper_id IN :paper_ids
+            ORDER BY pt.id
+        """).bindparams(bindparam("paper_ids", expanding=True))
+
+        with self._connect() as connection:
+            paper_rows = connection.execute(statement, params).mappings().all()
+            has_more = len(paper_rows) > limit
+            paper_rows = paper_rows[:limit]
+            tag_rows = []
+            if paper_rows:
+                tag_rows = connection.execute(tags_query, {"paper_ids": [row['id'] for row in paper_rows]}).all()
+
+        next_cursor = None
+        if has_more and paper_rows:
+            last = paper_rows[-1]
+            next_cursor = PaperQuery.encode_cursor(last['published'], last['id'])
+        papers = self._rows_to_papers(paper_rows, tag_rows)
+        for paper in papers:
+            # 数据库中的阅读/收藏状态可能落后于写后缓冲
+            self.status_buffer.overlay(paper)
+        return papers, next_cursor
+
+    def iter_export_chunks(self, paper_query: "PaperQuery", chunk_size: int = EXPORT_CHUNK_SIZE):
+        """
+        通过服务端游标 (stream_results) 分批读取匹配的论文行，内存占用与语料规模无关
+
+        生成器持有数据库连接直到读完或被关闭；每次 next() 返回一批行字典。
+        """
+        statement, params = paper_query.export_statement()
+        with self._connect() as connection:
+            result = connection.execution_options(stream_results=True, max_row_buffer=chunk_size).execute(statement, params)
+            try:
+                for partition in result.mappings().partitions(chunk_size):
+                    yield partition
+            finally:
+                result.close()
+
+    def ensure_tag_index(self):
+        """首次使用时加载标签闭包索引"""
+        if not self.tag_index.loaded:
+            self.refresh_tags()
+
+    def get_tag_subtree(self, tag_id: int) -> List[int]:
+        """获取标签及其所有后代标签的ID"""
+        self.ensure_tag_index()
+        return self.tag_index.descendants(tag_id)
+
+    def get_paper(self, paper_id: str) -> Optional[Paper]:
+        """按主键获取单篇论文：先查内存目录，未命中时按 id 查询数据库"""
+        papers = self.get_papers_by_ids([paper_id])
+        return papers[0] if papers else None
+
+    def get_papers_by_ids(self, paper_ids: List[str]) -> List[Paper]:
+        """批量按主键获取论文（保持请求顺序，未命中目录的论文一次查询补齐）"""
+        found = {}
+        missing = []
+        for paper_id in paper_ids:
+            paper = self.catalog.get(paper_id)
+            if paper is not None:
+                found[paper_id] = paper
+            elif paper_id not in missing:
+                missing.append(paper_id)
+        if missing:
+            papers, _, _ = self.fetch_papers(paper_ids=missing)
+            for paper in papers:
+                self.status_buffer.overlay(paper)
+            found.update((paper.paper_url, paper) for paper in papers)
+        return [found[paper_id] for paper_id in paper_ids if paper_id in found]
 
     def get_all_papers(self, sort_by_date: bool = True) -> List[Paper]:
         """获取所有论文"""
-        papers = self._initialize_sample_data()
-        # papers = self.papers.copy()
-        if sort_by_date:
-            papers.sort(key=lambda x: x.published, reverse=True)
-        return papers
+        return self.catalog.all_papers(sort_by_date=sort_by_date)
 
     def get_papers_by_category(self, category: str) -> List[Paper]:
         """根据分类获取论文"""
-        return [paper for paper in self.papers if category in paper.categories]
+        return self.catalog.papers_in_category(category)
 
     def get_papers_by_tag(self, tag: str) -> List[Paper]:
-        connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-        engine = create_engine(connection_string)
-        query = "select id, name, parent_id from tags"
-        df = pd.read_sql(query, engine)
-        all_children, id_to_name = find_all_children(df)
-        tag_children = set(all_children[int(tag)])
-        tag_children.add(int(tag))
-
-        """根据分类获取论文"""
-        return [paper for paper in self.papers if tag_children.intersection(set(paper.custom_tags_ids))]
+        """根据标签（含所有后代标签）获取论文"""
+        self.ensure_tag_index()
+        subtree = self.tag_index.descendant_bitmap(int(tag))
+        return [paper for paper in self.get_all_papers() if subtree & self.tag_index.bitmap(paper.custom_tags_ids)]
 
     def search_papers(self, query: str) -> List[Paper]:
-        """搜索论文"""
-        query = query.lower()
-        results = []
-        for paper in self.papers:
-            if (query in paper.title.lower() or
-                    any(query in author.lower() for author in paper.authors) or
-                    query in paper.summary.lower()):
-                results.append(paper)
-        return results
+        """搜索论文（倒排索引，按相关度排序）"""
+        papers, _ = self.catalog.search(query)
+        return papers
 
     def add_paper(self, paper_data: Dict[str, Any]) -> Paper:
         """添加新论文"""
@@ -180,21 +1754,14 @@ class PaperStorage:
             published=paper_data.get("published"),
             paper_url=paper_data.get("paper_url")
         )
-        self.papers.append(paper)
+        self.catalog.add(paper)
         return paper
 
     def get_read_papers(self) -> List[str]:
         """获取已读论文ID列表"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
-            # 查询已读论文ID
-            query = "SELECT id FROM papers WHERE `read` = 1"
-            df = pd.read_sql(query, engine)
-
-            # 返回ID列表
-            return df['id'].tolist()
+            # 已读状态由目录写穿维护，直接在内存中筛选
+            return [paper.paper_url for paper in self.get_all_papers(sort_by_date=False) if paper.is_read]
 
         except Exception as e:
             print(f"获取已读论文失败: {e}")
@@ -203,71 +1770,248 @@ class PaperStorage:
     def get_favorite_papers(self) -> List[str]:
         """获取收藏论文ID列表"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
-            # 查询收藏论文ID
-            query = "SELECT id FROM papers WHERE favorite = 1"
-            df = pd.read_sql(query, engine)
-
-            # 返回ID列表
-            return df['id'].tolist()
+            # 收藏状态由目录写穿维护，直接在内存中筛选
+            return [paper.paper_url for paper in self.get_all_papers(sort_by_date=False) if paper.is_favorite]
 
         except Exception as e:
             print(f"获取收藏论文失败: {e}")
             return []
 
+    def write_statuses(self, statuses: Dict[tuple, int]):
+        """按 {(paper_id, "read" | "favorite"): 0/1} 批量写入阅读/收藏状态（单个事务）"""
+        params = {"read": [], "favorite": []}
+        for (paper_id, field), value in statuses.items():
+            params[field].append({"paper_id": paper_id, "value": value})
+        with self._connect() as connection:
+            if params["read"]:
+                connection.execute(text("UPDATE papers SET `read` = :value WHERE id = :paper_id"), params["read"])
+            if params["favorite"]:
+                connection.execute(text("UPDATE papers SET favorite = :value WHERE id = :paper_id"), params["favorite"])
+            connection.commit()
+
     def update_paper_read_status(self, paper_id: str, is_read: bool) -> bool:
-        """更新论文阅读状态"""
+        """更新论文阅读状态（经写后缓冲合并写库）"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
-            # 更新数据库中的read字段
-            with engine.connect() as connection:
-                query = text("UPDATE papers SET `read` = :read_status WHERE id = :paper_id")
-                result = connection.execute(query, {"read_status": 1 if is_read else 0, "paper_id": paper_id})
-                connection.commit()
-
-            return True
+            return self.status_buffer.submit(paper_id, "read", is_read)
 
         except Exception as e:
             print(f"更新论文阅读状态失败: {e}")
             return False
 
     def update_paper_favorite_status(self, paper_id: str, is_favorite: bool) -> bool:
-        """更新论文收藏状态"""
+        """更新论文收藏状态（经写后缓冲合并写库）"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
+            return self.status_buffer.submit(paper_id, "favorite", is_favorite)
+
+        except Exception as e:
+            print(f"更新论文收藏状态失败: {e}")
+            return False
+
+    def _validate_mutation(self, mutation) -> Optional[str]:
+        """校验单条批量变更，返回错误信息（合法时返回 None）"""
+        if not isinstance(mutation, dict):
+            return "变更必须是JSON对象"
+        op = mutation.get("op")
+        if op not in BATCH_MUTATION_OPS:
+            return f"不支持的操作: {op}"
+        if not isinstance(mutation.get("paper_id"), str) or not mutation["paper_id"]:
+            return "缺少必要的参数: paper_id"
+        if op in ("add_tag", "remove_tag"):
+            try:
+                mutation["tag_id"] = int(mutation.get("tag_id"))
+            except (TypeError, ValueError):
+                return "缺少必要的参数: tag_id"
+            self.ensure_tag_index()
+            if mutation["tag_id"] not in self.tag_index.names:
+                return f"标签不存在: {mutation['tag_id']}"
+        return None
+
+    def apply_mutations(self, mutations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        在一个事务中批量应用阅读/收藏/标签变更
+
+        Args:
+            mutations: 变更列表，每项为
+                {"op": "read" | "favorite", "paper_id": ..., "value": true/false} 或
+                {"op": "add_tag" | "remove_tag", "paper_id": ..., "tag_id": ...}
 
-            # 更新数据库中的favorite字段
-            with engine.connect() as connection:
-                query = text("UPDATE papers SET favorite = :favorite_status WHERE id = :paper_id")
-                result = connection.execute(query, {"favorite_status": 1 if is_favorite else 0, "paper_id": paper_id})
+        Returns:
+            与输入一一对应的结果 {"index", "success", "status" 或 "error"}，
+            status 为 updated / added / removed / unchanged
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(mutations)
+        valid = []
+        for index, mutation in enumerate(mutations):
+            error = self._validate_mutation(mutation)
+            if error:
+                results[index] = {"index": index, "success": False, "error": error}
+            else:
+                valid.append((index, mutation))
+        if not valid:
+            return results
+
+        paper_ids = sorted({mutation["paper_id"] for _, mutation in valid})
+        # 同一批次内按顺序生效：状态取最后一次的值，标签按最终集合计算增删
+        statuses = {"read": {}, "favorite": {}}
+        tagged_ids = set()
+        try:
+            with self._connect() as connection:
+                existing = {
+                    row[0] for row in connection.execute(
+                        text("SELECT id FROM papers WHERE id IN :paper_ids").bindparams(
+                            bindparam("paper_ids", expanding=True)),
+                        {"paper_ids": paper_ids}
+                    )
+                }
+                initial_pairs = {
+                    (row[0], int(row[1])) for row in connection.execute(
+                        text("SELECT paper_id, tag_id FROM paper_tags WHERE paper_id IN :paper_ids").bindparams(
+                            bindparam("paper_ids", expanding=True)),
+                        {"paper_ids": paper_ids}
+                    )
+                }
+
+                pairs = set(initial_pairs)
+                for index, mutation in valid:
+                    paper_id, op = mutation["paper_id"], mutation["op"]
+                    if paper_id not in existing:
+                        results[index] = {"index": index, "success": False, "error": f"论文不存在: {paper_id}"}
+                        continue
+                    if op in statuses:
+                        statuses[op][paper_id] = 1 if mutation.get("value") else 0
+                        status = "updated"
+                    else:
+                        pair = (paper_id, mutation["tag_id"])
+                        tagged_ids.add(paper_id)
+                        if op == "add_tag":
+                            status = "unchanged" if pair in pairs else "added"
+                            pairs.add(pair)
+                        else:
+                            status = "removed" if pair in pairs else "unchanged"
+                            pairs.discard(pair)
+                    results[index] = {"index": index, "success": True, "status": status}
+
+                # 每类变更一次 executemany
+                if statuses["read"]:
+                    connection.execute(
+                        text("UPDATE papers SET `read` = :value WHERE id = :paper_id"),
+                        [{"paper_id": paper_id, "value": value} for paper_id, value in statuses["read"].items()]
+                    )
+                if statuses["favorite"]:
+                    connection.execute(
+                        text("UPDATE papers SET favorite = :value WHERE id = :paper_id"),
+                        [{"paper_id": paper_id, "value": value} for paper_id, value in statuses["favorite"].items()]
+                    )
+                added = sorted(pairs - initial_pairs)
+                if added:
+                    connection.execute(
+                        text("INSERT INTO paper_tags (paper_id, tag_id) VALUES (:paper_id, :tag_id)"),
+                        [{"paper_id": paper_id, "tag_id": tag_id} for paper_id, tag_id in added]
+                    )
+                removed = sorted(initial_pairs - pairs)
+                if removed:
+                    connection.execute(
+                        text("DELETE FROM paper_tags WHERE paper_id = :paper_id AND tag_id = :tag_id"),
+                        [{"paper_id": paper_id, "tag_id": tag_id} for paper_id, tag_id in removed]
+                    )
+                self._touch_papers(connection, sorted(tagged_ids))
                 connection.commit()
 
-            return True
+        except Exception as e:
+            print(f"批量更新论文失败: {e}")
+            # 事务整体回滚，所有合法变更均视为失败
+            for index, _ in valid:
+                results[index] = {"index": index, "success": False, "error": str(e)}
+            return results
+
+        # 批量写入比缓冲中尚未落库的切换更新
+        self.status_buffer.discard([(paper_id, field) for field in statuses for paper_id in statuses[field]])
+
+        # 写穿到内存目录
+        for paper_id, value in statuses["read"].items():
+            self.catalog.update_paper(paper_id, is_read=bool(value))
+        for paper_id, value in statuses["favorite"].items():
+            self.catalog.update_paper(paper_id, is_favorite=bool(value))
+        if tagged_ids:
+            self.catalog.reload_papers(sorted(tagged_ids))
+        return results
+
+    def get_fulltext_index(self, paper_id: str) -> Optional[Dict[str, Any]]:
+        """
+        获取论文中文全文的章节索引，没有全文时返回 None
 
+        首次访问时从 papers.fulltext_ch 分节压缩写入 paper_fulltexts；
+        压缩表不可用时索引只在内存中生成，正文直接从 fulltext_ch 截取。
+        """
+        if self.has_paper_fulltexts:
+            with self._connect() as connection:
+                row = connection.execute(
+                    text("SELECT section_index FROM paper_fulltexts WHERE paper_id = :paper_id"),
+                    {"paper_id": paper_id}
+                ).first()
+            if row is not None:
+                return json.loads(row.section_index)
+
+        with self._connect() as connection:
+            row = connection.execute(
+                text("SELECT fulltext_ch FROM papers WHERE id = :paper_id"), {"paper_id": paper_id}
+            ).first()
+        if row is None or not row.fulltext_ch:
+            return None
+
+        index, content = encode_fulltext(row.fulltext_ch)
+        if not self.has_paper_fulltexts:
+            index["encoding"] = None
+            return index
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(text("""
+                    INSERT INTO paper_fulltexts (paper_id, section_index, content)
+                    VALUES (:paper_id, :section_index, :content)
+                """), {"paper_id": paper_id, "section_index": json.dumps(index, ensure_ascii=False),
+                       "content": content})
         except Exception as e:
-            print(f"更新论文收藏状态失败: {e}")
-            return False
+            # 并发请求可能已经写入了同一篇论文
+            print(f"保存压缩全文失败: {e}")
+        return index
+
+    def read_fulltext_sections(self, paper_id: str, index: Dict[str, Any], first: int, last: int) -> str:
+        """读取第 first 到第 last 节（含）的全文"""
+        sections = index["sections"][first:last + 1]
+        if not sections:
+            return ""
+        if index["encoding"] is None:
+            with self._connect() as connection:
+                row = connection.execute(
+                    text("SELECT SUBSTR(fulltext_ch, :start, :length) AS fulltext FROM papers WHERE id = :paper_id"),
+                    {"paper_id": paper_id, "start": sections[0]["offset"] + 1,
+                     "length": sum(section["length"] for section in sections)}
+                ).first()
+            return row.fulltext if row is not None and row.fulltext else ""
+
+        # 各节的压缩数据首尾相接，一次取出需要的字节范围
+        base = sections[0]["start"]
+        with self._connect() as connection:
+            row = connection.execute(
+                text("SELECT SUBSTR(content, :start, :size) AS content FROM paper_fulltexts WHERE paper_id = :paper_id"),
+                {"paper_id": paper_id, "start": base + 1, "size": sum(section["size"] for section in sections)}
+            ).first()
+        if row is None:
+            return ""
+        content = bytes(row.content)
+        return "".join(
+            decompress_fulltext_section(content[section["start"] - base:section["start"] - base + section["size"]],
+                                        index["encoding"]).decode("utf-8")
+            for section in sections
+        )
 
     def get_chinese_fulltext(self, paper_id: str) -> str:
         """获取论文中文全文"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
-            # 查询指定论文的中文全文
-            query = text("SELECT fulltext_ch FROM papers WHERE id = :paper_id")
-            df = pd.read_sql(query, engine, params={"paper_id": paper_id})
-            print(query, df)
-
-            if not df.empty:
-                return df.iloc[0]['fulltext_ch'] or ""
-            else:
+            index = self.get_fulltext_index(paper_id)
+            if index is None:
                 return ""
+            return self.read_fulltext_sections(paper_id, index, 0, len(index["sections"]) - 1)
 
         except Exception as e:
             print(f"获取论文中文全文失败: {e}")
@@ -277,20 +2021,16 @@ class PaperStorage:
     def get_custom_tags(self):
         """获取自定义标签体系（倒置树形结构）"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
-            # 查询所有标签
-            query = "SELECT id, name, parent_id FROM tags ORDER BY parent_id, id"
-            df = pd.read_sql(query, engine)
+            # 标签数据来自闭包索引（与响应缓存使用同一版本）
+            self.ensure_tag_index()
 
             # 构建树形结构
             tags_dict = {}
             root_tags = []
 
-            # 创建标签对象
-            for _, row in df.iterrows():
-                tag = Tag(row['id'], row['name'], row['parent_id'])
+            # 创建标签对象（按 parent_id, id 排序）
+            for tag_id, name, parent_id in sorted(self.tag_index.rows, key=lambda row: (row[2], row[0])):
+                tag = Tag(tag_id, name, parent_id)
                 tags_dict[tag.id] = tag
 
             # 建立父子关系
@@ -319,15 +2059,15 @@ class PaperStorage:
     def add_paper_tag(self, paper_id, tag_id):
         """为论文添加标签"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
             # 插入标签关联记录
-            with engine.connect() as connection:
+            with self._connect() as connection:
                 query = text("INSERT INTO paper_tags (paper_id, tag_id) VALUES (:paper_id, :tag_id)")
                 result = connection.execute(query, {"paper_id": paper_id, "tag_id": tag_id})
+                self._touch_papers(connection, [paper_id])
                 connection.commit()
 
+            # 写穿到内存目录
+            self.catalog.reload_papers([paper_id])
             return True
 
         except Exception as e:
@@ -337,9 +2077,6 @@ class PaperStorage:
     def get_paper_tags(self, paper_id):
         """获取论文的自定义标签"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
             # 查询论文的标签
             query = text("""
                 SELECT t.id, t.name 
@@ -347,7 +2084,7 @@ class PaperStorage:
                 JOIN tags t ON pt.tag_id = t.id 
                 WHERE pt.paper_id = :paper_id
             """)
-            df = pd.read_sql(query, engine, params={"paper_id": paper_id})
+            df = self._read_sql(query, params={"paper_id": paper_id})
 
             # 转换为字典格式
             tags = []
@@ -366,52 +2103,32 @@ class PaperStorage:
     def remove_paper_tag(self, paper_id, tag_id):
         """为论文删除标签"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
             # 删除标签关联记录
-            with engine.connect() as connection:
+            with self._connect() as connection:
                 query = text("DELETE FROM paper_tags WHERE paper_id = :paper_id AND tag_id = :tag_id")
                 result = connection.execute(query, {"paper_id": paper_id, "tag_id": tag_id})
+                self._touch_papers(connection, [paper_id])
                 connection.commit()
 
+            # 写穿到内存目录
+            self.catalog.reload_papers([paper_id])
             return True
 
         except Exception as e:
             print(f"为论文删除标签失败: {e}")
             return False
 
+    def get_facets(self, paper_query: PaperQuery) -> Dict[str, Any]:
+        """获取当前过滤条件下各分类、标签、阅读/收藏状态和时间窗口的论文数"""
+        self.ensure_tag_index()
+        return self.catalog.facet_counts(paper_query)
+
     def get_categories(self) -> List[Dict[str, Any]]:
-        """获取所有论文分类"""
+        """获取所有论文分类及每个分类的论文数"""
         try:
-            connection_string = f"mysql+pymysql://{self.db_config['user']}:{self.db_config['password']}@{self.db_config['host']}/{self.db_config['database']}"
-            engine = create_engine(connection_string)
-
-            # 查询所有不同的分类
-            query = "SELECT DISTINCT categories FROM papers"
-            df = pd.read_sql(query, engine)
-
-            # 解析分类数据并去重
-            categories = set()
-            for _, row in df.iterrows():
-                if row['categories']:
-                    try:
-                        cats = json.loads(row['categories'])
-                        if isinstance(cats, list):
-                            categories.update(cats)
-                    except json.JSONDecodeError:
-                        # 如果不是JSON格式，直接添加原始值
-                        categories.add(row['categories'])
-
-            # 转换为字典格式
-            result = []
-            for category in sorted(categories):
-                result.append({
-                    "id": category,
-                    "name": category
-                })
-
-            return result
+            # 直接读取目录维护的分类倒排表
+            counts = self.catalog.category_counts()
+            return [{"id": category, "name": category, "count": counts[category]} for category in sorted(counts)]
 
         except Exception as e:
             print(f"获取分类失败: {e}")
@@ -426,20 +2143,276 @@ class Tag:
         self.children = []
 
 
+class CachedResponse:
+    """预编码的响应体及其压缩版本"""
+
+    __slots__ = ("version", "body", "etag", "encoded")
+
+    def __init__(self, version, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = f'"{hashlib.sha1(body).hexdigest()}"'
+        # 按内容编码缓存压缩结果：{"gzip": bytes, "br": bytes}
+        self.encoded: Dict[str, bytes] = {}
+
+    def compressed(self, encoding: str) -> bytes:
+        if encoding not in self.encoded:
+            if encoding == "br":
+                self.encoded[encoding] = brotli.compress(self.body)
+            else:
+                self.encoded[encoding] = gzip.compress(self.body, compresslevel=6)
+        return self.encoded[encoding]
+
+
+class ResponseCache:
+    """
+    GET 接口响应缓存
+
+    以 (命名空间, 路径, 规范化查询参数) 为键，保存预编码的 JSON 字节及强 ETag；
+    每个命名空间有各自的数据版本，版本变化时只清除该命名空间的缓存。
+    """
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, CachedResponse]" = OrderedDict()
+        self._versions: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(namespace: str, path: str, query_arguments: Dict[str, List[bytes]]) -> tuple:
+        """规范化查询参数（排序、去掉空值），使参数顺序不同的请求共享缓存"""
+        arguments = tuple(sorted((name, tuple(values)) for name, values in query_arguments.items()
+                                 if any(values)))
+        return namespace, path, arguments
+
+    def get(self, key: tuple, version) -> Optional[CachedResponse]:
+        with self._lock:
+            self._check_version(key[0], version)
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: tuple, version, body: bytes) -> CachedResponse:
+        entry = CachedResponse(version, body)
+        with self._lock:
+            self._check_version(key[0], version)
+            if self._versions.get(key[0]) == version:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return entry
+
+    def _check_version(self, namespace: str, version):
+        """命名空间的数据版本变化时清除其全部旧缓存"""
+        if self._versions.get(namespace) != version:
+            self._versions[namespace] = version
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": sum(len(entry.body) for entry in self._entries.values()),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+class StorageTimeoutError(Exception):
+    """数据库请求超时"""
+
+
 class BaseHandler(tornado.web.RequestHandler):
     """基础处理器类"""
+
+    # JSON 序列化函数，可在子类中替换
+    json_encoder = staticmethod(json_dumps)
+
+    def write(self, chunk):
+        """字典/列表通过 json_encoder 序列化（替代 Tornado 默认的 json_encode）"""
+        if isinstance(chunk, (dict, list)):
+            self.set_header("Content-Type", "application/json; charset=UTF-8")
+            chunk = self.json_encoder(chunk)
+        super().write(chunk)
     def set_default_headers(self):
         """设置默认响应头"""
         self.set_header("Access-Control-Allow-Origin", "*")
         self.set_header("Access-Control-Allow-Headers",
                         "Content-Type, Access-Control-Allow-Headers, Authorization, X-Requested-With")
         self.set_header("Access-Control-Allow-Methods", "GET, POST, PUT, DELETE, OPTIONS")
+        self.set_header("Access-Control-Expose-Headers", "X-Catalog-Version, Deprecation, ETag")
 
     def options(self, *args):
         """处理OPTIONS请求（CORS预检）"""
         self.set_status(204)
         self.finish()
 
+    async def run_blocking(self, func, *args, timeout: Optional[float] = None, **kwargs):
+        """
+        在有界线程池中执行阻塞的数据库/pandas操作，避免阻塞 IOLoop
+
+        超时抛出 StorageTimeoutError；客户端断开连接时取消尚未开始执行的任务。
+        """
+        loop = tornado.ioloop.IOLoop.current()
+        future = loop.run_in_executor(self.settings.get("executor"), functools.partial(func, *args, **kwargs))
+        if not hasattr(self, "_pending_futures"):
+            self._pending_futures = set()
+        self._pending_futures.add(future)
+        try:
+            return await asyncio.wait_for(future, timeout or self.settings.get("db_timeout", DB_REQUEST_TIMEOUT))
+        except asyncio.TimeoutError:
+            raise StorageTimeoutError("数据库请求超时")
+        finally:
+            self._pending_futures.discard(future)
+
+    def on_connection_close(self):
+        """客户端断开连接时取消排队中的数据库任务"""
+        for future in getattr(self, "_pending_futures", ()):
+            future.cancel()
+
+    async def write_cached(self, namespace: str, version, build):
+        """
+        返回缓存的预编码JSON响应，支持 ETag / If-None-Match (304) 和 gzip/brotli 压缩
+
+        Args:
+            namespace: 缓存命名空间
+            version: 数据版本（必须在构造响应之前读取），变化时缓存失效
+            build: 无参协程，返回响应字典；success 为 False 时不缓存
+        """
+        cache: ResponseCache = self.settings["response_cache"]
+        key = cache.make_key(namespace, self.request.path, self.request.query_arguments)
+        entry = cache.get(key, version)
+        if entry is None:
+            payload = await build()
+            body = self.json_encoder(payload)
+            if not payload.get("success", True):
+                self.set_header("Content-Type", "application/json; charset=UTF-8")
+                self.write(body)
+                return
+            entry = cache.put(key, version, body)
+
+        self.set_header("Content-Type", "application/json; charset=UTF-8")
+        self.set_header("Vary", "Accept-Encoding")
+        accept_encoding = self.request.headers.get("Accept-Encoding", "")
+        encoding = None
+        if len(entry.body) >= RESPONSE_COMPRESS_MIN_BYTES:
+            if brotli is not None and "br" in accept_encoding:
+                encoding = "br"
+            elif "gzip" in accept_encoding:
+                encoding = "gzip"
+
+        # 不同内容编码是不同的表示，使用不同的强 ETag
+        self.set_header("ETag", entry.etag if encoding is None else f'{entry.etag[:-1]}-{encoding}"')
+        if self.check_etag_header():
+            self.set_status(304)
+            return
+        if encoding is None:
+            self.write(entry.body)
+        else:
+            self.set_header("Content-Encoding", encoding)
+            self.write(entry.compressed(encoding))
+
+    def _get_bool_argument(self, name: str) -> Optional[bool]:
+        """解析 0/1/true/false 形式的过滤参数，未提供时返回 None"""
+        value = self.get_argument(name, None)
+        if value is None or value == "":
+            return None
+        return value.lower() in ("1", "true", "yes")
+
+    def error_status(self, error: Exception) -> int:
+        """根据异常类型返回HTTP状态码"""
+        return 504 if isinstance(error, StorageTimeoutError) else 500
+
+
+class DiagnosticsHandler(BaseHandler):
+    """运行状态诊断接口"""
+
+    def initialize(self, storage: PaperStorage):
+        self.storage = storage
+
+    async def get(self):
+        """获取连接池等运行状态"""
+        try:
+            self.write({
+                "success": True,
+                "data": {
+                    "pool": self.storage.pool_stats.snapshot(),
+                    "json_backend": JSON_BACKEND,
+                    "catalog": self.storage.catalog.stats(),
+                    "response_cache": self.settings["response_cache"].stats(),
+                    "status_buffer": self.storage.status_buffer.stats(),
+                    "tags": {
+                        "generation": self.storage.tag_index.generation,
+                        "size": len(self.storage.tag_index.names),
+                        "closure_rows": len(self.storage.tag_index.closure),
+                        "closure_table": self.storage.has_tag_closure
+                    }
+                }
+            })
+
+        except Exception as e:
+            self.set_status(self.error_status(e))
+            self.write({
+                "success": False,
+                "error": str(e)
+            })
+
+
+class FacetsHandler(BaseHandler):
+    """分面计数接口"""
+
+    def initialize(self, storage: PaperStorage):
+        self.storage = storage
+
+    async def get(self):
+        """获取当前过滤条件下的分面计数（参数同 /api/papers）"""
+        try:
+            tag_id = self.get_argument("tag_id", None)
+            days = self.get_argument("days", None)
+            paper_query = PaperQuery(
+                category=self.get_argument("category", None) or None,
+                tag_id=int(tag_id) if tag_id else None,
+                search=self.get_argument("search", None) or None,
+                days=int(days) if days else None,
+                is_read=self._get_bool_argument("is_read"),
+                is_favorite=self._get_bool_argument("is_favorite")
+            )
+        except ValueError as e:
+            self.set_status(400)
+            self.write({
+                "success": False,
+                "error": str(e)
+            })
+            return
+
+        try:
+            async def build():
+                facets = await self.run_blocking(self.storage.get_facets, paper_query)
+                return {
+                    "success": True,
+                    "data": facets
+                }
+
+            # 时间窗口按天变化，版本中带上日期
+            version = (self.storage.catalog.generation, self.storage.tag_index.generation,
+                       datetime.date.today().isoformat())
+            await self.write_cached("facets", version, build)
+
+        except Exception as e:
+            self.set_status(self.error_status(e))
+            self.write({
+                "success": False,
+                "error": str(e)
+            })
+
 
 class CategoriesHandler(BaseHandler):
     """分类接口"""
@@ -449,15 +2422,18 @@ class CategoriesHandler(BaseHandler):
     async def get(self):
         """获取所有分类"""
         try:
-            categories = self.storage.get_categories()
+            async def build():
+                categories = await self.run_blocking(self.storage.get_categories)
+                return {
+                    "success": True,
+                    "data": list(categories)
+                }
 
-            self.write({
-                "success": True,
-                "data": list(categories)
-            })
+            # 分类来自论文数据，随目录版本失效
+            await self.write_cached("categories", self.storage.catalog.generation, build)
 
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -477,47 +2453,137 @@ class PapersHandler(BaseHandler):
             category = self.get_argument("category", None)
             tag_id = self.get_argument("tag_id", None)  # 添加标签过滤参数
             search = self.get_argument("search", None)
-            limit = int(self.get_argument("limit", 100))
-            offset = int(self.get_argument("offset", 0))
-
-            # 获取论文数据
-            if category:
-                papers = self.storage.get_papers_by_category(category)
-            elif tag_id:
-                papers = self.storage.get_papers_by_tag(tag_id)
-            elif search:
-                papers = self.storage.search_papers(search)
-            else:
-                papers = self.storage.get_all_papers()
-
-            # 分页处理
-            total_count = len(papers)
-            papers = papers[offset:offset + limit]
-
-            # 转换为字典格式
-            papers_data = [paper.to_dict() for paper in papers]
-
-            # 返回JSON响应
-            response = {
-                "success": True,
-                "data": papers_data,
-                "pagination": {
-                    "total": total_count,
-                    "limit": limit,
-                    "offset": offset,
-                    "has_more": offset + limit < total_count
-                }
-            }
-
-            self.write(response)
-
+            days = self.get_argument("days", None)  # 只返回最近N天发布的论文
+            cursor = self.get_argument("cursor", None)
+            offset = self.get_argument("offset", None)
+            is_read = self._get_bool_argument("is_read")
+            is_favorite = self._get_bool_argument("is_favorite")
+            limit = min(int(self.get_argument("limit", 100)), MAX_PAGE_SIZE)
+            if limit < 1:
+                raise ValueError("limit 必须为正整数")
+            if offset is not None and int(offset) < 0:
+                raise ValueError("offset 不能为负数")
+
+            # 按ID批量获取：?ids=a,b,c（也可重复传 ids 参数）
+            paper_ids = [paper_id for value in self.get_arguments("ids") for paper_id in value.split(",") if paper_id]
+            paper_ids = paper_ids[:MAX_PAGE_SIZE]
+
+            # 数据版本在构造响应前读取：目录或标签体系变化时论文列表缓存失效
+            version = (self.storage.catalog.generation, self.storage.tag_index.generation)
+            if days:
+                # 时间窗口的结果随日期推移变化
+                version += (datetime.date.today().isoformat(),)
+            self.set_header("X-Catalog-Version", str(version[0]))
+
+            async def build():
+                if paper_ids:
+                    papers = await self.run_blocking(self.storage.get_papers_by_ids, paper_ids)
+                    found = {paper.paper_url for paper in papers}
+                    return {
+                        "success": True,
+                        "version": self.storage.catalog.generation,
+                        "data": [paper.to_dict() for paper in papers],
+                        "missing": [paper_id for paper_id in paper_ids if paper_id not in found]
+                    }
+                if offset is not None:
+                    # 兼容旧的 limit/offset 分页（慢路径：需要物化完整结果后再切片）
+                    return await self.run_blocking(self._offset_page, category, tag_id, search, days,
+                                                   is_read, is_favorite, limit, int(offset))
+                return await self.run_blocking(self._cursor_page, category, tag_id, search, days,
+                                               is_read, is_favorite, cursor, limit)
+
+            if offset is not None and not paper_ids:
+                self.set_header("Deprecation", "true")
+            await self.write_cached("papers", version, build)
+
+        except ValueError as e:
+            self.set_status(400)
+            self.write({
+                "success": False,
+                "error": str(e)
+            })
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
             })
 
+    def _paper_query(self, category, tag_id, days, is_read, is_favorite) -> "PaperQuery":
+        """两种分页方式共用的过滤条件"""
+        return PaperQuery(
+            category=category or None,
+            tag_id=int(tag_id) if tag_id else None,
+            tag_ids=self.storage.get_tag_subtree(int(tag_id)) if tag_id and not self.storage.has_tag_closure else None,
+            days=int(days) if days else None,
+            is_read=is_read,
+            is_favorite=is_favorite,
+            category_table=self.storage.has_paper_categories
+        )
+
+    def _memory_predicate(self, paper_query: "PaperQuery"):
+        """在内存目录上判断过滤条件的函数，没有过滤条件时为 None"""
+        if not paper_query.has_filters():
+            return None
+        self.storage.ensure_tag_index()
+        return lambda paper: paper_query.matches(paper, self.storage.tag_index)
+
+    def _cursor_page(self, category, tag_id, search, days, is_read, is_favorite, cursor, limit) -> Dict[str, Any]:
+        """按游标返回一页论文（在线程池中执行）"""
+        paper_query = self._paper_query(category, tag_id, days, is_read, is_favorite)
+        pagination = {"limit": limit, "cursor": cursor}
+        if search:
+            # 搜索走内存倒排索引，按相关度排序，游标为排名偏移
+            start = PaperQuery.decode_rank_cursor(cursor) if cursor else 0
+            papers, total = self.storage.catalog.search(search, predicate=self._memory_predicate(paper_query),
+                                                        limit=limit, offset=start)
+            next_cursor = PaperQuery.encode_rank_cursor(start + limit) if start + limit < total else None
+            pagination["total"] = total
+        else:
+            papers, next_cursor = self.storage.query_papers(paper_query, limit, cursor)
+        pagination.update({"next_cursor": next_cursor, "has_more": next_cursor is not None})
+
+        return {
+            "success": True,
+            "version": self.storage.catalog.generation,
+            "data": [paper.to_dict() for paper in papers],
+            "pagination": pagination
+        }
+
+    def _offset_page(self, category, tag_id, search, days, is_read, is_favorite, limit, offset) -> Dict[str, Any]:
+        """
+        按 limit/offset 返回论文列表（已废弃，建议使用 cursor 分页；在线程池中执行）
+
+        过滤条件与游标分页相同，在内存目录上判断。
+        """
+        paper_query = self._paper_query(category, tag_id, days, is_read, is_favorite)
+        predicate = self._memory_predicate(paper_query)
+        if search:
+            papers, total_count = self.storage.catalog.search(search, predicate=predicate, limit=limit, offset=offset)
+        else:
+            papers = self.storage.get_all_papers()
+            if predicate is not None:
+                papers = [paper for paper in papers if predicate(paper)]
+            total_count = len(papers)
+            papers = papers[offset:offset + limit]
+
+        # 转换为字典格式
+        papers_data = [paper.to_dict() for paper in papers]
+
+        # 返回JSON响应，version 为目录版本号，数据变化时递增
+        response = {
+            "success": True,
+            "version": self.storage.catalog.generation,
+            "data": papers_data,
+            "pagination": {
+                "total": total_count,
+                "limit": limit,
+                "offset": offset,
+                "has_more": offset + limit < total_count
+            }
+        }
+        return response
+
     async def post(self):
         """添加新论文（示例）"""
         try:
@@ -535,7 +2601,7 @@ class PapersHandler(BaseHandler):
                     return
 
             # 添加论文
-            paper = self.storage.add_paper(data)
+            paper = await self.run_blocking(self.storage.add_paper, data)
 
             self.write({
                 "success": True,
@@ -549,7 +2615,7 @@ class PapersHandler(BaseHandler):
                 "error": "Invalid JSON data"
             })
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -557,6 +2623,97 @@ class PapersHandler(BaseHandler):
 
 
 # 添加处理器
+class PapersExportHandler(BaseHandler):
+    """论文导出接口（NDJSON / CSV 流式输出）"""
+
+    def initialize(self, storage: PaperStorage):
+        self.storage = storage
+
+    async def get(self):
+        """按与论文列表相同的过滤条件导出全部论文，分块写出"""
+        export_format = self.get_argument("format", "ndjson")
+        if export_format not in ("ndjson", "csv"):
+            self.set_status(400)
+            self.write({
+                "success": False,
+                "error": "format 只支持 ndjson 或 csv"
+            })
+            return
+
+        try:
+            tag_id = self.get_argument("tag_id", None)
+            days = self.get_argument("days", None)
+            paper_query = PaperQuery(
+                category=self.get_argument("category", None) or None,
+                tag_id=int(tag_id) if tag_id else None,
+                tag_ids=await self.run_blocking(self.storage.get_tag_subtree, int(tag_id))
+                if tag_id and not self.storage.has_tag_closure else None,
+                search=self.get_argument("search", None) or None,
+                days=int(days) if days else None,
+                is_read=self._get_bool_argument("is_read"),
+                is_favorite=self._get_bool_argument("is_favorite"),
+                category_table=self.storage.has_paper_categories
+            )
+            if paper_query.search:
+                # 与论文列表、分面计数使用同一个倒排索引解析搜索词
+                hits, _ = await self.run_blocking(self.storage.catalog.search, paper_query.search)
+                paper_query.search_ids = [paper.paper_url for paper in hits]
+        except ValueError as e:
+            self.set_status(400)
+            self.write({
+                "success": False,
+                "error": str(e)
+            })
+            return
+
+        if export_format == "csv":
+            self.set_header("Content-Type", "text/csv; charset=UTF-8")
+            self.set_header("Content-Disposition", 'attachment; filename="papers.csv"')
+        else:
+            self.set_header("Content-Type", "application/x-ndjson; charset=UTF-8")
+
+        chunks = self.storage.iter_export_chunks(paper_query)
+        try:
+            if export_format == "csv":
+                self.write(self._csv_lines([PAPER_EXPORT_FIELDS]))
+            while True:
+                rows = await self.run_blocking(next, chunks, None)
+                if rows is None:
+                    break
+                if export_format == "csv":
+                    self.write(self._csv_lines(
+                        [_format_published(row[field]) if field == "published" else row[field]
+                         for field in PAPER_EXPORT_FIELDS]
+                        for row in rows
+                    ))
+                else:
+                    for row in rows:
+                        record = dict(row)
+                        record["authors"] = _load_json_list(record["authors"])
+                        record["categories"] = _load_json_list(record["categories"])
+                        self.write(self.json_encoder(record) + b"\n")
+                # 每批写出后立即刷新，连接上不积压整个语料
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            # 客户端中途断开
+            pass
+        except Exception as e:
+            # 响应头已发送时无法再返回错误状态，只能中断输出
+            print(f"导出论文失败: {e}")
+        finally:
+            try:
+                await self.run_blocking(chunks.close)
+            except Exception as e:
+                print(f"关闭导出游标失败: {e}")
+
+    @staticmethod
+    def _csv_lines(rows) -> bytes:
+        """把多行编码为CSV字节（格式与 data/papers.csv 一致）"""
+        buffer = io.StringIO()
+        csv.writer(buffer, quoting=csv.QUOTE_NONNUMERIC).writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+
 class PaperTagsHandler(BaseHandler):
     """论文标签接口"""
 
@@ -567,7 +2724,7 @@ class PaperTagsHandler(BaseHandler):
         """获取论文的自定义标签"""
         try:
             paper_id = self.get_argument("paper_id", None)
-            tags = self.storage.get_paper_tags(paper_id)
+            tags = await self.run_blocking(self.storage.get_paper_tags, paper_id)
 
             self.write({
                 "success": True,
@@ -575,7 +2732,7 @@ class PaperTagsHandler(BaseHandler):
             })
 
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -591,10 +2748,8 @@ class PaperDetailHandler(BaseHandler):
     async def get(self, paper_id):
         """获取论文详情"""
         try:
-            # 在实际应用中，这里应该从数据库查询特定论文
-            # 这里简化处理，返回所有论文中匹配ID的第一个
-            papers = self.storage.get_all_papers(sort_by_date=False)
-            paper = next((p for p in papers if p.id == paper_id), None)
+            # 论文ID为URL，需要URL编码后放入路径
+            paper = await self.run_blocking(self.storage.get_paper, paper_id)
 
             if paper:
                 self.write({
@@ -609,7 +2764,7 @@ class PaperDetailHandler(BaseHandler):
                 })
 
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -625,17 +2780,17 @@ class UserReadPapersHandler(BaseHandler):
     async def get(self):
         """获取用户已读论文列表"""
         try:
-            read_paper_ids = self.storage.get_read_papers()
-
-            response = {
-                "success": True,
-                "data": read_paper_ids
-            }
+            async def build():
+                read_paper_ids = await self.run_blocking(self.storage.get_read_papers)
+                return {
+                    "success": True,
+                    "data": read_paper_ids
+                }
 
-            self.write(response)
+            await self.write_cached("read_papers", self.storage.catalog.generation, build)
 
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -651,17 +2806,17 @@ class UserFavoritePapersHandler(BaseHandler):
     async def get(self):
         """获取用户收藏论文列表"""
         try:
-            favorite_paper_ids = self.storage.get_favorite_papers()
-
-            response = {
-                "success": True,
-                "data": favorite_paper_ids
-            }
+            async def build():
+                favorite_paper_ids = await self.run_blocking(self.storage.get_favorite_papers)
+                return {
+                    "success": True,
+                    "data": favorite_paper_ids
+                }
 
-            self.write(response)
+            await self.write_cached("favorite_papers", self.storage.catalog.generation, build)
 
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -683,7 +2838,7 @@ class PaperReadHandler(BaseHandler):
             paper_id = data.get("paper_id", False)
 
             # 更新数据库中的阅读状态
-            success = self.storage.update_paper_read_status(paper_id, is_read)
+            success = await self.run_blocking(self.storage.update_paper_read_status, paper_id, is_read)
 
             if success:
                 self.write({
@@ -704,7 +2859,7 @@ class PaperReadHandler(BaseHandler):
                 "error": "无效的JSON数据"
             })
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -726,7 +2881,7 @@ class PaperFavoriteHandler(BaseHandler):
             paper_id = data.get("paper_id", False)
 
             # 更新数据库中的收藏状态
-            success = self.storage.update_paper_favorite_status(paper_id, is_favorite)
+            success = await self.run_blocking(self.storage.update_paper_favorite_status, paper_id, is_favorite)
 
             if success:
                 self.write({
@@ -747,7 +2902,64 @@ class PaperFavoriteHandler(BaseHandler):
                 "error": "无效的JSON数据"
             })
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
+            self.write({
+                "success": False,
+                "error": str(e)
+            })
+
+
+class BatchHandler(BaseHandler):
+    """批量写接口：在一个事务中应用多条阅读/收藏/标签变更"""
+
+    def initialize(self, storage: PaperStorage):
+        self.storage = storage
+
+    async def post(self):
+        """
+        批量应用变更
+
+        请求体为变更列表，或 {"mutations": [...]}，每项格式见 PaperStorage.apply_mutations
+        """
+        try:
+            data = tornado.escape.json_decode(self.request.body)
+            mutations = data.get("mutations") if isinstance(data, dict) else data
+
+            if not isinstance(mutations, list) or not mutations:
+                self.set_status(400)
+                self.write({
+                    "success": False,
+                    "error": "缺少必要的参数: mutations"
+                })
+                return
+            if len(mutations) > BATCH_MAX_MUTATIONS:
+                self.set_status(400)
+                self.write({
+                    "success": False,
+                    "error": f"单次最多提交 {BATCH_MAX_MUTATIONS} 条变更"
+                })
+                return
+
+            results = await self.run_blocking(self.storage.apply_mutations, mutations)
+            failed = sum(1 for result in results if not result["success"])
+
+            self.write({
+                "success": failed == 0,
+                "data": {
+                    "applied": len(results) - failed,
+                    "failed": failed,
+                    "results": results
+                }
+            })
+
+        except json.JSONDecodeError:
+            self.set_status(400)
+            self.write({
+                "success": False,
+                "error": "无效的JSON数据"
+            })
+        except Exception as e:
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -755,7 +2967,14 @@ class PaperFavoriteHandler(BaseHandler):
 
 
 class ChineseFullTextHandler(BaseHandler):
-    """论文中文全文接口"""
+    """
+    论文中文全文接口
+
+    GET /api/chinese_fulltext?paper_id=X                      整篇全文（兼容旧接口）
+    GET /api/chinese_fulltext?paper_id=X&section=0            按章节分页
+    GET /api/chinese_fulltext?paper_id=X&offset=0&limit=20000  按字符偏移分页
+    分页响应附带章节目录，阅读页可以先渲染第一节再按需加载后续内容。
+    """
 
     def initialize(self, storage: PaperStorage):
         self.storage = storage
@@ -765,6 +2984,8 @@ class ChineseFullTextHandler(BaseHandler):
         try:
             # 获取查询参数
             paper_id = self.get_argument("paper_id", None)
+            section = self.get_argument("section", None)
+            offset = self.get_argument("offset", None)
 
             if not paper_id:
                 self.set_status(400)
@@ -774,18 +2995,74 @@ class ChineseFullTextHandler(BaseHandler):
                 })
                 return
 
-            # 获取中文全文内容
-            fulltext = self.storage.get_chinese_fulltext(paper_id)
+            index = await self.run_blocking(self.storage.get_fulltext_index, paper_id)
+            if index is None:
+                index = {"encoding": None, "length": 0, "sections": []}
+            sections = index["sections"]
+            outline = [{"title": item["title"], "offset": item["offset"], "length": item["length"]}
+                       for item in sections]
+
+            if section is not None:
+                section = int(section)
+                if not 0 <= section < len(sections):
+                    raise ValueError(f"章节不存在: {section}")
+                content = await self.run_blocking(self.storage.read_fulltext_sections, paper_id, index,
+                                                  section, section)
+                data = {
+                    "section": section,
+                    "text": content,
+                    "total_length": index["length"],
+                    "next_section": section + 1 if section + 1 < len(sections) else None,
+                    "sections": outline
+                }
+            elif offset is not None:
+                offset = int(offset)
+                limit = min(int(self.get_argument("limit", FULLTEXT_PAGE_CHARS)), FULLTEXT_PAGE_MAX_CHARS)
+                if offset < 0 or limit <= 0:
+                    raise ValueError("offset 和 limit 必须为正数")
+                end = min(offset + limit, index["length"])
+                content = ""
+                if offset < end:
+                    # 只读取与 [offset, end) 有交集的章节
+                    starts = [item["offset"] for item in sections]
+                    first = bisect.bisect_right(starts, offset) - 1
+                    last = bisect.bisect_left(starts, end) - 1
+                    content = await self.run_blocking(self.storage.read_fulltext_sections, paper_id, index,
+                                                      first, last)
+                    base = sections[first]["offset"]
+                    content = content[offset - base:end - base]
+                data = {
+                    "offset": offset,
+                    "limit": limit,
+                    "text": content,
+                    "total_length": index["length"],
+                    "next_offset": end if end < index["length"] else None,
+                    "sections": outline
+                }
+            else:
+                fulltext = ""
+                if sections:
+                    fulltext = await self.run_blocking(self.storage.read_fulltext_sections, paper_id, index,
+                                                       0, len(sections) - 1)
+                data = {
+                    "fulltext": fulltext,
+                    "total_length": index["length"],
+                    "sections": outline
+                }
 
             self.write({
                 "success": True,
-                "data": {
-                    "fulltext": fulltext
-                }
+                "data": data
             })
 
+        except ValueError as e:
+            self.set_status(400)
+            self.write({
+                "success": False,
+                "error": str(e)
+            })
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -802,38 +3079,18 @@ class TagsHandler(BaseHandler):
     async def get(self):
         """获取自定义标签体系"""
         try:
-            tags = self.storage.get_custom_tags()
-            # tags = [
-            #     {
-            #         "id": 1,
-            #         "name": "计算机科学",
-            #         "children": [
-            #             {
-            #                 "id": 2,
-            #                 "name": "人工智能",
-            #                 "children": [
-            #                     {
-            #                         "id": 3,
-            #                         "name": "机器学习",
-            #                         "children": []
-            #                     }
-            #                 ]
-            #             }
-            #         ]
-            #     },
-            #     {
-            #         "id": 4,
-            #         "name": "数学",
-            #         "children": []
-            #     }
-            # ]
-            self.write({
-                "success": True,
-                "data": tags
-            })
+            async def build():
+                tags = await self.run_blocking(self.storage.get_custom_tags)
+                return {
+                    "success": True,
+                    "data": tags
+                }
+
+            # 标签体系随标签闭包索引的版本失效
+            await self.write_cached("tags", self.storage.tag_index.generation, build)
 
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -861,7 +3118,7 @@ class PaperTagHandler(BaseHandler):
                 })
                 return
 
-            success = self.storage.add_paper_tag(paper_id, tag_id)
+            success = await self.run_blocking(self.storage.add_paper_tag, paper_id, tag_id)
 
             if success:
                 self.write({
@@ -882,7 +3139,7 @@ class PaperTagHandler(BaseHandler):
                 "error": "无效的JSON数据"
             })
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
@@ -911,7 +3168,7 @@ class DeletePaperTagHandler(BaseHandler):
                 })
                 return
 
-            success = self.storage.remove_paper_tag(paper_id, tag_id)
+            success = await self.run_blocking(self.storage.remove_paper_tag, paper_id, tag_id)
 
             if success:
                 self.write({
@@ -932,47 +3189,115 @@ class DeletePaperTagHandler(BaseHandler):
                 "error": "无效的JSON数据"
             })
         except Exception as e:
-            self.set_status(500)
+            self.set_status(self.error_status(e))
             self.write({
                 "success": False,
                 "error": str(e)
             })
 
 
-def make_app():
-    """创建Tornado应用"""
-    storage = PaperStorage()
+def make_app(db_config: Optional[Dict[str, str]] = None, pool_options: Optional[Dict[str, Any]] = None,
+             executor_workers: int = DB_EXECUTOR_WORKERS, db_timeout: float = DB_REQUEST_TIMEOUT,
+             status_write_mode: str = STATUS_WRITE_MODE, status_journal_path: Optional[str] = STATUS_JOURNAL_PATH,
+             engine=None):
+    """
+    创建Tornado应用
+
+    Args:
+        db_config: 数据库配置字典
+        pool_options: 连接池参数，见 DEFAULT_POOL_OPTIONS
+        executor_workers: 执行数据库操作的线程池大小
+        db_timeout: 单次数据库请求超时时间（秒）
+        status_write_mode: 阅读/收藏状态的写入模式，见 STATUS_WRITE_MODES
+        status_journal_path: journal 模式下的本地日志路径
+        engine: 已创建的数据库引擎（不传时按 db_config 和 pool_options 创建）
+    """
+    executor = ThreadPoolExecutor(max_workers=executor_workers, thread_name_prefix="paper-db")
+    if engine is None:
+        engine = create_db_engine(db_config, **(pool_options or {}))
+    storage = PaperStorage(engine=engine, db_config=db_config)
+    storage.ensure_schema()
+    storage.status_buffer = StatusWriteBuffer(storage, mode=status_write_mode, journal_path=status_journal_path)
+    try:
+        # 重放上次未落库的状态变更
+        storage.status_buffer.open()
+    except Exception as e:
+        print(f"打开状态日志失败: {e}")
+    try:
+        # 启动时加载标签闭包索引和常驻目录，失败时在首次请求时重试
+        storage.refresh_tags()
+        storage.catalog.load()
+    except Exception as e:
+        print(f"加载论文目录失败: {e}")
 
     return tornado.web.Application([
         (r"/api/papers", PapersHandler, {"storage": storage}),
+        (r"/api/papers/export", PapersExportHandler, {"storage": storage}),  # 流式导出接口
         (r"/api/papers/([^/]+)", PaperDetailHandler, {"storage": storage}),
         (r"/api/user/read_papers", UserReadPapersHandler, {"storage": storage}),
         (r"/api/user/favorite_papers", UserFavoritePapersHandler, {"storage": storage}),
         (r"/api/status/read", PaperReadHandler, {"storage": storage}),
         (r"/api/status/favorite", PaperFavoriteHandler, {"storage": storage}),
+        (r"/api/batch", BatchHandler, {"storage": storage}),  # 批量写接口
         (r"/api/chinese_fulltext", ChineseFullTextHandler, {"storage": storage}),
         (r"/api/tags", TagsHandler, {"storage": storage}),  # 自定义标签接口
         (r"/api/tags/save", PaperTagHandler, {"storage": storage}),
         (r"/api/tags/load", PaperTagsHandler, {"storage": storage}),
         (r"/api/tags/delete", DeletePaperTagHandler, {"storage": storage}),
         (r"/api/categories", CategoriesHandler, {"storage": storage}),  # 添加分类接口
-    ])
+        (r"/api/facets", FacetsHandler, {"storage": storage}),  # 分面计数接口
+        (r"/api/diagnostics", DiagnosticsHandler, {"storage": storage}),  # 运行状态诊断接口
+    ], storage=storage, executor=executor, db_timeout=db_timeout, response_cache=ResponseCache())
 
 
 if __name__ == "__main__":
     # 启动服务器
     app = make_app()
     app.listen(8889)
+    # 定期刷新标签闭包索引，并按 updated_at 水位增量刷新论文目录（在线程池中执行）
+    async def refresh_storage():
+        try:
+            await tornado.ioloop.IOLoop.current().run_in_executor(app.settings["executor"], app.settings["storage"].refresh)
+        except Exception as e:
+            print(f"刷新论文目录失败: {e}")
+
+    tornado.ioloop.PeriodicCallback(refresh_storage, CATALOG_REFRESH_INTERVAL_MS).start()
+
+    # 定期把合并后的阅读/收藏状态批量写库
+    status_buffer = app.settings["storage"].status_buffer
+    async def flush_status():
+        try:
+            await tornado.ioloop.IOLoop.current().run_in_executor(app.settings["executor"], status_buffer.flush)
+        except Exception as e:
+            print(f"刷新状态变更失败: {e}")
+
+    if status_buffer.mode != "sync":
+        tornado.ioloop.PeriodicCallback(flush_status, status_buffer.flush_interval_ms).start()
+
+    # SIGTERM 时同样优雅退出，确保缓冲的变更落库
+    io_loop = tornado.ioloop.IOLoop.current()
+    try:
+        io_loop.asyncio_loop.add_signal_handler(signal.SIGTERM, io_loop.stop)
+    except NotImplementedError:
+        # Windows 不支持事件循环信号处理
+        pass
     print("论文API服务已启动: http://localhost:8889")
     print("API端点:")
     print("  GET  /api/papers - 获取论文列表")
     print("  POST /api/papers - 添加新论文")
     print("  GET  /api/papers/{id} - 获取论文详情")
+    print("  GET  /api/papers/export?format=ndjson|csv - 流式导出论文")
+    print("  GET  /api/facets - 获取过滤条件下的分面计数")
+    print("  POST /api/batch - 批量更新阅读/收藏/标签")
+    print("  GET  /api/diagnostics - 获取连接池状态")
 
     try:
         tornado.ioloop.IOLoop.current().start()
     except KeyboardInterrupt:
         print("\n服务器已停止")
+    finally:
+        app.settings["executor"].shutdown(wait=False, cancel_futures=True)
+        status_buffer.close()
 
 
 
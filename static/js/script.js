@@ -169,8 +169,12 @@ async function fetchPapers(params = {}) {
         if (params.category) queryParams.append('category', params.category);
         if (params.tag_id) queryParams.append('tag_id', params.tag_id); // 添加标签参数支持
         if (params.search) queryParams.append('search', params.search);
+        if (params.days) queryParams.append('days', params.days); // 时间窗口由后端过滤
+        if (params.is_read !== undefined) queryParams.append('is_read', params.is_read ? 1 : 0);
+        if (params.is_favorite !== undefined) queryParams.append('is_favorite', params.is_favorite ? 1 : 0);
         if (params.limit) queryParams.append('limit', params.limit);
-        if (params.offset) queryParams.append('offset', params.offset);
+        if (params.cursor) queryParams.append('cursor', params.cursor); // 键集分页游标（上一页的 next_cursor）
+        if (params.offset) queryParams.append('offset', params.offset); // 旧的偏移分页，较慢
 
         const url = `${API_BASE_URL}/papers?${queryParams.toString()}`;
         const response = await fetch(url);
@@ -192,6 +196,73 @@ async function fetchPapers(params = {}) {
     }
 }
 
+// 按ID批量获取论文数据（一次请求补齐多张论文卡片）
+async function fetchPapersByIds(paperIds) {
+    if (!paperIds || paperIds.length === 0) return [];
+
+    try {
+        const queryParams = new URLSearchParams();
+        paperIds.forEach(paperId => queryParams.append('ids', paperId));
+
+        const response = await fetch(`${API_BASE_URL}/papers?${queryParams.toString()}`);
+        if (!response.ok) {
+            throw new Error(`HTTP错误! 状态码: ${response.status}`);
+        }
+
+        const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.error || 'API返回错误');
+        }
+
+        return data.data || [];
+    } catch (error) {
+        console.error('批量获取论文数据失败:', error);
+        throw error;
+    }
+}
+
+// 获取当前过滤条件下各分类/标签/状态/时间窗口的论文数
+async function fetchFacets(params = {}) {
+    const queryParams = new URLSearchParams();
+    if (params.category) queryParams.append('category', params.category);
+    if (params.tag_id) queryParams.append('tag_id', params.tag_id);
+    if (params.search) queryParams.append('search', params.search);
+    if (params.days) queryParams.append('days', params.days);
+    if (params.is_read !== undefined) queryParams.append('is_read', params.is_read ? 1 : 0);
+    if (params.is_favorite !== undefined) queryParams.append('is_favorite', params.is_favorite ? 1 : 0);
+
+    const response = await fetch(`${API_BASE_URL}/facets?${queryParams.toString()}`);
+    if (!response.ok) {
+        throw new Error(`HTTP错误! 状态码: ${response.status}`);
+    }
+
+    const data = await response.json();
+    if (!data.success) {
+        throw new Error(data.error || 'API返回错误');
+    }
+    return data.data;
+}
+
+// 按分面计数更新分类下拉框中的数量
+async function updateFacetCounts(params = {}) {
+    try {
+        const facets = await fetchFacets(params);
+        const counts = {};
+        facets.categories.forEach(category => {
+            counts[category.id] = category.count;
+        });
+
+        const categoryFilter = document.getElementById('categoryFilter');
+        Array.from(categoryFilter.options).forEach(option => {
+            if (option.value && counts[option.value] !== undefined) {
+                option.textContent = `${option.value} (${counts[option.value]})`;
+            }
+        });
+    } catch (error) {
+        console.error('获取分面计数失败:', error);
+    }
+}
+
 // 在 renderPapers 函数中确保正确设置 paperCustomTags
 function renderPapers(papers) {
     const container = document.getElementById('papersContainer');
@@ -215,6 +286,7 @@ function renderPapers(papers) {
         const isFavorite = paper.is_favorite || false;
         // 确保这里正确缓存自定义标签数据
         paperCustomTags[paper.paper_url] = paper.custom_tags || [];
+        rememberPaper(paper);
 
         return `<div class="paper-card ${isRead ? 'read' : ''} ${isFavorite ? 'favorite' : ''}" id="paper-${escapeHtml(paper.paper_url || '')}">
             <div class="paper-header">
@@ -299,6 +371,68 @@ async function saveReadStatusToServer(paperId, isRead) {
     }
 }
 
+// 批量提交阅读/收藏/标签变更（一次请求、一个事务）
+// mutations: [{op: 'read'|'favorite', paper_id, value}, {op: 'add_tag'|'remove_tag', paper_id, tag_id}]
+async function applyBatchMutations(mutations) {
+    try {
+        const response = await fetch(`${API_BASE_URL}/batch`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json'
+            },
+            body: JSON.stringify({ mutations: mutations })
+        });
+
+        if (!response.ok) {
+            throw new Error(`HTTP错误! 状态码: ${response.status}`);
+        }
+
+        return await response.json();
+    } catch (error) {
+        console.error('批量提交变更失败:', error);
+        throw error;
+    }
+}
+
+// 把当前列表中的未读论文批量标为已读（每批一次请求、一个事务）
+async function markVisiblePapersRead() {
+    const cards = document.querySelectorAll('#papersContainer .paper-card');
+    const paperIds = Array.from(cards)
+        .map(card => card.id.replace('paper-', ''))
+        .filter(paperId => !readPapers.includes(paperId));
+    if (paperIds.length === 0) return;
+    if (!confirm(`确定将 ${paperIds.length} 篇论文标为已读吗？`)) return;
+
+    let failed = 0;
+    try {
+        // 单次请求最多 1000 条变更
+        for (let start = 0; start < paperIds.length; start += 1000) {
+            const batch = paperIds.slice(start, start + 1000);
+            const result = await applyBatchMutations(batch.map(paperId => ({ op: 'read', paper_id: paperId, value: true })));
+            (result.data ? result.data.results : []).forEach(item => {
+                if (!item.success) {
+                    failed++;
+                    return;
+                }
+                const paperId = batch[item.index];
+                if (!readPapers.includes(paperId)) readPapers.push(paperId);
+                const paperCard = document.getElementById(`paper-${paperId}`);
+                if (paperCard) {
+                    paperCard.classList.add('read');
+                    const readButton = paperCard.querySelector('.btn-read');
+                    if (readButton) readButton.classList.add('active');
+                }
+            });
+        }
+        setLocalStorageData(READ_PAPERS_KEY, readPapers);
+        if (failed > 0) {
+            alert(`${failed} 篇论文标记失败`);
+        }
+    } catch (error) {
+        alert('批量标记已读失败，请检查网络连接');
+    }
+}
+
 // 切换已读状态
  async function toggleReadStatus(paperId, buttonElement) {
     const paperCard = document.getElementById(`paper-${paperId}`);
@@ -400,6 +534,35 @@ async function loadCustomTags() {
 
 // 添加全局变量存储论文的自定义标签
 let paperCustomTags = {}; // {paperId: [tagIds]}
+// 当前渲染的论文数据，以及已读/收藏的论文ID
+let papersById = {};
+let readPapers = [];
+let favoritePapers = [];
+
+// 记录论文数据，并同步已读/收藏状态
+function rememberPaper(paper) {
+    const paperId = paper.paper_url;
+    papersById[paperId] = paper;
+    readPapers = readPapers.filter(id => id !== paperId);
+    favoritePapers = favoritePapers.filter(id => id !== paperId);
+    if (paper.is_read) readPapers.push(paperId);
+    if (paper.is_favorite) favoritePapers.push(paperId);
+}
+
+// 按ID从服务器重新获取论文，刷新对应卡片的标签和状态
+async function refreshPaperCards(paperIds) {
+    try {
+        const papers = await fetchPapersByIds(paperIds);
+        papers.forEach(paper => {
+            rememberPaper(paper);
+            const tagIds = paper.custom_tags_ids || [];
+            paperCustomTags[paper.paper_url] = (paper.custom_tags || []).map((name, i) => ({ id: tagIds[i], name: name }));
+            updatePaperCardTagsDisplay(paper.paper_url);
+        });
+    } catch (error) {
+        console.error('刷新论文卡片失败:', error);
+    }
+}
 
 // 切换标签删除按钮显示状态
 function toggleTagDeleteButton(tagElement, paperId, tagId) {
@@ -449,6 +612,8 @@ async function deletePaperTag(paperId, tagId, tagName, event) {
 
                 // 直接更新当前论文卡片的标签显示
                 updatePaperCardTagsDisplay(paperId);
+                // 再以服务器数据为准刷新卡片
+                refreshPaperCards([paperId]);
 
                 alert(`成功删除标签: ${tagName}`);
             } else {
@@ -465,21 +630,8 @@ async function deletePaperTag(paperId, tagId, tagName, event) {
 
 // 根据ID查找论文数据
 function findPaperById(paperId) {
-    // 这里需要根据实际情况实现获取论文数据的逻辑
-    // 可以从当前显示的论文列表中查找
-    const container = document.getElementById('papersContainer');
-    if (container) {
-        const paperCards = container.querySelectorAll('.paper-card');
-        for (let card of paperCards) {
-            if (card.id === `paper-${paperId}`) {
-                // 从卡片中提取信息（简化实现）
-                return {
-                    categories: [] // 可以根据需要进一步实现
-                };
-            }
-        }
-    }
-    return null;
+    // 从已渲染的论文数据中查找
+    return papersById[paperId] || null;
 }
 
 // 更新指定论文卡片的标签显示
@@ -751,8 +903,9 @@ async function applyCustomTag(tagId, tagName) {
                 // 更新本地缓存
                 await updatePaperTagsCache(window.currentPaperId, tagId, tagName);
 
-                // 立即更新界面显示
+                // 立即更新界面显示，再以服务器数据为准刷新卡片
                 updatePaperCardTagsDisplay(window.currentPaperId);
+                refreshPaperCards([window.currentPaperId]);
 
                 // 关闭模态框
                 const modal = document.querySelector('div[style*="position: fixed"][style*="z-index: 1000"]');
@@ -855,27 +1008,13 @@ async function filterPapers() {
         if (searchTerm) params.search = searchTerm;
         if (categoryFilter) params.category = categoryFilter;
         if (selectedTagId) params.tag_id = selectedTagId; // 添加标签过滤参数
+        if (dateFilter) params.days = parseInt(dateFilter); // 日期筛选由后端完成
 
+        // 后端已按发布时间降序返回，无需在客户端重新过滤和排序
         const papers = await fetchPapers(params);
 
-        // 移除这行：await preloadPaperTags(papers);
-
-        // 客户端日期筛选
-        let filteredPapers = papers;
-        if (dateFilter) {
-            filteredPapers = papers.filter(paper =>
-                isWithinDays(paper.published, parseInt(dateFilter))
-            );
-        }
-
-        // 按日期降序排序（确保顺序正确）
-        filteredPapers.sort((a, b) => {
-            const dateA = new Date(a.published || 0);
-            const dateB = new Date(b.published || 0);
-            return dateB - dateA;
-        });
-
-        renderPapers(filteredPapers);
+        renderPapers(papers);
+        updateFacetCounts(params);
     } catch (error) {
         document.getElementById('papersContainer').innerHTML = `<div class="error">
                 <h3>加载论文数据时出错</h3>
@@ -920,6 +1059,9 @@ async function loadCategories() {
             const option = document.createElement('option');
             option.value = category.id || category.value;
             option.textContent = category.name || category.label;
+            if (category.count !== undefined) {
+                option.textContent += ` (${category.count})`;
+            }
             categoryFilter.appendChild(option);
         });
     } catch (error) {
@@ -1068,6 +1210,8 @@ document.addEventListener('DOMContentLoaded', async () => {
 
      // 添加标签过滤按钮事件监听器
     document.getElementById('tagFilterButton').addEventListener('click', showTagTooltip);
+    // 批量标记已读
+    document.getElementById('markAllReadButton').addEventListener('click', markVisiblePapersRead);
 
     // 点击画布其他位置隐藏标签提示框
     document.addEventListener('click', function(event) {
@@ -0,0 +1,29 @@
+import os
+import sqlite3
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+
+SCHEMA = """
+CREATE TABLE papers (
+    id VARCHAR(255) PRIMARY KEY, title TEXT, title_ch TEXT, authors TEXT, published DATETIME,
+    summary TEXT, summary_ch TEXT, categories TEXT, filepath TEXT,
+    `read` INT DEFAULT 0, favorite INT DEFAULT 0, fulltext_ch TEXT
+);
+CREATE TABLE tags (id INTEGER PRIMARY KEY, name TEXT, parent_id INT);
+CREATE TABLE paper_tags (id INTEGER PRIMARY KEY AUTOINCREMENT, paper_id VARCHAR(255), tag_id INT, created_at DATETIME);
+"""
+
+
+def create_fixture_db(path, with_data=True):
+    """在 SQLite 中建立与 MySQL 相同结构的表，并导入 data/ 下的示例数据，返回引擎"""
+    connection = sqlite3.connect(path)
+    connection.executescript(SCHEMA)
+    if with_data:
+        for table in ("papers", "tags", "paper_tags"):
+            pd.read_csv(os.path.join(DATA_DIR, f"{table}.csv")).to_sql(table, connection, if_exists="append", index=False)
+    connection.commit()
+    connection.close()
+    return create_engine(f"sqlite:///{path}")
@@ -0,0 +1,319 @@
+import functools
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from unittest import mock
+
+from sqlalchemy import create_engine, text
+
+import download_arxiv_papers as dl
+from tests.helpers import create_fixture_db
+
+SAMPLE_PDF = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "papers",
+                          "httparxiv.orgabs2510.27671v1.pdf")
+if os.path.exists(SAMPLE_PDF):
+    with open(SAMPLE_PDF, "rb") as sample:
+        PDF_BYTES = sample.read()
+else:
+    PDF_BYTES = None
+
+
+class PdfHandler(BaseHTTPRequestHandler):
+    """
+    按 Range 返回 PDF 的本地服务
+
+    ignore_range 为真时模拟不支持续传的服务端，fail_status 不为空时所有请求都返回该状态码。
+    """
+
+    ignore_range = False
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        range_header = self.headers.get("Range")
+        server.requests.append((self.path, range_header))
+        if server.fail_status:
+            self.send_response(server.fail_status)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        start = 0
+        if range_header and not server.ignore_range:
+            start = int(range_header.split("=")[1].split("-")[0])
+            if start >= len(PDF_BYTES):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(PDF_BYTES)}")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(PDF_BYTES) - 1}/{len(PDF_BYTES)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(PDF_BYTES) - start))
+        self.end_headers()
+        self.wfile.write(PDF_BYTES[start:])
+
+
+class DownloadTestCase(unittest.TestCase):
+    def setUp(self):
+        if PDF_BYTES is None:
+            self.skipTest(f"缺少示例PDF: {SAMPLE_PDF}")
+        self.tmpdir = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), PdfHandler)
+        self.server.requests = []
+        self.server.ignore_range = False
+        self.server.fail_status = None
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_port}/pdf/2510.00001v1"
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def download(self, filepath, **kwargs):
+        with dl.make_download_session(1) as session:
+            return dl.download_file(session, self.url, filepath, dl.HostRateLimiter(0), retries=1, **kwargs)
+
+    def write_partial(self, filepath, size):
+        with open(filepath + ".part", "wb") as f:
+            f.write(PDF_BYTES[:size])
+
+
+class DownloadFileTest(DownloadTestCase):
+    def test_resumes_part_file_with_range(self):
+        filepath = os.path.join(self.tmpdir, "paper.pdf")
+        self.write_partial(filepath, 1000)
+
+        size, sha256 = self.download(filepath)
+
+        self.assertEqual(self.server.requests, [("/pdf/2510.00001v1", "bytes=1000-")])
+        self.assertEqual(size, len(PDF_BYTES))
+        self.assertEqual(sha256, hashlib.sha256(PDF_BYTES).hexdigest())
+        with open(filepath, "rb") as f:
+            self.assertEqual(f.read(), PDF_BYTES)
+        self.assertFalse(os.path.exists(filepath + ".part"))
+
+    def test_restarts_when_server_ignores_range(self):
+        filepath = os.path.join(self.tmpdir, "paper.pdf")
+        self.write_partial(filepath, 1000)
+        self.server.ignore_range = True
+
+        size, _ = self.download(filepath)
+
+        # 返回 200 时不能把完整内容追加到 .part 后面
+        self.assertEqual(self.server.requests, [("/pdf/2510.00001v1", "bytes=1000-")])
+        self.assertEqual(size, len(PDF_BYTES))
+        with open(filepath, "rb") as f:
+            self.assertEqual(f.read(), PDF_BYTES)
+
+    def test_complete_part_file_is_finalized_on_416(self):
+        filepath = os.path.join(self.tmpdir, "paper.pdf")
+        self.write_partial(filepath, len(PDF_BYTES))
+
+        size, _ = self.download(filepath)
+
+        self.assertEqual(size, len(PDF_BYTES))
+        self.assertTrue(os.path.exists(filepath))
+
+    def test_checksum_is_verified(self):
+        filepath = os.path.join(self.tmpdir, "paper.pdf")
+        expected = hashlib.sha256(PDF_BYTES).hexdigest()
+
+        with self.assertRaises(IOError):
+            self.download(filepath, expected_sha256="0" * 64)
+        self.assertFalse(os.path.exists(filepath))
+        self.assertFalse(os.path.exists(filepath + ".part"))
+
+        self.assertEqual(self.download(filepath, expected_sha256=expected), (len(PDF_BYTES), expected))
+
+
+class DownloadPdfsTest(DownloadTestCase):
+    def test_manifest_skips_completed_downloads(self):
+        tasks = [{"paper_id": "2510.00001v1", "url": self.url, "filename": "2510.00001v1.pdf"}]
+
+        first = dl.download_pdfs(tasks, self.tmpdir, workers=1, min_interval=0)
+        self.assertEqual(first["2510.00001v1"]["status"], "downloaded")
+        self.assertEqual(len(self.server.requests), 1)
+
+        second = dl.download_pdfs(tasks, self.tmpdir, workers=1, min_interval=0, verify_checksum=True)
+        self.assertEqual(second["2510.00001v1"]["status"], "skipped")
+        self.assertEqual(len(self.server.requests), 1)
+
+        manifest = dl.DownloadManifest(os.path.join(self.tmpdir, dl.MANIFEST_NAME))
+        self.assertEqual(manifest.entries["2510.00001v1.pdf"]["size"], len(PDF_BYTES))
+        self.assertEqual(manifest.entries["2510.00001v1.pdf"]["sha256"], hashlib.sha256(PDF_BYTES).hexdigest())
+
+    def test_changed_file_is_downloaded_again(self):
+        tasks = [{"paper_id": "2510.00001v1", "url": self.url, "filename": "2510.00001v1.pdf"}]
+        dl.download_pdfs(tasks, self.tmpdir, workers=1, min_interval=0)
+        with open(os.path.join(self.tmpdir, "2510.00001v1.pdf"), "ab") as f:
+            f.write(b"garbage")
+
+        result = dl.download_pdfs(tasks, self.tmpdir, workers=1, min_interval=0)
+
+        self.assertEqual(result["2510.00001v1"]["status"], "downloaded")
+        self.assertEqual(len(self.server.requests), 2)
+
+
+class WritePapersTest(unittest.TestCase):
+    """write_papers 的幂等写入：只更新抓取得到的列，未变化的行不写库"""
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = create_fixture_db(os.path.join(self.tmpdir, "papers.db"), with_data=False)
+        with self.engine.begin() as connection:
+            connection.execute(text("CREATE TABLE paper_categories (paper_id VARCHAR(255) NOT NULL, "
+                                    "category VARCHAR(64) NOT NULL, PRIMARY KEY (paper_id, category))"))
+
+    def tearDown(self):
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    @staticmethod
+    def make_paper(index, **changes):
+        paper = {"id": f"http://arxiv.org/abs/2510.0000{index}v1", "title": f"Paper {index}",
+                 "authors": ["Ada Lovelace"], "published": datetime(2025, 10, index + 1, tzinfo=timezone.utc),
+                 "summary": "summary", "categories": ["cs.AI", "cs.CL"], "filepath": f"paper{index}.pdf"}
+        paper.update(changes)
+        return paper
+
+    def fetch(self, sql, **params):
+        with self.engine.connect() as connection:
+            return connection.execute(text(sql), params).mappings().all()
+
+    def test_counts_and_idempotence(self):
+        papers = [self.make_paper(i) for i in range(3)]
+        self.assertEqual(dl.write_papers(self.engine, papers), {"inserted": 3, "updated": 0, "unchanged": 0})
+        self.assertEqual(dl.write_papers(self.engine, papers), {"inserted": 0, "updated": 0, "unchanged": 3})
+
+        changed = [self.make_paper(0, title="Paper 0 (v2)"), self.make_paper(1), self.make_paper(3)]
+        self.assertEqual(dl.write_papers(self.engine, changed), {"inserted": 1, "updated": 1, "unchanged": 1})
+        self.assertEqual(len(self.fetch("SELECT id FROM papers")), 4)
+        self.assertEqual(self.fetch("SELECT title FROM papers WHERE id = :id", id=papers[0]["id"])[0]["title"],
+                         "Paper 0 (v2)")
+
+    def test_rerun_keeps_translations_status_and_tags(self):
+        paper = self.make_paper(0)
+        dl.write_papers(self.engine, [paper])
+        with self.engine.begin() as connection:
+            connection.execute(text("UPDATE papers SET title_ch = '论文', summary_ch = '摘要', `read` = 1, "
+                                    "favorite = 1 WHERE id = :id"), {"id": paper["id"]})
+            connection.execute(text("INSERT INTO paper_tags (paper_id, tag_id) VALUES (:id, 7)"), {"id": paper["id"]})
+
+        counts = dl.write_papers(self.engine, [self.make_paper(0, summary="new summary", filepath=None)])
+
+        self.assertEqual(counts["updated"], 1)
+        row = self.fetch("SELECT * FROM papers WHERE id = :id", id=paper["id"])[0]
+        self.assertEqual((row["summary"], row["title_ch"], row["summary_ch"], row["read"], row["favorite"]),
+                         ("new summary", "论文", "摘要", 1, 1))
+        # filepath 为空时不覆盖已保存的文件名
+        self.assertEqual(row["filepath"], "paper0.pdf")
+        self.assertEqual([tag["tag_id"] for tag in self.fetch("SELECT tag_id FROM paper_tags")], [7])
+
+    def test_null_filepath_alone_is_unchanged(self):
+        dl.write_papers(self.engine, [self.make_paper(0)])
+        counts = dl.write_papers(self.engine, [self.make_paper(0, filepath=None)])
+        self.assertEqual(counts, {"inserted": 0, "updated": 0, "unchanged": 1})
+
+    def test_categories_rebuilt_only_for_changed_rows(self):
+        papers = [self.make_paper(0), self.make_paper(1)]
+        dl.write_papers(self.engine, papers)
+        # 标记行：若未变化的论文也被重建，标记会被删除
+        with self.engine.begin() as connection:
+            connection.execute(text("INSERT INTO paper_categories (paper_id, category) VALUES (:id, 'marker')"),
+                               [{"id": paper["id"]} for paper in papers])
+
+        dl.write_papers(self.engine, [self.make_paper(0, categories=["cs.LG"]), self.make_paper(1)])
+
+        categories = {}
+        for row in self.fetch("SELECT paper_id, category FROM paper_categories"):
+            categories.setdefault(row["paper_id"], set()).add(row["category"])
+        self.assertEqual(categories[papers[0]["id"]], {"cs.LG"})
+        self.assertEqual(categories[papers[1]["id"]], {"cs.AI", "cs.CL", "marker"})
+
+
+class FakeArxivClient:
+    """按提交时间降序返回固定结果的 arxiv.Client 替身"""
+
+    def __init__(self, results):
+        self._results = results
+
+    def results(self, search):
+        return iter(self._results)
+
+
+class HarvestTest(DownloadTestCase):
+    def make_results(self, count):
+        published = datetime.now(timezone.utc) - timedelta(hours=1)
+        return [SimpleNamespace(entry_id=f"http://arxiv.org/abs/2510.0000{i}v1", title=f"Paper {i}",
+                                authors=[SimpleNamespace(name="Ada Lovelace")], summary="summary",
+                                published=published - timedelta(minutes=i), categories=["cs.AI"],
+                                pdf_url=self.url)
+                for i in range(count)]
+
+    def harvest(self, engine, results):
+        with mock.patch.object(dl.arxiv, "Client", return_value=FakeArxivClient(results)):
+            return dl.harvest_papers("diffusion", categories=["cs.AI"], engine=engine,
+                                     download_dir=os.path.join(self.tmpdir, "pdfs"),
+                                     state_path=os.path.join(self.tmpdir, "state.json"), workers=1)
+
+    def test_failed_insert_does_not_advance_mark(self):
+        # 没有 papers 表，元数据写入失败
+        engine = create_engine(f"sqlite:///{os.path.join(self.tmpdir, 'empty.db')}")
+        stats = self.harvest(engine, self.make_results(2))
+        engine.dispose()
+
+        self.assertEqual(stats["insert_failed"], 2)
+        self.assertIsNone(stats["last_submitted"])
+        self.assertEqual(dl.HarvestState(os.path.join(self.tmpdir, "state.json")).get("diffusion", ["cs.AI"]),
+                         (None, []))
+
+    def test_failed_downloads_are_retried_on_next_harvest(self):
+        engine = create_fixture_db(os.path.join(self.tmpdir, "papers.db"), with_data=False)
+        self.addCleanup(engine.dispose)
+        results = self.make_results(2)
+        state_path = os.path.join(self.tmpdir, "state.json")
+        # 下载只尝试一次，避免退避等待
+        single_attempt = functools.partial(dl.download_file, retries=1)
+
+        self.server.fail_status = 503
+        with mock.patch.object(dl, "download_file", single_attempt):
+            first = self.harvest(engine, results)
+        self.assertEqual((first["inserted"], first["download_failed"], first["pending_downloads"]), (2, 2, 2))
+        # 元数据已写入，水位照常推进，下载失败的任务记入状态文件
+        self.assertEqual(dl.HarvestState(state_path).get("diffusion", ["cs.AI"])[0], results[0].published)
+        self.assertEqual(len(dl.HarvestState(state_path).pending_downloads("diffusion", ["cs.AI"])), 2)
+
+        self.server.fail_status = None
+        with mock.patch.object(dl, "download_file", single_attempt):
+            second = self.harvest(engine, results)
+        self.assertEqual((second["new"], second["redownloaded"], second["pending_downloads"]), (0, 2, 0))
+        self.assertEqual(dl.HarvestState(state_path).pending_downloads("diffusion", ["cs.AI"]), [])
+        with engine.connect() as connection:
+            filepaths = connection.execute(text("SELECT filepath FROM papers")).scalars().all()
+        self.assertEqual(len(filepaths), 2)
+        self.assertTrue(all(filepaths))
+        for filepath in filepaths:
+            self.assertTrue(os.path.exists(os.path.join(self.tmpdir, "pdfs", filepath)))
+
+    def test_successful_insert_advances_mark(self):
+        engine = create_fixture_db(os.path.join(self.tmpdir, "papers.db"), with_data=False)
+        results = self.make_results(2)
+        stats = self.harvest(engine, results)
+        engine.dispose()
+
+        self.assertEqual(stats["inserted"], 2)
+        last_submitted, recent_ids = dl.HarvestState(os.path.join(self.tmpdir, "state.json")).get(
+            "diffusion", ["cs.AI"])
+        self.assertEqual(last_submitted, results[0].published)
+        self.assertEqual(sorted(recent_ids), sorted(result.entry_id for result in results))
@@ -0,0 +1,175 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+import download_weixin_2 as wx
+
+ARTICLE_HTML = """<html><body><h1 class="rich_media_title" id="activity-name">测试文章标题</h1>
+<span class="rich_media_meta_nickname"><a id="js_name">公众号</a></span>
+<div id="js_content"><p>正文内容</p></div></body></html>""".encode("utf-8")
+ETAG = '"' + hashlib.md5(ARTICLE_HTML).hexdigest() + '"'
+LAST_MODIFIED = "Wed, 01 Oct 2025 08:00:00 GMT"
+
+
+class ArticleHandler(BaseHTTPRequestHandler):
+    """
+    公众号文章的本地替身
+
+    /etag/ 只发 ETag，/modified/ 只发 Last-Modified，/flaky/ 第一次返回 503，
+    /down/ 总是返回 502，/missing/ 返回 404；server.delay 模拟响应耗时，
+    并按 Host 记录每个请求的开始时间和同时进行的请求数。
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        host = self.headers["Host"]
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+            server.starts.setdefault(host, []).append(time.monotonic())
+            server.active[host] = server.active.get(host, 0) + 1
+            server.max_active[host] = max(server.max_active.get(host, 0), server.active[host])
+        try:
+            time.sleep(server.delay)
+            if self.path.startswith("/missing/"):
+                self.send(404)
+            elif self.path.startswith("/down/"):
+                self.send(502)
+            elif self.path.startswith("/flaky/") and hits == 1:
+                self.send(503)
+            elif self.path.startswith("/etag/"):
+                if self.headers.get("If-None-Match") == ETAG:
+                    self.send(304, headers={"ETag": ETAG})
+                else:
+                    self.send(200, ARTICLE_HTML, {"ETag": ETAG})
+            elif self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                self.send(304, headers={"Last-Modified": LAST_MODIFIED})
+            else:
+                self.send(200, ARTICLE_HTML, {"Last-Modified": LAST_MODIFIED})
+        finally:
+            with server.lock:
+                server.active[host] -= 1
+
+    def send(self, status, body=b"", headers=None):
+        with self.server.lock:
+            self.server.codes.append((self.path, status))
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class CrawlTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ArticleHandler)
+        self.server.lock = threading.Lock()
+        self.server.delay = 0
+        self.server.hits, self.server.starts, self.server.active, self.server.max_active = {}, {}, {}, {}
+        self.server.codes = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base = f"http://127.0.0.1:{self.server.server_port}"
+
+        patcher = mock.patch.object(wx, "RETRY_BASE_DELAY", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def crawl(self, urls, **kwargs):
+        kwargs.setdefault("min_interval", 0)
+        return wx.crawl_urls(urls, self.tmpdir, **kwargs)
+
+
+class ConditionalRequestTest(CrawlTestCase):
+    def test_unchanged_pages_return_304_and_keep_saved_file(self):
+        urls = [f"{self.base}/etag/1", f"{self.base}/modified/1"]
+
+        first = self.crawl(urls)
+        self.assertEqual([result["status"] for result in first], ["fetched", "fetched"])
+        self.assertEqual(first[0]["title"], "测试文章标题")
+
+        second = self.crawl(urls)
+        self.assertEqual([result["status"] for result in second], ["not_modified", "not_modified"])
+        self.assertEqual(sorted(self.server.codes[2:]), [("/etag/1", 304), ("/modified/1", 304)])
+        for result in second:
+            with open(result["filepath"], "rb") as f:
+                self.assertEqual(f.read(), ARTICLE_HTML)
+
+    def test_missing_file_is_fetched_unconditionally(self):
+        url = f"{self.base}/etag/1"
+        result = self.crawl([url])[0]
+        os.remove(result["filepath"])
+
+        self.assertEqual(self.crawl([url])[0]["status"], "fetched")
+        self.assertEqual(self.server.codes, [("/etag/1", 200), ("/etag/1", 200)])
+
+
+class DeduplicationTest(CrawlTestCase):
+    def test_duplicates_keep_first_occurrence_order(self):
+        a, b, c = (f"{self.base}/etag/{name}" for name in "abc")
+
+        results = self.crawl([a, b, a, c, b])
+
+        self.assertEqual([result["url"] for result in results], [a, b, c])
+        self.assertEqual(self.server.hits, {"/etag/a": 1, "/etag/b": 1, "/etag/c": 1})
+
+
+class PolitenessTest(CrawlTestCase):
+    def test_host_concurrency_and_interval(self):
+        self.server.delay = 0.2
+        min_interval = 0.1
+        # 127.0.0.1 和 localhost 是两个主机，各自限流
+        urls = [f"{host}/etag/{i}" for host in (self.base, f"http://localhost:{self.server.server_port}")
+                for i in range(6)]
+
+        results = self.crawl(urls, workers=8, host_concurrency=2, min_interval=min_interval)
+
+        self.assertTrue(all(result["status"] == "fetched" for result in results))
+        self.assertEqual(len(self.server.max_active), 2)
+        for host, starts in self.server.starts.items():
+            self.assertEqual(len(starts), 6)
+            self.assertLessEqual(self.server.max_active[host], 2)
+            # 服务端看到的到达时间有几毫秒抖动，总跨度不受影响
+            starts.sort()
+            self.assertGreaterEqual(starts[-1] - starts[0], min_interval * (len(starts) - 1) * 0.95)
+            self.assertGreaterEqual(min(later - earlier for earlier, later in zip(starts, starts[1:])),
+                                    min_interval / 2)
+
+
+class RetryTest(CrawlTestCase):
+    def test_server_error_is_retried(self):
+        result = self.crawl([f"{self.base}/flaky/1"])[0]
+
+        self.assertEqual(result["status"], "fetched")
+        self.assertEqual(self.server.codes, [("/flaky/1", 503), ("/flaky/1", 200)])
+
+    def test_client_error_is_not_retried(self):
+        result = self.crawl([f"{self.base}/missing/1"])[0]
+
+        self.assertEqual(result["status"], "failed")
+        self.assertEqual(self.server.hits["/missing/1"], 1)
+
+    def test_retries_are_bounded(self):
+        result = self.crawl([f"{self.base}/down/1"])[0]
+
+        self.assertEqual(result["status"], "failed")
+        self.assertEqual(result["error"], "HTTP 502")
+        self.assertEqual(self.server.hits["/down/1"], wx.CRAWL_RETRIES)
@@ -0,0 +1,209 @@
+import asyncio
+import itertools
+import json
+import math
+import os
+import shutil
+import tempfile
+import time
+
+from tornado.testing import AsyncHTTPTestCase, gen_test
+
+import server
+from tests.helpers import create_fixture_db
+
+
+def p99(latencies):
+    """第 99 百分位（样本少于 100 个时即最大值）"""
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, math.ceil(0.99 * len(ordered)) - 1)]
+
+
+class ServerTestCase(AsyncHTTPTestCase):
+    """基于 SQLite 示例数据启动完整应用"""
+
+    executor_workers = server.DB_EXECUTOR_WORKERS
+    status_write_mode = "journal"
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.engine = create_fixture_db(os.path.join(self.tmpdir, "papers.db"))
+        super().setUp()
+
+    def tearDown(self):
+        super().tearDown()
+        self.app.settings["executor"].shutdown(wait=True)
+        self.engine.dispose()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def get_app(self):
+        self.app = server.make_app(engine=self.engine, executor_workers=self.executor_workers,
+                                   status_write_mode=self.status_write_mode,
+                                   status_journal_path=os.path.join(self.tmpdir, "journal.jsonl"))
+        self.storage = self.app.settings["storage"]
+        return self.app
+
+    def fetch_json(self, path, **kwargs):
+        response = self.fetch(path, **kwargs)
+        return response.code, json.loads(response.body)
+
+
+class ConcurrencyTest(ServerTestCase):
+    """阻塞的存储调用在线程池中执行，并发请求不会在 IOLoop 上排队"""
+
+    delay = 0.2
+    requests = 8
+    toggles = 16
+
+    def get_app(self):
+        app = super().get_app()
+        query_papers = self.storage.query_papers
+
+        def slow_query_papers(*args, **kwargs):
+            time.sleep(self.delay)
+            return query_papers(*args, **kwargs)
+
+        self.storage.query_papers = slow_query_papers
+        return app
+
+    @gen_test(timeout=30)
+    async def test_concurrent_requests_do_not_serialize(self):
+        async def timed_fetch(limit):
+            # 不同的 limit 避免命中响应缓存
+            start = time.perf_counter()
+            response = await self.http_client.fetch(self.get_url(f"/api/papers?limit={limit}"))
+            self.assertEqual(response.code, 200)
+            return time.perf_counter() - start
+
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(timed_fetch(limit) for limit in range(1, self.requests + 1)))
+        elapsed = time.perf_counter() - start
+
+        # 串行执行需要 requests * delay 秒
+        self.assertLess(elapsed, self.delay * self.requests / 2)
+        self.assertLess(p99(latencies), self.delay * 3)
+
+    @gen_test(timeout=30)
+    async def test_status_writes_stay_fast_under_list_load(self):
+        # 慢列表请求持续占用一半线程池，期间陆续发出阅读状态写入
+        window = self.delay * 3
+        limits = itertools.count(1)
+        paper_ids = [paper.paper_url for paper in self.storage.catalog.all_papers()]
+
+        async def keep_listing():
+            deadline = time.perf_counter() + window
+            while time.perf_counter() < deadline:
+                # 不同的 limit 避免命中响应缓存
+                response = await self.http_client.fetch(self.get_url(f"/api/papers?limit={next(limits)}"))
+                self.assertEqual(response.code, 200)
+
+        async def timed_toggle(index):
+            await asyncio.sleep(window * index / self.toggles)
+            body = json.dumps({"paper_id": paper_ids[index % len(paper_ids)], "is_read": index % 2 == 0})
+            start = time.perf_counter()
+            response = await self.http_client.fetch(self.get_url("/api/status/read"), method="POST", body=body)
+            self.assertEqual(response.code, 200)
+            return time.perf_counter() - start
+
+        listing = [keep_listing() for _ in range(self.executor_workers // 2)]
+        results = await asyncio.gather(*listing, *(timed_toggle(index) for index in range(self.toggles)))
+        latencies = results[len(listing):]
+
+        # 写入不应排在慢查询后面等待
+        self.assertLess(p99(latencies), self.delay / 2)
+
+    @gen_test(timeout=30)
+    async def test_event_loop_stays_responsive(self):
+        slow = [self.http_client.fetch(self.get_url(f"/api/papers?limit={limit}"))
+                for limit in range(1, self.requests + 1)]
+        await asyncio.sleep(0.01)
+        start = time.perf_counter()
+        response = await self.http_client.fetch(self.get_url("/api/diagnostics"))
+        self.assertEqual(response.code, 200)
+        self.assertLess(time.perf_counter() - start, self.delay)
+        await asyncio.gather(*slow)
+
+
+class SearchConsistencyTest(ServerTestCase):
+    """论文列表、分面计数和导出对同一搜索词返回相同的论文"""
+
+    def test_export_matches_list_and_facets(self):
+        for query in ("diffusion", "masked%20diffusion%20models", "%E6%A8%A1%E5%9E%8B"):
+            _, listing = self.fetch_json(f"/api/papers?limit=500&search={query}")
+            _, facets = self.fetch_json(f"/api/facets?search={query}")
+            export = self.fetch(f"/api/papers/export?search={query}")
+            exported = [json.loads(line)["id"] for line in export.body.splitlines() if line]
+
+            listed = sorted(paper["paper_url"] for paper in listing["data"])
+            self.assertEqual(sorted(exported), listed)
+            self.assertEqual(facets["data"]["total"], len(listed))
+
+
+class OffsetPaginationTest(ServerTestCase):
+    """旧的 offset 分页与游标分页使用相同的过滤条件"""
+
+    queries = ("is_read=1", "is_favorite=0&category=cs.AI", "days=2000", "category=cs.AI&tag_id=3",
+               "search=diffusion&is_read=0")
+
+    def listed_ids(self, query):
+        _, listing = self.fetch_json(f"/api/papers?limit=500&{query}")
+        return sorted(paper["paper_url"] for paper in listing["data"])
+
+    def test_offset_applies_all_filters(self):
+        _, everything = self.fetch_json("/api/papers?limit=500&offset=0")
+        for query in self.queries:
+            expected = self.listed_ids(query)
+            code, page = self.fetch_json(f"/api/papers?limit=500&offset=0&{query}")
+            self.assertEqual(code, 200)
+            self.assertEqual(sorted(paper["paper_url"] for paper in page["data"]), expected, query)
+            self.assertEqual(page["pagination"]["total"], len(expected), query)
+            self.assertLess(len(expected), everything["pagination"]["total"], query)
+
+    def test_offset_pages_cover_the_filtered_set(self):
+        expected = self.listed_ids("is_read=0")
+        pages = [self.fetch_json(f"/api/papers?limit=2&offset={offset}&is_read=0")[1]
+                 for offset in range(0, len(expected), 2)]
+        self.assertEqual(sorted(paper["paper_url"] for page in pages for paper in page["data"]), expected)
+        self.assertFalse(pages[-1]["pagination"]["has_more"])
+
+    def test_negative_offset_is_rejected(self):
+        self.assertEqual(self.fetch("/api/papers?offset=-1").code, 400)
+
+
+class StatusBufferTest(ServerTestCase):
+    """缓冲中的阅读状态在论文列表、目录重载和落库后都保持一致"""
+
+    status_write_mode = "async"
+
+    def toggle_read(self, paper_id, value):
+        response = self.fetch("/api/status/read", method="POST",
+                              body=json.dumps({"paper_id": paper_id, "is_read": value}))
+        self.assertEqual(response.code, 200)
+
+    def listed_read_status(self, paper_id, query=""):
+        _, listing = self.fetch_json(f"/api/papers?limit=500{query}")
+        return {paper["paper_url"]: paper["is_read"] for paper in listing["data"]}.get(paper_id)
+
+    def unread_paper_id(self):
+        return next(paper.paper_url for paper in self.storage.catalog.all_papers() if not paper.is_read)
+
+    def test_list_reflects_pending_and_flushed_toggles(self):
+        paper_id = self.unread_paper_id()
+        self.assertFalse(self.listed_read_status(paper_id))
+
+        self.toggle_read(paper_id, True)
+        self.assertTrue(self.listed_read_status(paper_id))
+        self.assertTrue(self.listed_read_status(paper_id, "&is_read=1"))
+
+        self.storage.status_buffer.flush()
+        self.storage.catalog.refresh()
+        self.assertTrue(self.listed_read_status(paper_id))
+        _, detail = self.fetch_json(f"/api/papers?ids={paper_id}")
+        self.assertTrue(detail["data"][0]["is_read"])
+
+    def test_full_reload_keeps_pending_toggles(self):
+        paper_id = self.unread_paper_id()
+        self.toggle_read(paper_id, True)
+        self.storage.catalog.load()
+        self.assertTrue(self.storage.catalog.get(paper_id).is_read)
+        self.assertEqual(self.storage.status_buffer.stats()["depth"], 1)
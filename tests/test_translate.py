@@ -0,0 +1,144 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+from openai import OpenAI
+
+import translate
+
+
+class ChatCompletionsHandler(BaseHTTPRequestHandler):
+    """
+    OpenAI 兼容的 /v1/chat/completions 替身
+
+    每行前加 "译:" 作为译文；server.failures 中排队的 (状态码, 响应头) 依次返回，
+    server.garble_batches 为真时把多行请求合并为一行返回。
+    """
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        content = body["messages"][-1]["content"]
+        with server.lock:
+            server.contents.append(content)
+            failure = server.failures.pop(0) if server.failures else None
+
+        if failure is not None:
+            status, headers = failure
+            self.send_json(status, {"error": {"message": f"mock {status}", "type": "mock"}}, headers)
+            return
+
+        lines = content.split("\n")
+        if server.garble_batches and len(lines) > 1:
+            translated = "译:" + " ".join(lines)
+        else:
+            translated = "\n".join("译:" + line for line in lines)
+        self.send_json(200, {
+            "id": "chatcmpl-mock", "object": "chat.completion", "created": 0, "model": body["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": translated}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30}
+        })
+
+    def send_json(self, status, payload, headers=None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+class TranslationEngineTest(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), ChatCompletionsHandler)
+        self.server.lock = threading.Lock()
+        self.server.contents = []
+        self.server.failures = []
+        self.server.garble_batches = False
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = OpenAI(api_key="test", base_url=f"http://127.0.0.1:{self.server.server_port}/v1",
+                             max_retries=0)
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def make_engine(self, **kwargs):
+        return translate.TranslationEngine(self.client, workers=1, rate=100, burst=100, **kwargs)
+
+    def test_rate_limit_honours_retry_after(self):
+        self.server.failures = [(429, {"Retry-After": "0.3"})]
+        engine = self.make_engine()
+
+        start = time.monotonic()
+        self.assertEqual(engine.translate("Attention is all you need"), "译:Attention is all you need")
+
+        # 令牌桶按 Retry-After 暂停后再发出第二次请求
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertEqual(len(self.server.contents), 2)
+        self.assertEqual(engine.stats["rate_limited"], 1)
+        self.assertEqual(engine.stats["retries"], 1)
+        self.assertEqual(engine.stats["prompt_tokens"], 10)
+
+    def test_server_errors_are_retried_until_exhausted(self):
+        self.server.failures = [(500, {})] * 2
+        patcher = mock.patch.object(translate, "RETRY_BASE_DELAY", 0.01)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.assertIsNone(self.make_engine(retries=2).translate_many(["Diffusion models"])[0])
+        self.assertEqual(self.make_engine(retries=2).translate("Diffusion models"), "译:Diffusion models")
+        self.assertEqual(len(self.server.contents), 3)
+
+    def test_garbled_title_batch_falls_back_to_single_requests(self):
+        self.server.garble_batches = True
+        titles = ["Masked diffusion", "Sparse  attention", "Mixture of experts"]
+
+        results = self.make_engine().translate_titles(titles)
+
+        self.assertEqual(results, ["译:Masked diffusion", "译:Sparse attention", "译:Mixture of experts"])
+        self.assertEqual(self.server.contents[0], "Masked diffusion\nSparse attention\nMixture of experts")
+        self.assertEqual(self.server.contents[1:], ["Masked diffusion", "Sparse attention", "Mixture of experts"])
+
+    def test_failed_title_batch_falls_back_to_single_requests(self):
+        # 400 不重试，合并请求失败后逐个翻译
+        self.server.failures = [(400, {})]
+        titles = ["Masked diffusion", "Mixture of experts"]
+
+        engine = self.make_engine()
+        results = engine.translate_titles(titles)
+
+        self.assertEqual(results, ["译:Masked diffusion", "译:Mixture of experts"])
+        self.assertEqual(len(self.server.contents), 3)
+        self.assertEqual(engine.stats["failures"], 0)
+
+    def test_title_batch_fills_cache(self):
+        cache = translate.TranslationCache(os.path.join(self.tmpdir, "cache.sqlite3"))
+        self.addCleanup(cache.close)
+        titles = ["Masked diffusion", "Mixture of experts"]
+
+        self.assertEqual(self.make_engine(cache=cache).translate_titles(titles),
+                         ["译:Masked diffusion", "译:Mixture of experts"])
+        self.assertEqual(self.make_engine(cache=cache).translate_titles(titles),
+                         ["译:Masked diffusion", "译:Mixture of experts"])
+        self.assertEqual(len(self.server.contents), 1)
+
+    def test_retries_must_be_positive(self):
+        for retries in (0, -1):
+            with self.assertRaises(ValueError):
+                self.make_engine(retries=retries)
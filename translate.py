@@ -1,9 +1,363 @@
-
-import pandas as pd
 from sqlalchemy import create_engine, text
 import json
-from openai import OpenAI
+from openai import OpenAI, APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
 import os
+import time
+import random
+import threading
+import hashlib
+import re
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+
+# 翻译服务（OpenAI 兼容接口）和模型
+LLM_BASE_URL = "https://dashscope.aliyuncs.com/compatible-mode/v1"
+TRANSLATION_MODEL = "qwen-mt-turbo"
+# 并发请求数，以及令牌桶的速率（每秒请求数）和突发容量
+TRANSLATE_WORKERS = 8
+TRANSLATE_RATE = 5.0
+TRANSLATE_BURST = 5
+# 单个请求的最大尝试次数，以及退避的基准/上限时间（秒）
+TRANSLATE_RETRIES = 5
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 30.0
+# 合并到一个请求中的标题数和总字符数上限
+TITLE_BATCH_SIZE = 10
+TITLE_BATCH_MAX_CHARS = 2000
+# 翻译任务每块读取、翻译并写回的论文数，以及断点续跑的检查点文件
+TRANSLATE_CHUNK_SIZE = 50
+TRANSLATE_CHECKPOINT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "translate_checkpoint.json")
+# 翻译缓存：文件路径、提示词版本（修改请求格式后递增，使旧缓存失效）和容量上限
+TRANSLATION_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "translation_cache.sqlite3")
+PROMPT_VERSION = 1
+CACHE_MAX_ENTRIES = 200_000
+CACHE_MAX_BYTES = 256 * 1024 * 1024
+# 每隔多少次写入检查一次容量并落盘访问时间
+CACHE_MAINTENANCE_INTERVAL = 200
+
+# 英文句子切分：句末标点后跟空白和大写字母/数字
+_SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9(\"'])")
+
+
+class TokenBucket:
+    """
+    令牌桶限速
+
+    每秒补充 rate 个令牌，最多积累 capacity 个；收到 429 时调用 pause，
+    所有线程都会等到 Retry-After 之后再发请求。
+    """
+
+    def __init__(self, rate=TRANSLATE_RATE, capacity=TRANSLATE_BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if now >= self.paused_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = max(self.paused_until - now, (1 - self.tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+            self.tokens = 0
+
+
+class TranslationCache:
+    """
+    按内容寻址的翻译缓存
+
+    键为 (原文, 模型, 目标语言, 提示词版本) 的 sha256，保存在本地 SQLite 文件中；
+    超过条数或字节上限时按最近使用时间淘汰。可在多个线程间共享。
+    """
+
+    def __init__(self, path=TRANSLATION_CACHE_PATH, max_entries=CACHE_MAX_ENTRIES, max_bytes=CACHE_MAX_BYTES):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS translations (
+                key TEXT PRIMARY KEY,
+                translation TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                tokens INTEGER NOT NULL DEFAULT 0,
+                last_used REAL NOT NULL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS idx_translations_last_used ON translations (last_used)")
+        self._connection.commit()
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._operations = 0
+        self.stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0, "saved_tokens": 0}
+
+    @staticmethod
+    def make_key(text, model, target_lang, prompt_version=PROMPT_VERSION):
+        payload = json.dumps([text, model, target_lang, prompt_version], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """返回缓存的译文，未命中时返回 None"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT translation, tokens FROM translations WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["saved_tokens"] += row[1]
+            # 访问时间批量落盘
+            self._touched[key] = time.time()
+            self._tick()
+            return row[0]
+
+    def put(self, key, translation, tokens=0):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO translations (key, translation, size, tokens, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, translation, len(translation.encode("utf-8")), int(tokens), time.time())
+            )
+            self.stats["writes"] += 1
+            self._tick()
+
+    def _tick(self):
+        self._operations += 1
+        if self._operations >= CACHE_MAINTENANCE_INTERVAL:
+            self._maintain()
+
+    def _maintain(self):
+        """落盘访问时间并按 LRU 淘汰（调用方持有 _lock）"""
+        self._operations = 0
+        if self._touched:
+            self._connection.executemany(
+                "UPDATE translations SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()]
+            )
+            self._touched = {}
+        count, size = self._connection.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM translations"
+        ).fetchone()
+        # 淘汰到上限的 90%，避免每次写入都触发
+        while count > self.max_entries or size > self.max_bytes:
+            excess = max(count - int(self.max_entries * 0.9), 1)
+            if size > self.max_bytes and count:
+                excess = max(excess, int(count * (1 - self.max_bytes * 0.9 / size)))
+            self._connection.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used LIMIT ?)", (excess,)
+            )
+            self.stats["evictions"] += excess
+            count, size = self._connection.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM translations"
+            ).fetchone()
+        self._connection.commit()
+
+    def summary(self):
+        """命中统计"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return dict(self.stats, hit_rate=round(self.stats["hits"] / lookups, 3) if lookups else 0.0)
+
+    def close(self):
+        with self._lock:
+            self._maintain()
+            self._connection.close()
+
+
+def split_sentences(text):
+    """按英文句子切分文本"""
+    return [sentence for sentence in _SENTENCE_BOUNDARY.split(" ".join(text.split())) if sentence]
+
+
+def _retry_after(error):
+    """从 429 响应中读取 Retry-After（秒），没有时返回 None"""
+    response = getattr(error, "response", None)
+    value = response.headers.get("retry-after") if response is not None else None
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+class TranslationEngine:
+    """
+    并发翻译引擎
+
+    线程池控制并发数，令牌桶控制请求速率；限流、超时、连接错误和 5xx 会带抖动地退避重试，
+    其它错误（如请求无效）直接失败。短标题可以合并到一个请求中翻译。
+    传入 cache 时先查缓存；sentence_mode 下长文本按句子查缓存和翻译，重复的句子只翻译一次。
+    """
+
+    def __init__(self, client, model=TRANSLATION_MODEL, workers=TRANSLATE_WORKERS, rate=TRANSLATE_RATE,
+                 burst=TRANSLATE_BURST, retries=TRANSLATE_RETRIES, target_lang="Chinese",
+                 cache=None, sentence_mode=False):
+        if retries < 1:
+            raise ValueError("retries 至少为 1")
+        self.client = client
+        self.model = model
+        self.workers = workers
+        self.retries = retries
+        self.target_lang = target_lang
+        self.cache = cache
+        self.sentence_mode = sentence_mode
+        self.bucket = TokenBucket(rate, burst)
+        self.stats = {"requests": 0, "retries": 0, "rate_limited": 0, "failures": 0,
+                      "prompt_tokens": 0, "completion_tokens": 0}
+        self._stats_lock = threading.Lock()
+
+    def _count(self, name, value=1):
+        with self._stats_lock:
+            self.stats[name] += value
+
+    def _request(self, text):
+        """发送一次翻译请求"""
+        completion = self.client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": text}],
+            extra_body={
+                "translation_options": {
+                    "source_lang": "auto",
+                    "target_lang": self.target_lang
+                }
+            }
+        )
+        tokens = 0
+        usage = getattr(completion, "usage", None)
+        if usage is not None:
+            self._count("prompt_tokens", usage.prompt_tokens or 0)
+            self._count("completion_tokens", usage.completion_tokens or 0)
+            tokens = (usage.prompt_tokens or 0) + (usage.completion_tokens or 0)
+        return completion.choices[0].message.content, tokens
+
+    def _cache_key(self, text):
+        return TranslationCache.make_key(text, self.model, self.target_lang)
+
+    def _cached(self, text):
+        return self.cache.get(self._cache_key(text)) if self.cache is not None else None
+
+    def _store(self, text, translation, tokens=0):
+        if self.cache is not None and translation:
+            self.cache.put(self._cache_key(text), translation, tokens)
+
+    def translate(self, text):
+        """翻译一段文本（优先读缓存），重试用尽后抛出最后一次的异常"""
+        if self.sentence_mode and self.cache is not None:
+            sentences = split_sentences(text)
+            if len(sentences) > 1:
+                return "".join(self._translate_one(sentence) for sentence in sentences)
+        return self._translate_one(text)
+
+    def _translate_one(self, text):
+        cached = self._cached(text)
+        if cached is not None:
+            return cached
+        translation, tokens = self._request_with_retry(text)
+        self._store(text, translation, tokens)
+        return translation
+
+    def _request_with_retry(self, text):
+        """发送翻译请求，返回 (译文, token 数)"""
+        for attempt in range(self.retries):
+            self.bucket.acquire()
+            self._count("requests")
+            try:
+                return self._request(text)
+            except RateLimitError as e:
+                self._count("rate_limited")
+                delay = _retry_after(e)
+                if delay is None:
+                    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)
+                # 限流是全局的，暂停令牌桶而不只是当前线程
+                self.bucket.pause(delay)
+                error = e
+            except (APIConnectionError, APITimeoutError, InternalServerError) as e:
+                # 全抖动退避
+                time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+                error = e
+            if attempt + 1 < self.retries:
+                self._count("retries")
+        raise error
+
+    def _translate_or_none(self, text):
+        if not text:
+            return text
+        try:
+            return self.translate(text)
+        except Exception as e:
+            self._count("failures")
+            print(f"❌ 翻译出错: {e}")
+            return None
+
+    def translate_many(self, texts):
+        """并发翻译多段文本，结果与输入一一对应，失败的为 None"""
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(self._translate_or_none, texts))
+
+    def _translate_title_batch(self, titles):
+        """把多个标题按行合并为一个请求，行数对不上时逐个翻译"""
+        results = [self._cached(title) if title else title for title in titles]
+        missing = [index for index, result in enumerate(results) if result is None]
+        if len(missing) > 1:
+            try:
+                translated, tokens = self._request_with_retry("\n".join(titles[index] for index in missing))
+                lines = [line.strip() for line in translated.strip().split("\n") if line.strip()]
+                if len(lines) == len(missing):
+                    for index, line in zip(missing, lines):
+                        results[index] = line
+                        self._store(titles[index], line, tokens // len(missing))
+                    return results
+            except Exception as e:
+                print(f"❌ 合并翻译标题出错，改为逐个翻译: {e}")
+        for index in missing:
+            results[index] = self._translate_or_none(titles[index])
+        return results
+
+    def translate_titles(self, titles, batch_size=TITLE_BATCH_SIZE, max_chars=TITLE_BATCH_MAX_CHARS):
+        """并发翻译标题，短标题合并请求；结果与输入一一对应，失败的为 None"""
+        titles = [" ".join((title or "").split()) for title in titles]
+        batches, batch, size = [], [], 0
+        for index, title in enumerate(titles):
+            if batch and (len(batch) >= batch_size or size + len(title) > max_chars):
+                batches.append(batch)
+                batch, size = [], 0
+            batch.append(index)
+            size += len(title)
+        if batch:
+            batches.append(batch)
+
+        results = [None] * len(titles)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [(batch, executor.submit(self._translate_title_batch, [titles[i] for i in batch]))
+                       for batch in batches]
+            for batch, future in futures:
+                for index, translated in zip(batch, future.result()):
+                    results[index] = translated
+        return results
+
+
+def create_llm_client():
+    """创建翻译服务客户端（重试由 TranslationEngine 负责）"""
+    return OpenAI(
+        api_key=os.getenv("DASHSCOPE_API_KEY"),
+        base_url=os.getenv("LLM_BASE_URL", LLM_BASE_URL),
+        max_retries=0
+    )
 
 
 def translate_text_with_llm(client, text, source_lang="English", target_lang="Chinese"):
@@ -33,7 +387,7 @@ def translate_text_with_llm(client, text, source_lang="English", target_lang="Ch
         }
 
         completion = client.chat.completions.create(
-            model="qwen-mt-turbo",  # 使用翻译模型
+            model=TRANSLATION_MODEL,  # 使用翻译模型
             messages=messages,
             extra_body={
                 "translation_options": translation_options
@@ -46,74 +400,164 @@ def translate_text_with_llm(client, text, source_lang="English", target_lang="Ch
         return text  # 返回原文本以防翻译失败
 
 
-def translate_papers_and_save(db_config):
+class TranslationJob:
     """
-    从数据库读取论文数据，翻译标题和摘要，并保存回数据库
+    分块、可断点续跑的翻译任务
 
-    Args:
-        db_config: 数据库配置字典
+    按主键顺序分块读取待翻译的论文，每块翻译完成后用一次 executemany 写回并记录检查点；
+    中断后重新运行从检查点之后继续。全部完成后删除检查点，下次运行会重试失败的论文。
     """
-    try:
-        # 创建数据库连接
-        connection_string = f"mysql+pymysql://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
-        engine = create_engine(connection_string)
 
-        # 从数据库读取数据
-        query = "SELECT id, title, summary FROM papers WHERE title_ch IS NULL OR summary_ch IS NULL"
-        df = pd.read_sql(query, engine)
+    def __init__(self, engine, translator, chunk_size=TRANSLATE_CHUNK_SIZE, checkpoint_path=TRANSLATE_CHECKPOINT_PATH):
+        self.engine = engine
+        self.translator = translator
+        self.chunk_size = chunk_size
+        self.checkpoint_path = checkpoint_path
+        self.checkpoint = {"last_id": None, "papers": 0, "failed": 0}
+        if checkpoint_path and os.path.exists(checkpoint_path):
+            with open(checkpoint_path, "r", encoding="utf-8") as f:
+                self.checkpoint.update(json.load(f))
 
-        if df.empty:
-            print("✅ 没有需要翻译的论文数据")
+    def _save_checkpoint(self):
+        if not self.checkpoint_path:
             return
+        os.makedirs(os.path.dirname(os.path.abspath(self.checkpoint_path)), exist_ok=True)
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.checkpoint, f, ensure_ascii=False)
+        os.replace(tmp_path, self.checkpoint_path)
 
-        print(f"📝 需要翻译 {len(df)} 篇论文")
+    def _read_chunk(self, after_id):
+        """
+        读取下一块待翻译的论文
 
-        # 初始化LLM客户端
-        client = OpenAI(
-            api_key=os.getenv("DASHSCOPE_API_KEY"),
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        )
+        每块是一次独立的键集分页查询：翻译一块可能要几分钟，
+        一直挂着服务端游标会触发 MySQL 的 net_write_timeout。
+        """
+        condition = "AND id > :after_id" if after_id is not None else ""
+        query = text(f"""
+            SELECT id, title, summary, title_ch, summary_ch FROM papers
+            WHERE (title_ch IS NULL OR summary_ch IS NULL) {condition}
+            ORDER BY id
+            LIMIT :limit
+        """)
+        with self.engine.connect() as connection:
+            return [dict(row) for row in connection.execute(
+                query, {"after_id": after_id, "limit": self.chunk_size}).mappings()]
+
+    def _translate_chunk(self, rows):
+        """翻译一块论文中缺失的字段，返回待写回的行和失败数"""
+        title_rows = [row for row in rows if row["title_ch"] is None and row["title"]]
+        summary_rows = [row for row in rows if row["summary_ch"] is None and row["summary"]]
+        titles = self.translator.translate_titles([row["title"] for row in title_rows])
+        summaries = self.translator.translate_many([row["summary"] for row in summary_rows])
+
+        updates = {}
+        for row, translated in zip(title_rows, titles):
+            if translated is not None:
+                updates.setdefault(row["id"], {"id": row["id"], "title_ch": None, "summary_ch": None})["title_ch"] = translated
+        for row, translated in zip(summary_rows, summaries):
+            if translated is not None:
+                updates.setdefault(row["id"], {"id": row["id"], "title_ch": None, "summary_ch": None})["summary_ch"] = translated
+        failed = titles.count(None) + summaries.count(None)
+        return list(updates.values()), failed
+
+    def _write_back(self, updates):
+        """一次 executemany 写回一块翻译结果（失败的字段保持为空）"""
+        if not updates:
+            return
+        with self.engine.begin() as connection:
+            connection.execute(text("""
+                UPDATE papers
+                SET title_ch = COALESCE(:title_ch, title_ch), summary_ch = COALESCE(:summary_ch, summary_ch)
+                WHERE id = :id
+            """), updates)
+
+    def run(self):
+        """执行任务，返回计数和吞吐量"""
+        if self.checkpoint["last_id"] is not None:
+            print(f"从检查点继续: {self.checkpoint['last_id']}（已完成 {self.checkpoint['papers']} 篇）")
+        start = time.monotonic()
+        papers = 0
+        tokens_before = self.translator.stats["prompt_tokens"] + self.translator.stats["completion_tokens"]
 
-        # 翻译标题和摘要
-        translated_titles = []
-        translated_summaries = []
+        while True:
+            rows = self._read_chunk(self.checkpoint["last_id"])
+            if not rows:
+                break
+            updates, failed = self._translate_chunk(rows)
+            self._write_back(updates)
 
-        for index, row in df.iterrows():
-            print(f"🔄 正在翻译第 {index + 1}/{len(df)} 篇论文: {row['title'][:50]}...")
+            papers += len(rows)
+            self.checkpoint["last_id"] = rows[-1]["id"]
+            self.checkpoint["papers"] += len(rows)
+            self.checkpoint["failed"] += failed
+            self._save_checkpoint()
 
-            # 翻译标题
-            translated_title = translate_text_with_llm(client, row['title'])
-            translated_titles.append(translated_title)
+            minutes = max(time.monotonic() - start, 1e-9) / 60
+            tokens = self.translator.stats["prompt_tokens"] + self.translator.stats["completion_tokens"] - tokens_before
+            print(f"🔄 已翻译 {self.checkpoint['papers']} 篇（本块 {len(rows)} 篇，失败字段 {failed}），"
+                  f"{papers / minutes:.1f} 篇/分钟，{tokens / minutes:.0f} tokens/分钟")
 
-            # 翻译摘要
-            translated_summary = translate_text_with_llm(client, row['summary'])
-            translated_summaries.append(translated_summary)
+        # 全部完成，删除检查点
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
 
-            print(f"   标题翻译: {translated_title[:50]}...")
-            print(f"   摘要翻译: {translated_summary[:50]}...")
+        minutes = max(time.monotonic() - start, 1e-9) / 60
+        tokens = self.translator.stats["prompt_tokens"] + self.translator.stats["completion_tokens"] - tokens_before
+        return {
+            "papers": papers,
+            "failed": self.checkpoint["failed"],
+            "papers_per_minute": round(papers / minutes, 1),
+            "tokens_per_minute": round(tokens / minutes)
+        }
 
-        # 添加翻译结果到DataFrame
-        df['title_ch'] = translated_titles
-        df['summary_ch'] = translated_summaries
 
-        # 更新数据库中的记录
-        for index, row in df.iterrows():
-            update_query = text("""
-            UPDATE papers 
-            SET title_ch = :title_ch, summary_ch = :summary_ch
-            WHERE id = :id
-            """)
-            with engine.connect() as connection:
-                connection.execute(
-                    update_query,
-                    {"title_ch": row['title_ch'], "summary_ch": row['summary_ch'], "id": row['id']}
-                )
-                connection.commit()
+def translate_papers_and_save(db_config, workers=TRANSLATE_WORKERS, engine=None, client=None,
+                              cache_path=TRANSLATION_CACHE_PATH, sentence_mode=False,
+                              chunk_size=TRANSLATE_CHUNK_SIZE, checkpoint_path=TRANSLATE_CHECKPOINT_PATH):
+    """
+    从数据库读取论文数据，翻译标题和摘要，并保存回数据库
+
+    Args:
+        db_config: 数据库配置字典
+        workers: 并发翻译请求数
+        engine: 数据库引擎（不传时按 db_config 创建）
+        client: 翻译服务客户端（不传时按环境变量创建）
+        cache_path: 翻译缓存文件，为 None 时不使用缓存
+        sentence_mode: 摘要按句子缓存和翻译
+        chunk_size: 每块翻译并写回的论文数
+        checkpoint_path: 检查点文件，为 None 时不支持断点续跑
+    """
+    cache = None
+    try:
+        # 创建数据库连接
+        if engine is None:
+            connection_string = f"mysql+pymysql://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
+            engine = create_engine(connection_string)
+
+        # 初始化翻译引擎和缓存
+        cache = TranslationCache(cache_path) if cache_path else None
+        translator = TranslationEngine(client or create_llm_client(), workers=workers, cache=cache,
+                                       sentence_mode=sentence_mode)
+
+        result = TranslationJob(engine, translator, chunk_size, checkpoint_path).run()
+        if result["papers"] == 0:
+            print("✅ 没有需要翻译的论文数据")
+            return result
 
-        print(f"✅ 成功翻译并保存 {len(df)} 篇论文的中英文数据")
+        print(f"   翻译统计: {translator.stats}")
+        if cache is not None:
+            print(f"   缓存统计: {cache.summary()}")
+        print(f"✅ 翻译完成 {result['papers']} 篇论文，失败字段 {result['failed']}，"
+              f"{result['papers_per_minute']} 篇/分钟，{result['tokens_per_minute']} tokens/分钟")
+        return result
 
     except Exception as e:
         print(f"❌ 操作出错: {e}")
+    finally:
+        if cache is not None:
+            cache.close()
 
 
 # 在主程序中调用
@@ -0,0 +1,358 @@
+from sqlalchemy import create_engine, inspect, text
+from pypdf import PdfReader
+import argparse
+import hashlib
+import os
+import re
+import statistics
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+
+from translate import (TRANSLATE_WORKERS, TRANSLATION_CACHE_PATH, TranslationCache, TranslationEngine,
+                       create_llm_client, split_sentences)
+
+# PDF 所在目录（papers.filepath 保存的是相对这个目录的文件名），与 download_arxiv_papers.py 的默认下载目录一致
+FULLTEXT_PDF_DIR = "./llm_papers"
+# 每个翻译分块的估算 token 上限（英文按 4 个字符约 1 个 token 估算）
+FULLTEXT_CHUNK_TOKENS = 1000
+CHARS_PER_TOKEN = 4
+# 提取 PDF 文本的进程数，以及提前提取的论文数
+FULLTEXT_EXTRACT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+FULLTEXT_PREFETCH = 4
+# 行宽不到页面常规行宽的这个比例时，视为段落的最后一行
+PARAGRAPH_END_RATIO = 0.75
+
+_HEADING = re.compile(r"^(\d+(\.\d+)*|[A-Z])\.?\s+[A-Z]")
+
+
+def estimate_tokens(text):
+    """粗略估算文本的 token 数"""
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def _join_line(paragraph, line):
+    """把一行接到段落末尾，行尾连字符断开的单词重新拼上"""
+    if not paragraph:
+        return line
+    if paragraph.endswith("-") and line[:1].islower():
+        return paragraph[:-1] + line
+    return paragraph + " " + line
+
+
+def split_paragraphs(pages):
+    """
+    把逐页提取的文本切分成段落
+
+    pypdf 提取的文本没有空行分隔段落，这里按版面推断：明显短于常规行宽的行是段落的最后一行，
+    形如 "1.3 Obstacles ..." 的短行是小节标题。段落可以跨页延续。
+    """
+    paragraphs = []
+    current = ""
+    for page in pages:
+        lines = [line.strip() for line in page.splitlines()]
+        widths = [len(line) for line in lines if line]
+        if not widths:
+            continue
+        width = statistics.median_high(widths)
+        for line in lines:
+            if not line:
+                if current:
+                    paragraphs.append(current)
+                    current = ""
+                continue
+            short = len(line) < width * PARAGRAPH_END_RATIO
+            if short and _HEADING.match(line) and current:
+                # 标题单独成段
+                paragraphs.append(current)
+                current = ""
+            current = _join_line(current, line)
+            if short:
+                paragraphs.append(current)
+                current = ""
+    if current:
+        paragraphs.append(current)
+    return paragraphs
+
+
+def _split_long(paragraph, max_tokens):
+    """把超过上限的段落按句子切开，单个句子仍然超长时按字符硬切"""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for sentence in split_sentences(paragraph):
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            pieces.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if sentence:
+            pieces.append(sentence)
+
+    parts = []
+    current = ""
+    for piece in pieces:
+        candidate = f"{current} {piece}" if current else piece
+        if current and estimate_tokens(candidate) > max_tokens:
+            parts.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+def chunk_paragraphs(paragraphs, max_tokens=FULLTEXT_CHUNK_TOKENS):
+    """在段落边界处把段落合并成不超过 max_tokens 的分块（分块内段落以空行分隔）"""
+    chunks = []
+    current = []
+    current_tokens = 0
+    for paragraph in paragraphs:
+        tokens = estimate_tokens(paragraph)
+        if tokens > max_tokens:
+            parts = _split_long(paragraph, max_tokens)
+        else:
+            parts = [paragraph]
+        for part in parts:
+            tokens = estimate_tokens(part)
+            if current and current_tokens + tokens > max_tokens:
+                chunks.append("\n\n".join(current))
+                current = []
+                current_tokens = 0
+            current.append(part)
+            current_tokens += tokens
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
+
+
+def extract_pdf_chunks(filepath, max_tokens=FULLTEXT_CHUNK_TOKENS):
+    """逐页提取 PDF 文本并切分成翻译分块（在子进程中运行）"""
+    reader = PdfReader(filepath)
+    pages = [page.extract_text() or "" for page in reader.pages]
+    return chunk_paragraphs(split_paragraphs(pages), max_tokens)
+
+
+def chunk_hash(chunk):
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class FullTextTranslator:
+    """
+    论文全文翻译
+
+    进程池提前提取后面几篇论文的 PDF 文本，与当前论文的翻译请求重叠进行；
+    一篇论文的分块并发翻译，每完成一块就写入 fulltext_chunks 表，中断后重新运行只翻译缺失的分块。
+    全部分块完成后按顺序拼接写入 papers.fulltext_ch，并清除这篇论文的分块记录。
+    """
+
+    def __init__(self, engine, translator, pdf_dir=FULLTEXT_PDF_DIR, max_tokens=FULLTEXT_CHUNK_TOKENS,
+                 extract_workers=FULLTEXT_EXTRACT_WORKERS, prefetch=FULLTEXT_PREFETCH):
+        self.engine = engine
+        self.translator = translator
+        self.pdf_dir = pdf_dir
+        self.max_tokens = max_tokens
+        self.extract_workers = extract_workers
+        self.prefetch = prefetch
+        self.stats = {"papers": 0, "completed": 0, "chunks": 0, "resumed_chunks": 0,
+                      "failed_chunks": 0, "missing_files": 0, "extract_errors": 0}
+        self.has_paper_fulltexts = False
+
+    def ensure_progress_table(self):
+        """确保分块进度表 fulltext_chunks(paper_id, chunk_index, source_hash, content_ch) 存在"""
+        # 服务端由 fulltext_ch 生成的压缩全文，写入新译文时需要一并删除
+        self.has_paper_fulltexts = inspect(self.engine).has_table("paper_fulltexts")
+        if inspect(self.engine).has_table("fulltext_chunks"):
+            return
+        with self.engine.begin() as connection:
+            connection.execute(text("""
+                CREATE TABLE fulltext_chunks (
+                    paper_id VARCHAR(255) NOT NULL,
+                    chunk_index INT NOT NULL,
+                    source_hash CHAR(64) NOT NULL,
+                    content_ch LONGTEXT NOT NULL,
+                    PRIMARY KEY (paper_id, chunk_index)
+                )
+            """))
+
+    def pending_papers(self, limit=None):
+        """需要翻译全文的论文：已下载 PDF 且 fulltext_ch 为空"""
+        query = "SELECT id, filepath FROM papers WHERE fulltext_ch IS NULL AND filepath IS NOT NULL ORDER BY id"
+        if limit:
+            query += f" LIMIT {int(limit)}"
+        with self.engine.connect() as connection:
+            return [(row.id, row.filepath) for row in connection.execute(text(query))]
+
+    def _resolve(self, filepath):
+        return filepath if os.path.isabs(filepath) else os.path.join(self.pdf_dir, filepath)
+
+    def _saved_chunks(self, paper_id):
+        with self.engine.connect() as connection:
+            rows = connection.execute(text("""
+                SELECT chunk_index, source_hash, content_ch FROM fulltext_chunks WHERE paper_id = :paper_id
+            """), {"paper_id": paper_id})
+            return {row.chunk_index: (row.source_hash, row.content_ch) for row in rows}
+
+    def _save_chunk(self, paper_id, index, source_hash, content):
+        with self.engine.begin() as connection:
+            params = {"paper_id": paper_id, "chunk_index": index}
+            connection.execute(text(
+                "DELETE FROM fulltext_chunks WHERE paper_id = :paper_id AND chunk_index = :chunk_index"
+            ), params)
+            connection.execute(text("""
+                INSERT INTO fulltext_chunks (paper_id, chunk_index, source_hash, content_ch)
+                VALUES (:paper_id, :chunk_index, :source_hash, :content_ch)
+            """), {**params, "source_hash": source_hash, "content_ch": content})
+
+    def _finish(self, paper_id, fulltext):
+        with self.engine.begin() as connection:
+            connection.execute(text("UPDATE papers SET fulltext_ch = :fulltext WHERE id = :paper_id"),
+                               {"fulltext": fulltext, "paper_id": paper_id})
+            connection.execute(text("DELETE FROM fulltext_chunks WHERE paper_id = :paper_id"),
+                               {"paper_id": paper_id})
+            if self.has_paper_fulltexts:
+                connection.execute(text("DELETE FROM paper_fulltexts WHERE paper_id = :paper_id"),
+                                   {"paper_id": paper_id})
+
+    def _translate_chunk(self, chunk):
+        try:
+            return self.translator.translate(chunk)
+        except Exception as e:
+            print(f"❌ 翻译分块出错: {e}")
+            return None
+
+    def translate_paper(self, paper_id, chunks):
+        """翻译一篇论文的全部分块，全部成功时写入 fulltext_ch 并返回 True"""
+        hashes = [chunk_hash(chunk) for chunk in chunks]
+        translated = [None] * len(chunks)
+        for index, (source_hash, content) in self._saved_chunks(paper_id).items():
+            # PDF 或分块参数变化后旧的分块作废
+            if index < len(chunks) and hashes[index] == source_hash:
+                translated[index] = content
+                self.stats["resumed_chunks"] += 1
+
+        missing = [index for index, content in enumerate(translated) if content is None]
+        with ThreadPoolExecutor(max_workers=self.translator.workers) as executor:
+            futures = {executor.submit(self._translate_chunk, chunks[index]): index for index in missing}
+            for future in as_completed(futures):
+                index = futures[future]
+                content = future.result()
+                if content is None:
+                    self.stats["failed_chunks"] += 1
+                    continue
+                translated[index] = content
+                self.stats["chunks"] += 1
+                self._save_chunk(paper_id, index, hashes[index], content)
+
+        if any(content is None for content in translated):
+            done = len(chunks) - translated.count(None)
+            print(f"⚠️ {paper_id} 已完成 {done}/{len(chunks)} 个分块，下次运行继续")
+            return False
+        self._finish(paper_id, "\n\n".join(translated))
+        return True
+
+    def run(self, limit=None):
+        """翻译所有待处理论文的全文，返回统计信息"""
+        self.ensure_progress_table()
+        papers = []
+        for paper_id, filepath in self.pending_papers(limit):
+            path = self._resolve(filepath)
+            if os.path.exists(path):
+                papers.append((paper_id, path))
+            else:
+                self.stats["missing_files"] += 1
+                print(f"⚠️ 找不到 PDF: {path}")
+        if not papers:
+            print("✅ 没有需要翻译全文的论文")
+            return self.stats
+
+        start = time.monotonic()
+        with ProcessPoolExecutor(max_workers=self.extract_workers) as pool:
+            window = deque()
+            remaining = iter(papers)
+            for paper_id, path in remaining:
+                window.append((paper_id, pool.submit(extract_pdf_chunks, path, self.max_tokens)))
+                if len(window) >= self.prefetch:
+                    break
+
+            while window:
+                paper_id, future = window.popleft()
+                # 先补一篇到提取队列，再等待当前论文，使提取与翻译重叠
+                for next_id, next_path in remaining:
+                    window.append((next_id, pool.submit(extract_pdf_chunks, next_path, self.max_tokens)))
+                    break
+                try:
+                    chunks = future.result()
+                except Exception as e:
+                    self.stats["extract_errors"] += 1
+                    print(f"❌ 提取 PDF 文本出错 {paper_id}: {e}")
+                    continue
+
+                self.stats["papers"] += 1
+                if not chunks:
+                    print(f"⚠️ {paper_id} 没有可提取的文本")
+                    continue
+                if self.translate_paper(paper_id, chunks):
+                    self.stats["completed"] += 1
+                    print(f"🔄 已完成全文翻译 {paper_id}（{len(chunks)} 个分块）")
+
+        self.stats["seconds"] = round(time.monotonic() - start, 1)
+        return self.stats
+
+
+def translate_fulltexts_and_save(db_config, workers=TRANSLATE_WORKERS, engine=None, client=None,
+                                 cache_path=TRANSLATION_CACHE_PATH, pdf_dir=FULLTEXT_PDF_DIR,
+                                 max_tokens=FULLTEXT_CHUNK_TOKENS, limit=None):
+    """
+    翻译已下载论文的 PDF 全文并保存到 papers.fulltext_ch
+
+    Args:
+        db_config: 数据库配置字典
+        workers: 并发翻译请求数
+        engine: 数据库引擎（不传时按 db_config 创建）
+        client: 翻译服务客户端（不传时按环境变量创建）
+        cache_path: 翻译缓存文件，为 None 时不使用缓存
+        pdf_dir: PDF 所在目录
+        max_tokens: 每个翻译分块的估算 token 上限
+        limit: 本次最多处理的论文数
+    """
+    cache = None
+    try:
+        if engine is None:
+            connection_string = f"mysql+pymysql://{db_config['user']}:{db_config['password']}@{db_config['host']}/{db_config['database']}"
+            engine = create_engine(connection_string)
+
+        cache = TranslationCache(cache_path) if cache_path else None
+        translator = TranslationEngine(client or create_llm_client(), workers=workers, cache=cache)
+        stats = FullTextTranslator(engine, translator, pdf_dir, max_tokens).run(limit)
+
+        print(f"✅ 全文翻译完成: {stats}")
+        print(f"   翻译统计: {translator.stats}")
+        return stats
+
+    except Exception as e:
+        print(f"❌ 操作出错: {e}")
+    finally:
+        if cache is not None:
+            cache.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="翻译已下载论文的 PDF 全文")
+    parser.add_argument("--pdf-dir", default=FULLTEXT_PDF_DIR, help="PDF 所在目录（与下载时的 --download-dir 相同）")
+    parser.add_argument("--workers", type=int, default=TRANSLATE_WORKERS, help="并发翻译请求数")
+    parser.add_argument("--max-tokens", type=int, default=FULLTEXT_CHUNK_TOKENS, help="每个翻译分块的估算 token 上限")
+    parser.add_argument("--limit", type=int, default=None, help="本次最多处理的论文数")
+    args = parser.parse_args()
+
+    # 数据库配置
+    db_config = {
+        'host': 'localhost',
+        'database': 'test',
+        'user': 'root',
+        'password': 'root123'
+    }
+
+    # 翻译论文全文并保存
+    translate_fulltexts_and_save(db_config, workers=args.workers, pdf_dir=args.pdf_dir,
+                                 max_tokens=args.max_tokens, limit=args.limit)